@@ -4,9 +4,9 @@ from google.genai import types
 import logging
 import json
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
 from config import Config
+from news_extractor import NewsExtractor
+from ttl_map import TTLMap
 
 logger = logging.getLogger(__name__)
 
@@ -26,39 +26,16 @@ class AIAnalyzer:
             'gemini-2.5-flash',         # 2순위: 든든한 국밥 같은 안정성
             'gemma-3-27b-it',           # 3순위: 백업용 오픈 모델
         ]
+        
+        # 같은 신호 재분석 방지 (재시작 후에도 체크포인트로 유지)
+        self.cache = TTLMap(Config.AI_CACHE_TTL, max_size=5000)
+        # 뉴스 본문 (같은 URL 재분석 시 다시 받지 않음)
+        self.news = NewsExtractor(max_bytes=Config.NEWS_MAX_BYTES, max_chars=Config.NEWS_MAX_CHARS,
+                                  cache_ttl=Config.NEWS_CACHE_TTL)
 
     async def _fetch_news_content(self, url):
-        """뉴스 링크에 접속하여 본문 추출"""
-        if not url or not url.startswith('http'):
-            return "본문 수집 불가 (잘못된 URL)"
-            
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=5) as response:
-                    if response.status != 200:
-                        return f"본문 접근 실패 (상태코드: {response.status})"
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # 광고/스크립트 제거
-                    for script in soup(["script", "style", "nav", "footer", "header"]):
-                        script.decompose()
-                        
-                    # 텍스트 추출
-                    text = ' '.join([p.get_text() for p in soup.find_all('p')])
-                    
-                    if len(text) < 100:
-                        text = soup.get_text(separator=' ', strip=True)
-                        
-                    # AI 입력 한계 고려 (약 3000자 제한)
-                    return text[:3000] + "..." if len(text) > 3000 else text
-                    
-        except Exception as e:
-            return f"본문 수집 중 에러: {str(e)}"
+        """뉴스 링크에 접속하여 본문 추출 (스트리밍, 3000자 모이면 중단, URL 캐시)"""
+        return await self.news.fetch(url)
 
     async def analyze_opportunity(self, stock_data):
         """최신 라이브러리 + 지능 순위 모델 적용 분석"""
@@ -69,9 +46,17 @@ class AIAnalyzer:
         volume = stock_data.get('volume', 'N/A')
         title = stock_data.get('title', 'N/A')
         reason = stock_data.get('trigger_reason', '')
+        rvol = stock_data.get('rvol')
+        rvol = f"{rvol:.1f}x vs same time of day (20-day avg)" if rvol else 'N/A'
+        news_url = stock_data.get('news_url') or stock_data.get('url')
+        
+        cache_key = f"{symbol}|{stock_data.get('trigger_type', '')}|{news_url or reason}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"♻️ {symbol} AI 분석 캐시 사용")
+            return dict(cached)
         
         # 1. 뉴스 본문 수집
-        news_url = stock_data.get('news_url') or stock_data.get('url')
         news_content = "링크 없음"
         
         if news_url:
@@ -87,6 +72,7 @@ class AIAnalyzer:
         - Price: {price}
         - Change: {change}%
         - Volume: {volume}
+        - Relative Volume: {rvol}
         - Headline: {title}
         - Reason: {reason}
         
@@ -135,7 +121,7 @@ class AIAnalyzer:
                 result = json.loads(text)
                 
                 # 성공 시 바로 리턴
-                return {
+                analysis = {
                     "score": result.get("score", 5),
                     "summary": result.get("summary", "분석 완료"),
                     "reasoning": result.get("reasoning", "데이터 부족"),
@@ -148,6 +134,8 @@ class AIAnalyzer:
                     "risk": result.get("risk", 0),
                     "position_size": result.get("position_size", 10)
                 }
+                self.cache.set(cache_key, analysis)
+                return dict(analysis)
                 
             except Exception as e:
                 # 에러 발생 시 로그 남기고 다음 모델(차선책)로 넘어감
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    market TEXT,
+    trigger_type TEXT,
+    trigger_reason TEXT,
+    ai_score REAL,
+    price_at_alert REAL,
+    target_price REAL,
+    stop_loss REAL,
+    upside REAL,
+    evaluated INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts(ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_symbol ON alerts(symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_trigger ON alerts(trigger_type, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_pending ON alerts(ts) WHERE evaluated = 0;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS backtest_agg (
+    kind TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    hits INTEGER NOT NULL,
+    hist BLOB,
+    PRIMARY KEY (kind, grp, metric)
+);
+"""
+
+# 알림별 백테스트 평가 상태 (matured: 평가가 끝난 구간 비트마스크)
+_EVAL_COLUMNS = {
+    'ret_1h': 'REAL', 'ret_1d': 'REAL', 'ret_3d': 'REAL', 'ret_7d': 'REAL',
+    'mfe': 'REAL', 'mae': 'REAL', 'hit_target': 'INTEGER', 'hit_stop': 'INTEGER',
+    'matured': 'INTEGER NOT NULL DEFAULT 0',
+}
+
+_COLUMNS = ('ts', 'symbol', 'market', 'trigger_type', 'trigger_reason', 'ai_score',
+            'price_at_alert', 'target_price', 'stop_loss', 'upside')
+
+_INSERT_SQL = f"INSERT INTO alerts ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+
+def _to_row(record):
+    """tracker 레코드(dict) -> INSERT 튜플"""
+    ts = record.get('ts')
+    if ts is None:
+        ts = datetime.fromisoformat(record['timestamp']).timestamp()
+    return (
+        ts,
+        record.get('symbol', 'UNKNOWN'),
+        record.get('market', 'US'),
+        record.get('trigger_type', ''),
+        record.get('trigger_reason', ''),
+        record.get('ai_score', 0),
+        record.get('price_at_alert', 0),
+        record.get('target_price', 0),
+        record.get('stop_loss', 0),
+        record.get('upside', 0),
+    )
+
+
+def _to_record(row):
+    record = dict(row)
+    record['timestamp'] = datetime.fromtimestamp(record['ts']).isoformat()
+    return record
+
+
+class AlertStore:
+    """알림 이력 저장소 (SQLite WAL + 비동기 그룹 커밋)"""
+
+    def __init__(self, db_path, batch_size=200, flush_interval=0.5):
+        self.db_path = db_path
+        self.batch_size = batch_size          # 한 트랜잭션에 묶을 최대 건수
+        self.flush_interval = flush_interval  # 첫 건 이후 추가 건을 기다리는 시간 (초)
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+
+        self._queue = None
+        self._writer = None
+        self.written = 0
+        self.commits = 0
+
+    def _migrate(self):
+        """구버전 DB 에 평가 상태 컬럼 추가"""
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(alerts)")}
+        for name, decl in _EVAL_COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE alerts ADD COLUMN {name} {decl}")
+        self._conn.commit()
+
+    # === 쓰기 (그룹 커밋) ===
+
+    def add(self, record):
+        """이벤트 루프를 막지 않고 큐에 적재 (백그라운드에서 일괄 커밋)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_loop())
+        self._queue.put_nowait(_to_row(record))
+
+    async def _write_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self.flush_interval)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await asyncio.to_thread(self._insert_many, batch)
+            except Exception as e:
+                logger.error(f"알림 이력 저장 실패 ({len(batch)}건): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _insert_many(self, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(_INSERT_SQL, rows)
+        self.written += len(rows)
+        self.commits += 1
+
+    async def flush(self):
+        """대기 중인 기록이 모두 커밋될 때까지 대기"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._writer is not None:
+            self._writer.cancel()
+        with self._lock:
+            self._conn.close()
+
+    # === 조회 ===
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [_to_record(row) for row in self._conn.execute(sql, params)]
+
+    def fetch_range(self, since=None, until=None, symbol=None, trigger_type=None):
+        """기간/종목/트리거 조건 조회 (ts 는 epoch 초)"""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append('ts >= ?'); params.append(since)
+        if until is not None:
+            clauses.append('ts < ?'); params.append(until)
+        if symbol:
+            clauses.append('symbol = ?'); params.append(symbol)
+        if trigger_type:
+            clauses.append('trigger_type = ?'); params.append(trigger_type)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._query(f"SELECT * FROM alerts {where} ORDER BY ts", params)
+
+    def fetch_pending(self, until, limit=None):
+        """until 이전 알림 중 아직 평가되지 않은 것 (부분 인덱스 사용)"""
+        sql = "SELECT * FROM alerts WHERE evaluated = 0 AND ts < ? ORDER BY ts"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(sql, (until,))
+
+    def mark_evaluated(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE alerts SET evaluated = 1 WHERE id = ?", [(i,) for i in ids])
+
+    def save_evaluations(self, rows):
+        """평가 결과 반영 (rows: dict, 'id' 필수)"""
+        columns = list(_EVAL_COLUMNS) + ['evaluated']
+        sql = f"UPDATE alerts SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?"
+        with self._lock, self._conn:
+            self._conn.executemany(sql, [tuple(r.get(c) for c in columns) + (r['id'],) for r in rows])
+
+    def load_aggregates(self):
+        with self._lock:
+            return self._conn.execute("SELECT kind, grp, metric, n, total, hits, hist FROM backtest_agg").fetchall()
+
+    def save_aggregates(self, rows):
+        """rows: (kind, grp, metric, n, total, hits, hist bytes)"""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO backtest_agg VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+    # === 기존 JSONL 이관 ===
+
+    def import_jsonl(self, path):
+        """기존 alert_history.jsonl 1회 이관 (이미 이관된 파일은 건너뜀)"""
+        if not os.path.exists(path):
+            return 0
+
+        key = f"imported:{os.path.abspath(path)}"
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0
+
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(_to_row(json.loads(line)))
+                except Exception:
+                    continue
+
+        with self._lock, self._conn:
+            self._conn.executemany(_INSERT_SQL, rows)
+            self._conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)",
+                               (key, datetime.now().isoformat()))
+
+        logger.info(f"📥 알림 이력 이관: {path} ({len(rows)}건)")
+        return len(rows)
+
+    def get_stats(self):
+        return {
+            'written': self.written,
+            'commits': self.commits,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+import numpy as np
+from bar_store import BAR_SECONDS
+
+# 평가 구간 (초)
+HORIZONS = {
+    '1h': 3600,
+    '1d': 86400,
+    '3d': 3 * 86400,
+    '7d': 7 * 86400,
+}
+EXCURSION_WINDOW = HORIZONS['7d']  # MFE/MAE, 목표/손절 도달 판정 구간
+SUCCESS_PCT = 20.0                 # 구간 내 최고 +20% 이상 = 성공
+
+SCORE_BUCKETS = [(8, '8+'), (6, '6-7'), (0, '~5')]
+
+# 누적 집계용 수익률 히스토그램 (1% 단위, 범위 밖은 양끝 칸으로)
+HIST_MIN, HIST_MAX = -100, 500
+
+_KEY_SHIFT = 10_000_000_000  # 심볼 인덱스 * SHIFT + epoch 초 (단일 정렬 키)
+
+
+def score_bucket(score):
+    for low, label in SCORE_BUCKETS:
+        if score >= low:
+            return label
+    return SCORE_BUCKETS[-1][1]
+
+
+def is_backtestable(record):
+    """yfinance 로 가격 조회가 가능한 알림만 (한국 종목/뉴스 placeholder 제외)"""
+    symbol = record.get('symbol', '')
+    return (record.get('market') != 'KR'
+            and symbol not in ('US', 'UNKNOWN', 'KR_NEWS')
+            and symbol.replace('-', '').replace('.', '').isalpha())
+
+
+class BacktestEngine:
+    """전체 알림 이력에 대한 다구간 성과 계산 (심볼 단위 루프 없이 배열 연산)"""
+
+    def __init__(self, bar_store):
+        self.cache = bar_store  # 일봉/시간봉 로컬 저장소 (빠진 구간만 일괄 조회)
+
+    def run(self, records, now=None):
+        now = now or datetime.now().timestamp()
+        records = [r for r in records if is_backtestable(r)]
+        if not records:
+            return None
+
+        symbols = sorted({r['symbol'] for r in records})
+        ts = np.array([r['ts'] for r in records], dtype=np.int64)
+        start, end = int(ts.min()) - 5 * 86400, int(min(now, ts.max() + EXCURSION_WINDOW))
+
+        # 1. 전 종목 일괄 다운로드 (일봉 + 시간봉)
+        self.cache.ensure(symbols, start, end, '1d')
+        intraday_start = max(start, int(now) - 720 * 86400)  # yfinance 60m 제공 한도
+        self.cache.ensure(symbols, intraday_start, end, '60m')
+
+        daily = self._flatten(symbols, '1d')
+        hourly = self._flatten(symbols, '60m')
+        sym_idx = np.searchsorted(np.array(symbols), [r['symbol'] for r in records])
+
+        entry = np.array([r.get('price_at_alert') or 0 for r in records], dtype=np.float64)
+        fallback_entry = self._price_at(daily, sym_idx, ts)
+        entry = np.where(entry > 0, entry, fallback_entry)
+
+        # 2. 구간별 수익률 (구간이 지난 알림만)
+        returns = {}
+        for label, seconds in HORIZONS.items():
+            bars = hourly if seconds < 86400 else daily
+            exit_price = self._exit_price(bars, sym_idx, ts, seconds, now)
+            matured = (ts + seconds) <= now
+            returns[label] = np.where(matured & (entry > 0), (exit_price / entry - 1) * 100, np.nan)
+
+        # 3. MFE/MAE + 목표/손절 도달 (7일 구간이 끝난 알림만)
+        excursion = self._excursion(daily, hourly, sym_idx, ts, entry, records, now)
+
+        return {
+            'ids': [r.get('id') for r in records],
+            'ts': ts,
+            'symbols': [r['symbol'] for r in records],
+            'trigger_type': np.array([r.get('trigger_type') or 'unknown' for r in records]),
+            'score_bucket': np.array([score_bucket(r.get('ai_score') or 0) for r in records]),
+            'returns': returns,
+            **excursion,
+        }
+
+    def _flatten(self, symbols, interval):
+        """심볼별 배열을 (심볼 인덱스, 시각) 정렬 키 하나로 이어붙임"""
+        keys, close_keys, highs, lows, closes = [], [], [], [], []
+        bar_seconds = BAR_SECONDS[interval]
+        for i, symbol in enumerate(symbols):
+            bars = self.cache.get(symbol, interval)
+            if bars is None:
+                continue
+            ts, _, high, low, close = bars
+            keys.append(i * _KEY_SHIFT + ts)
+            close_keys.append(i * _KEY_SHIFT + ts + bar_seconds)
+            highs.append(high); lows.append(low); closes.append(close)
+
+        if not keys:
+            empty = np.empty(0)
+            return {'key': empty.astype(np.int64), 'close_key': empty.astype(np.int64),
+                    'high': empty, 'low': empty, 'close': empty}
+        return {
+            'key': np.concatenate(keys),
+            'close_key': np.concatenate(close_keys),
+            'high': np.concatenate(highs),
+            'low': np.concatenate(lows),
+            'close': np.concatenate(closes),
+        }
+
+    def _price_at(self, bars, sym_idx, when):
+        """when 시점까지 마감된 마지막 봉의 종가 (같은 심볼 안에서만)"""
+        if bars['key'].size == 0:
+            return np.full(len(when), np.nan)
+        target = sym_idx * _KEY_SHIFT + when
+        pos = np.searchsorted(bars['close_key'], target, side='right') - 1
+        valid = pos >= 0
+        pos = np.clip(pos, 0, None)
+        same_symbol = (bars['key'][pos] // _KEY_SHIFT) == sym_idx
+        return np.where(valid & same_symbol, bars['close'][pos], np.nan)
+
+    def _exit_price(self, bars, sym_idx, ts, seconds, now):
+        """구간 청산가: ts + seconds 까지 시작한 마지막 봉의 종가 (알림 이후 시작한 봉만)
+
+        알림 당일 일봉은 알림 전 시세를 포함하므로 쓰지 않음 -> 1d 는 다음 세션 종가.
+        구간 안에 새로 시작한 봉이 없으면(주말 등) 알림 뒤 첫 봉, 아직 안 끝났거나
+        봉이 빠져 있으면 NaN (미평가로 남아 다음 평가 때 다시 시도)
+        """
+        n = len(ts)
+        if bars['key'].size == 0:
+            return np.full(n, np.nan)
+        base = sym_idx * _KEY_SHIFT
+        first_after = np.searchsorted(bars['key'], base + ts, side='right')
+        by_horizon = np.searchsorted(bars['key'], base + ts + seconds, side='right') - 1
+        pos = np.maximum(first_after, by_horizon)
+        valid = pos < bars['key'].size
+        pos = np.clip(pos, 0, bars['key'].size - 1)
+        valid &= (bars['key'][pos] // _KEY_SHIFT) == sym_idx
+        valid &= bars['close_key'][pos] <= base + int(now)  # 진행 중인 봉 제외
+        return np.where(valid, bars['close'][pos], np.nan)
+
+    @staticmethod
+    def _window(bars, first, last, max_bars):
+        """봉 위치 [first, last) 에서 최대 max_bars 개 -> (mask, highs, lows) 2차원 창"""
+        window = first[:, None] + np.arange(max_bars)[None, :]
+        mask = window < last[:, None]
+        if bars['key'].size == 0:
+            nan = np.full(mask.shape, np.nan)
+            return mask & False, nan, nan
+        window = np.clip(window, 0, bars['key'].size - 1)
+        return mask, np.where(mask, bars['high'][window], np.nan), np.where(mask, bars['low'][window], np.nan)
+
+    def _excursion(self, daily, hourly, sym_idx, ts, entry, records, now, max_bars=8, max_hourly=16):
+        """MFE/MAE + 목표/손절 도달 (알림 이후 시세만)
+
+        알림 당일 일봉은 고가/저가에 알림 전 움직임이 섞이므로, 당일은 알림 이후 시작한
+        시간봉으로 보고 일봉은 알림 뒤 처음 시작하는 봉부터 봄
+        """
+        n = len(ts)
+        nan = np.full(n, np.nan)
+        if daily['key'].size == 0 and hourly['key'].size == 0:
+            return {'mfe': nan, 'mae': nan, 'hit_target': np.zeros(n, bool), 'hit_stop': np.zeros(n, bool)}
+
+        base = sym_idx * _KEY_SHIFT
+        window_end = base + ts + EXCURSION_WINDOW
+
+        # 일봉: 알림 뒤 처음 시작하는 봉 ~ 구간 끝
+        d_first = np.searchsorted(daily['key'], base + ts, side='right')
+        d_last = np.searchsorted(daily['key'], window_end, side='right')
+        d_mask, d_highs, d_lows = self._window(daily, d_first, d_last, max_bars)
+
+        # 시간봉: 알림 시각 이후 시작 ~ 다음 일봉 시작 전 (당일 나머지)
+        if daily['key'].size:
+            next_day = daily['key'][np.clip(d_first, 0, daily['key'].size - 1)]
+            next_day = np.where((d_first < daily['key'].size) & (next_day // _KEY_SHIFT == sym_idx),
+                                next_day, window_end)
+        else:
+            next_day = window_end
+        h_first = np.searchsorted(hourly['key'], base + ts, side='left')
+        h_last = np.searchsorted(hourly['key'], next_day, side='left')
+        h_mask, h_highs, h_lows = self._window(hourly, h_first, h_last, max_hourly)
+
+        # 시간 순서대로 (당일 시간봉 -> 이후 일봉) 이어붙임
+        mask = np.concatenate([h_mask, d_mask], axis=1)
+        highs = np.concatenate([h_highs, d_highs], axis=1)
+        lows = np.concatenate([h_lows, d_lows], axis=1)
+        width = mask.shape[1]
+        has_bars = mask.any(axis=1) & (entry > 0) & (ts + EXCURSION_WINDOW <= now)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            max_high = np.nanmax(np.where(mask, highs, -np.inf), axis=1)
+            min_low = np.nanmin(np.where(mask, lows, np.inf), axis=1)
+            mfe = np.where(has_bars, (max_high / entry - 1) * 100, np.nan)
+            mae = np.where(has_bars, (min_low / entry - 1) * 100, np.nan)
+
+            target = np.array([r.get('target_price') or 0 for r in records], dtype=np.float64)
+            stop = np.array([r.get('stop_loss') or 0 for r in records], dtype=np.float64)
+
+            target_hits = mask & (highs >= target[:, None]) & (target[:, None] > 0)
+            stop_hits = mask & (lows <= stop[:, None]) & (stop[:, None] > 0)
+
+        # 같은 봉에서 둘 다 닿으면 손절 우선 (보수적)
+        first_target = np.where(target_hits.any(axis=1), target_hits.argmax(axis=1), width)
+        first_stop = np.where(stop_hits.any(axis=1), stop_hits.argmax(axis=1), width)
+
+        return {
+            'mfe': mfe,
+            'mae': mae,
+            'hit_target': has_bars & (first_target < first_stop),
+            'hit_stop': has_bars & (first_stop <= first_target) & (first_stop < width),
+        }
+
+    @staticmethod
+    def summarize(result, by):
+        """trigger_type / score_bucket 별 집계"""
+        groups = result[by]
+        summary = {}
+        for group in np.unique(groups):
+            mask = groups == group
+            mfe = result['mfe'][mask]
+            evaluated = ~np.isnan(mfe)
+            row = {
+                'count': int(mask.sum()),
+                'evaluated': int(evaluated.sum()),
+                'success_rate': float(np.mean(mfe[evaluated] >= SUCCESS_PCT) * 100) if evaluated.any() else 0.0,
+                'target_rate': float(result['hit_target'][mask][evaluated].mean() * 100) if evaluated.any() else 0.0,
+                'stop_rate': float(result['hit_stop'][mask][evaluated].mean() * 100) if evaluated.any() else 0.0,
+            }
+            for label, values in result['returns'].items():
+                values = values[mask]
+                values = values[~np.isnan(values)]
+                row[f'mean_{label}'] = float(values.mean()) if values.size else None
+                row[f'median_{label}'] = float(np.median(values)) if values.size else None
+            summary[str(group)] = row
+        return summary
+
+
+class RunningStat:
+    """건수/합계/적중 + 수익률 히스토그램 (중앙값 근사)"""
+
+    __slots__ = ('n', 'total', 'hits', 'hist')
+
+    def __init__(self, n=0, total=0.0, hits=0, hist=None):
+        self.n = n
+        self.total = total
+        self.hits = hits
+        self.hist = hist if hist is not None else np.zeros(HIST_MAX - HIST_MIN + 1, dtype=np.int64)
+
+    def add(self, values, hits):
+        if values.size == 0:
+            return
+        self.n += int(values.size)
+        self.total += float(values.sum())
+        self.hits += int(hits.sum())
+        bins = np.clip(np.floor(values) - HIST_MIN, 0, self.hist.size - 1).astype(np.int64)
+        np.add.at(self.hist, bins, 1)
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else 0.0
+
+    @property
+    def median(self):
+        if not self.n:
+            return 0.0
+        return float(np.searchsorted(np.cumsum(self.hist), (self.n + 1) / 2) + HIST_MIN) + 0.5
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.n * 100 if self.n else 0.0
+
+
+class RunningAggregates:
+    """(전체/트리거/점수 구간) x 지표별 누적 통계 - 새로 평가된 값만 더함"""
+
+    def __init__(self):
+        self.stats = {}  # (kind, group, metric) -> RunningStat
+        self.dirty = set()
+
+    def add(self, metric, trigger_types, buckets, values, hits):
+        for kind, groups in (('all', None), ('trigger', trigger_types), ('score', buckets)):
+            if groups is None:
+                self._stat(kind, 'all', metric).add(values, hits)
+                continue
+            for group in np.unique(groups):
+                mask = groups == group
+                self._stat(kind, str(group), metric).add(values[mask], hits[mask])
+
+    def _stat(self, kind, group, metric):
+        key = (kind, group, metric)
+        if key not in self.stats:
+            self.stats[key] = RunningStat()
+        self.dirty.add(key)
+        return self.stats[key]
+
+    def get(self, kind, group, metric):
+        return self.stats.get((kind, group, metric))
+
+    def groups(self, kind):
+        return sorted({g for k, g, _ in self.stats if k == kind})
+
+    def load(self, rows):
+        for kind, group, metric, n, total, hits, hist in rows:
+            self.stats[(kind, group, metric)] = RunningStat(
+                n, total, hits, np.frombuffer(hist, dtype=np.int64).copy() if hist else None
+            )
+
+    def dump_dirty(self):
+        rows = [(*key, s.n, s.total, s.hits, s.hist.tobytes())
+                for key, s in ((k, self.stats[k]) for k in self.dirty)]
+        self.dirty.clear()
+        return rows
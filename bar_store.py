@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""로컬 OHLCV 봉 저장소
+
+심볼/주기별 파일 하나에 컬럼 블록(ts, open, high, low, close, volume)을 두고
+각 블록 끝에 새 봉을 추가 기록함. 읽을 때는 파일을 mmap 해서 컬럼마다
+연속된 NumPy 배열로 복사 없이 사용함. 블록이 차면 용량을 두 배로 늘려 재작성.
+이미 조회한 구간은 .json 메타에 기록해 빠진 구간만 yfinance 에서 받아옴.
+
+파일 구조: [n_rows int64][capacity int64] + 컬럼별 capacity x 8바이트 블록
+"""
+import json
+import logging
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (('ts', np.int64), ('open', np.float64), ('high', np.float64),
+           ('low', np.float64), ('close', np.float64), ('volume', np.float64))
+
+BAR_SECONDS = {'1d': 86400, '60m': 3600, '5m': 300}
+
+# 마지막 조회 이후 이 시간이 지나야 꼬리 구간을 다시 받음 (진행 중인 봉 갱신용)
+REFETCH_AFTER = {'1d': 3600, '60m': 600, '5m': 120}
+
+# 조회 결과가 비었던 심볼(상장폐지 등)은 이 시간 동안 다시 받지 않음
+# (일시적 레이트 리밋도 빈 결과로 오므로 조회 구간으로 기록하지 않고 짧게만 건너뜀)
+EMPTY_RETRY = 6 * 3600
+
+_HEADER = 16
+_ITEM = 8
+_MIN_CAPACITY = 256
+
+
+def epoch_seconds(index):
+    """pandas DatetimeIndex -> epoch 초 (int64)"""
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index.values.astype('datetime64[s]').astype(np.int64)
+
+
+def _day(ts):
+    """epoch 초 -> yf.download 날짜 문자열"""
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+
+
+class BarStore:
+    def __init__(self, root, max_open=512):
+        self.root = root
+        # (symbol, interval) -> {col: ndarray}, mmap 마다 fd 를 잡으므로 LRU 로 개수 제한
+        self._maps = OrderedDict()
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.fetched_bars = 0
+
+    # === 경로/메타 ===
+
+    def _path(self, symbol, interval, ext='bars'):
+        return os.path.join(self.root, interval, f"{symbol.replace('/', '_')}.{ext}")
+
+    def _meta(self, symbol, interval):
+        try:
+            with open(self._path(symbol, interval, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta(self, symbol, interval, meta):
+        path = self._path(symbol, interval, 'json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    # === 읽기 (mmap) ===
+
+    def _columns(self, symbol, interval):
+        key = (symbol, interval)
+        cols = self._maps.get(key)
+        if cols is not None:
+            self._maps.move_to_end(key)
+            return cols
+
+        try:
+            with open(self._path(symbol, interval), 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        n_rows, capacity = np.frombuffer(buf, dtype=np.int64, count=2)
+        cols = {}
+        for i, (name, dtype) in enumerate(COLUMNS):
+            offset = _HEADER + i * int(capacity) * _ITEM
+            cols[name] = np.frombuffer(buf, dtype=dtype, count=int(n_rows), offset=offset)
+
+        self._maps[key] = cols
+        if len(self._maps) > self.max_open:
+            self._maps.popitem(last=False)
+        return cols
+
+    def read(self, symbol, interval='1d', start=None, end=None):
+        """[start, end] 구간 봉 (dict of ndarray, 복사 없는 mmap 슬라이스)"""
+        cols = self._columns(symbol, interval)
+        if cols is None:
+            return None
+        ts = cols['ts']
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='right'))
+        return {name: col[lo:hi] for name, col in cols.items()}
+
+    def get(self, symbol, interval='1d'):
+        """백테스트 엔진용 (ts, open, high, low, close) 튜플"""
+        bars = self.read(symbol, interval)
+        if bars is None or len(bars['ts']) == 0:
+            return None
+        return bars['ts'], bars['open'], bars['high'], bars['low'], bars['close']
+
+    # === 쓰기 (추가 전용, 진행 중인 마지막 봉만 덮어씀) ===
+
+    def append(self, symbol, interval, bars):
+        """bars: dict of ndarray (ts 오름차순) -> 새로 추가된 봉 수"""
+        if len(bars['ts']) == 0:
+            return 0
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with self._lock:
+            self._maps.pop((symbol, interval), None)
+            n_rows, capacity, first_ts, last_ts = 0, 0, None, None
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    n_rows, capacity = np.frombuffer(f.read(_HEADER), dtype=np.int64)
+                    n_rows, capacity = int(n_rows), int(capacity)
+                    if n_rows:
+                        f.seek(_HEADER)
+                        first_ts = int(np.frombuffer(f.read(_ITEM), dtype=np.int64)[0])
+                        f.seek(_HEADER + (n_rows - 1) * _ITEM)
+                        last_ts = int(np.frombuffer(f.read(_ITEM), dtype=np.int64)[0])
+
+            ts = np.asarray(bars['ts'], dtype=np.int64)
+            if first_ts is not None and ts[0] < first_ts:
+                # 앞쪽 구간 보강은 드물어서 전체 재작성으로 처리
+                return self._rewrite(symbol, interval, bars)
+
+            keep = ts >= last_ts if last_ts is not None else np.ones(len(ts), bool)
+            if not keep.any():
+                return 0
+            overwrite_last = last_ts is not None and ts[keep][0] == last_ts
+            pos = n_rows - 1 if overwrite_last else n_rows
+            count = int(keep.sum())
+
+            if pos + count > capacity:
+                return self._rewrite(symbol, interval, bars)
+
+            with open(path, 'r+b') as f:
+                for i, (name, dtype) in enumerate(COLUMNS):
+                    f.seek(_HEADER + (i * capacity + pos) * _ITEM)
+                    f.write(np.asarray(bars[name], dtype=dtype)[keep].tobytes())
+                # 데이터를 먼저 쓰고 행 수를 마지막에 갱신 (중간에 죽어도 기존 행은 온전)
+                f.seek(0)
+                f.write(np.int64(pos + count).tobytes())
+            return count - int(overwrite_last)
+
+    def _load_all(self, symbol, interval):
+        try:
+            with open(self._path(symbol, interval), 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return None
+        n_rows, capacity = (int(v) for v in np.frombuffer(raw, dtype=np.int64, count=2))
+        return {name: np.frombuffer(raw, dtype=dtype, count=n_rows, offset=_HEADER + i * capacity * _ITEM)
+                for i, (name, dtype) in enumerate(COLUMNS)}
+
+    def _rewrite(self, symbol, interval, bars):
+        """기존 + 신규 병합 후 용량을 늘려 새 파일로 교체 (같은 시각은 신규 값 우선)"""
+        existing = self._load_all(symbol, interval)
+        old_rows = len(existing['ts']) if existing is not None else 0
+        merged = {}
+        for name, dtype in COLUMNS:
+            parts = [np.asarray(bars[name], dtype)]
+            if existing is not None:
+                parts.append(existing[name])
+            merged[name] = np.concatenate(parts)
+        _, order = np.unique(merged['ts'], return_index=True)  # 첫 등장(신규) 우선
+        n_rows = len(order)
+        capacity = max(_MIN_CAPACITY, 1 << (2 * n_rows - 1).bit_length())
+
+        path = self._path(symbol, interval)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(np.array([n_rows, capacity], dtype=np.int64).tobytes())
+            for name, dtype in COLUMNS:
+                block = np.zeros(capacity, dtype=dtype)
+                block[:n_rows] = merged[name][order]
+                f.write(block.tobytes())
+        os.replace(path + '.tmp', path)
+        return n_rows - old_rows
+
+    # === 빠진 구간 조회 ===
+
+    def missing_range(self, symbol, interval, start, end, now=None):
+        """이미 조회한 구간 밖의 (start, end) 또는 None"""
+        now = now or time.time()
+        meta = self._meta(symbol, interval)
+        if now - meta.get('empty_at', 0) < EMPTY_RETRY:
+            return None
+        fetched_from, fetched_until = meta.get('from'), meta.get('until')
+        if fetched_from is None:
+            return start, end
+
+        gap_start, gap_end = None, None
+        if start < fetched_from:
+            gap_start, gap_end = start, fetched_from
+        if end > fetched_until and now - fetched_until > REFETCH_AFTER[interval]:
+            # 마지막 봉(진행 중일 수 있음)부터 다시
+            gap_start = gap_start if gap_start is not None else fetched_until - BAR_SECONDS[interval]
+            gap_end = end
+        return (gap_start, gap_end) if gap_start is not None else None
+
+    def ensure(self, symbols, start, end, interval='1d', chunk=200):
+        """빠진 구간이 있는 심볼만 모아 yf.download 로 일괄 조회 후 저장
+
+        yf.download 는 날짜 단위로 받으므로 빠진 구간의 (시작일, 종료일) 이 같은 심볼끼리 묶어 조회
+        (꼬리만 빠진 종목이 새 종목의 전체 구간을 같이 받지 않도록)
+        """
+        now = time.time()
+        end = min(end, now)
+        groups = {}
+        for symbol in symbols:
+            gap = self.missing_range(symbol, interval, start, end, now)
+            if gap:
+                key = (_day(gap[0]), _day(gap[1]))
+                group = groups.setdefault(key, [gap[0], gap[1], []])
+                group[0], group[1] = min(group[0], gap[0]), max(group[1], gap[1])
+                group[2].append(symbol)
+        if not groups:
+            return 0
+
+        total = 0
+        for fetch_start, fetch_end, targets in groups.values():
+            targets.sort()
+            total += len(targets)
+            for i in range(0, len(targets), chunk):
+                self._download(targets[i:i + chunk], fetch_start, fetch_end, interval, now)
+        return total
+
+    def _download(self, batch, start, end, interval, now):
+        try:
+            frame = yf.download(
+                batch,
+                start=_day(start),
+                end=(datetime.fromtimestamp(end) + timedelta(days=1)).strftime('%Y-%m-%d'),
+                interval=interval,
+                group_by='ticker',
+                auto_adjust=False,
+                progress=False,
+                threads=True
+            )
+            self.fetches += 1
+        except Exception as e:
+            logger.warning(f"봉 데이터 조회 실패 ({interval}, {len(batch)}종목): {e}")
+            return
+
+        for symbol in batch:
+            try:
+                data = frame[symbol] if len(batch) > 1 else frame
+                if data.columns.nlevels > 1:
+                    data = data.droplevel(-1, axis=1)
+                data = data.dropna(subset=['Close'])
+                os.makedirs(os.path.dirname(self._path(symbol, interval)), exist_ok=True)
+                meta = self._meta(symbol, interval)
+                if data.empty:
+                    # yfinance 는 레이트 리밋/일시 오류도 NaN 열로 돌려주므로 조회 구간으로 기록하지 않음
+                    meta['empty_at'] = now
+                    self._save_meta(symbol, interval, meta)
+                    continue
+
+                self.fetched_bars += self.append(symbol, interval, {
+                    'ts': epoch_seconds(data.index),
+                    'open': data['Open'].to_numpy(np.float64),
+                    'high': data['High'].to_numpy(np.float64),
+                    'low': data['Low'].to_numpy(np.float64),
+                    'close': data['Close'].to_numpy(np.float64),
+                    'volume': data['Volume'].to_numpy(np.float64),
+                })
+                meta.pop('empty_at', None)
+                meta['from'] = min(meta.get('from', start), start)
+                meta['until'] = max(meta.get('until', end), end)
+                self._save_meta(symbol, interval, meta)
+            except Exception as e:
+                logger.debug(f"봉 저장 실패 ({symbol}): {e}")
+
+    def get_stats(self):
+        return {'fetches': self.fetches, 'fetched_bars': self.fetched_bars, 'open_maps': len(self._maps)}
+
+
+# === 읽기 처리량 벤치마크 ===
+# python bar_store.py [심볼 수] [봉 수]
+
+def _bench(n_symbols=5000, n_bars=252):
+    root = tempfile.mkdtemp(prefix='bars_')
+    store = BarStore(root)
+    day0 = int(time.time()) // 86400 * 86400 - n_bars * 86400
+    rng = np.random.default_rng(0)
+
+    started = time.perf_counter()
+    for i in range(n_symbols):
+        close = 10 * np.cumprod(1 + rng.normal(0, 0.02, n_bars))
+        store.append(f'S{i:05d}', '1d', {
+            'ts': day0 + np.arange(n_bars) * 86400,
+            'open': close, 'high': close * 1.01, 'low': close * 0.99,
+            'close': close, 'volume': rng.integers(1e5, 1e7, n_bars).astype(np.float64),
+        })
+    print(f"쓰기: {n_symbols}종목 x {n_bars}봉 {time.perf_counter() - started:.2f}s")
+
+    for label in ('cold', 'warm'):
+        if label == 'cold':
+            store._maps.clear()
+        started = time.perf_counter()
+        total = 0.0
+        for i in range(n_symbols):
+            bars = store.read(f'S{i:05d}', '1d')
+            total += float(bars['close'].sum()) + float(bars['volume'][-1])
+        elapsed = time.perf_counter() - started
+        nbytes = n_symbols * n_bars * 8 * len(COLUMNS)
+        print(f"읽기({label}): {elapsed:.3f}s, {n_symbols / elapsed:,.0f} 종목/s, "
+              f"{n_symbols * n_bars / elapsed:,.0f} 봉/s, {nbytes / elapsed / 1e6:,.0f} MB/s")
+
+
+if __name__ == '__main__':
+    _bench(*(int(a) for a in sys.argv[1:3]))
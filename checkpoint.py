@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import os
+import pickle
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpointer:
+    """재시작 후에도 중복 알림/재분석이 없도록 메모리 상태를 파일 하나에 주기적으로 저장
+
+    등록 대상: set/dict 또는 dump()/load() 를 가진 객체 (TTLMap 등)
+    저장: pickle + zlib, 임시 파일에 쓰고 fsync 후 os.replace (중간에 죽어도 이전 파일 유지)
+    """
+
+    def __init__(self, path, interval=60):
+        self.path = path
+        self.interval = interval
+        self.targets = {}  # name -> 객체
+
+        self.last_save = time.monotonic()
+        self.saves = 0
+        self.bytes = 0
+        self.restore_ms = 0.0
+        self.restored = 0
+        self.suppressed = 0  # 복구된 상태 덕분에 막힌 재알림 수
+
+    def register(self, name, target):
+        self.targets[name] = target
+
+    # === 저장 ===
+
+    def _snapshot(self):
+        """이벤트 루프 안에서 상태 복사 (직렬화/쓰기는 스레드에서)"""
+        state = {}
+        for name, target in self.targets.items():
+            try:
+                if isinstance(target, set):
+                    state[name] = list(target)
+                elif isinstance(target, dict):
+                    state[name] = dict(target)
+                else:
+                    state[name] = target.dump()
+            except Exception as e:
+                logger.debug(f"체크포인트 수집 실패 ({name}): {e}")
+        return {'saved_at': time.time(), 'state': state}
+
+    def _write(self, snapshot):
+        data = zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        return len(data)
+
+    async def save(self):
+        try:
+            self.bytes = await asyncio.to_thread(self._write, self._snapshot())
+            self.saves += 1
+        except Exception as e:
+            logger.error(f"체크포인트 저장 실패: {e}")
+        self.last_save = time.monotonic()
+
+    async def maybe_save(self):
+        if time.monotonic() - self.last_save >= self.interval:
+            await self.save()
+
+    # === 복구 ===
+
+    def restore(self):
+        """시작 시 1회 (파일이 없거나 깨졌으면 빈 상태로 시작)"""
+        started = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning(f"⚠️ 체크포인트 손상, 빈 상태로 시작: {e}")
+            return 0
+
+        elapsed = max(0.0, time.time() - snapshot['saved_at'])
+        for name, value in snapshot['state'].items():
+            target = self.targets.get(name)
+            if target is None:
+                continue
+            try:
+                if isinstance(target, (set, dict)):
+                    target.update(value)
+                else:
+                    target.load(value, elapsed)
+                self.restored += len(value)
+            except Exception as e:
+                logger.debug(f"체크포인트 복구 실패 ({name}): {e}")
+
+        self.restore_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"♻️ 상태 복구: {self.restored}개 항목, {self.restore_ms:.1f}ms "
+                    f"({elapsed / 60:.0f}분 전 저장)")
+        return self.restored
+
+    def get_stats(self):
+        return {
+            'saves': self.saves,
+            'bytes': self.bytes,
+            'restored': self.restored,
+            'restore_ms': round(self.restore_ms, 1),
+            'suppressed_realerts': self.suppressed,
+        }
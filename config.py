@@ -20,7 +20,7 @@ class Config:
     
     # 필터 설정
     MIN_MARKET_CAP = 10_000_000
-    MAX_MARKET_CAP = 100_000_000_000_000
+    MAX_MARKET_CAP = 200_000_000_000  # 초대형주(2,000억 달러 초과)는 급등 알림 대상 아님
     
     MIN_PRICE = 0.3
     MAX_PRICE = 5000.0
@@ -151,8 +151,118 @@ class Config:
         '거래정지', '상장폐지', '분식회계'
     ]
 
-    REDDIT_MIN_MENTIONS = 10
+    # 데이터 저장 경로 (알림 이력 등)
+    DATA_DIR = os.getenv('DATA_DIR', '/mnt/user-data/outputs')
+    
+    # 백테스팅 (증분 평가 + 일일 리포트)
+    BACKTEST_UPDATE_INTERVAL = 3600  # 증분 평가 주기 (초)
+    BACKTEST_REPORT_HOUR = 8         # 일일 리포트 전송 시각 (KST)
+    
+    # 세션 달력 (휴장/장외 시간에는 다음 세션까지 대기)
+    SESSION_MAX_SLEEP = 900  # 한 번에 자는 최대 시간 (백테스트/체크포인트 주기 유지용, 초)
+    
+    # 이벤트 루프 모니터
+    LOOP_LAG_THRESHOLD = 0.25  # 이 이상 루프가 멈추면 스택 캡처 (초)
+    LOOP_MONITOR_DEBUG = os.getenv('LOOP_MONITOR_DEBUG') == '1'  # 블로킹 호출 감지
+    METRICS_LOG_INTERVAL = 10  # N 사이클마다 지표 로그
+
+    # 텔레그램 전송 큐
+    TELEGRAM_API_BASE = os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org')  # 목 서버 테스트용
+    TELEGRAM_URGENT_SCORE = 9       # 이 점수 이상은 묶지 않고 즉시 전송
+    TELEGRAM_DIGEST_WINDOW = 60     # 연달아 들어온 일반 알림을 모으는 시간 (초)
+    TELEGRAM_GLOBAL_RATE = 30       # 봇 전체 초당 전송 한도
+    TELEGRAM_CHAT_RATE = 1.0        # 채팅방별 초당 전송 한도
+    TELEGRAM_MAX_RETRIES = 5
+    TELEGRAM_SEND_WORKERS = 8       # 동시 전송 워커 수 (다수 구독자 팬아웃)
+
+    # 중복 알림 방지 (TTL)
+    ALERT_COOLDOWN_US = 14400   # 4시간
+    ALERT_COOLDOWN_KR = 7200    # 2시간
+    NEWS_DEDUP_TTL = 86400      # 같은 뉴스 링크 재알림 방지
+    DEDUP_MAX_SIZE = 50_000     # TTL 맵당 최대 키 수
+
+    # 캐시 + 재시작 상태 복구
+    VALIDATOR_CACHE_TTL = 1800  # 옵션/다크풀 검증 결과 재사용 (초)
+    AI_CACHE_TTL = 3600         # 같은 신호 AI 분석 재사용 (초)
+    NEWS_CACHE_TTL = 86400      # 뉴스 본문 URL 캐시 (초)
+    NEWS_MAX_BYTES = 512 * 1024 # 기사 하나에서 받을 최대 바이트
+    NEWS_MAX_CHARS = 3000       # 이만큼 문단이 모이면 수신 중단 (AI 입력 한계)
+    CHECKPOINT_INTERVAL = 60    # 상태 저장 주기 (초)
+
+    # SEC EDGAR 공시 피드 (Form 4 / 13D / 13G 공용)
+    SEC_USER_AGENT = os.getenv('SEC_USER_AGENT', 'StockAlertBot/1.0 (contact@example.com)')  # SEC 요구사항: 연락처 포함
+    SEC_BASE = os.getenv('SEC_BASE', 'https://www.sec.gov')  # 목 서버 테스트용
+    SEC_TICKERS_URL = 'https://www.sec.gov/files/company_tickers.json'  # CIK -> 티커 (하루 한 번 갱신)
+    SEC_RATE_LIMIT = 10         # SEC 공정 접근 한도 (초당 요청)
+    EDGAR_POLL_INTERVAL = 30    # 피드 조회 최소 간격 (초)
+    EDGAR_MAX_PAGES = 10        # 양식별 최대 페이지 (100건씩, 마지막으로 본 공시까지)
+    # 2024년 12월 이후 대량 지분 공시는 'SCHEDULE 13D/G' 양식명으로도 접수됨
+    INSIDER_FORMS = ['4', '4/A']
+    WHALE_FORMS = ['SC 13D', 'SC 13D/A', 'SC 13G', 'SC 13G/A',
+                   'SCHEDULE 13D', 'SCHEDULE 13D/A', 'SCHEDULE 13G', 'SCHEDULE 13G/A']
+    INSIDER_MIN_PURCHASE_USD = 100_000  # 이 금액 이상 장내 매수(코드 P)만 알림
+    INSIDER_CLUSTER_DAYS = 14           # 같은 발행사 여러 내부자 매수를 묶는 기간
+    INSIDER_FETCH_CONCURRENCY = 5       # Form 4 원문 동시 조회 수
+    INSIDER_FETCH_RETRIES = 5           # 원문 조회 실패 시 다음 scan 에서 다시 시도할 횟수 (6시간 기한은 그대로)
+    # getcurrent 의 type 은 접두어 일치라 '/A' 정정 공시도 원 양식 피드에 함께 옴 (구독 쪽 양식 목록으로 거름)
+    EDGAR_FORMS = ['4', 'SC 13D', 'SC 13G', 'SCHEDULE 13D', 'SCHEDULE 13G']
+
+    # 급등 테이블 (야후 gainers / pre-market)
+    PRICE_SCAN_PAGES = 4          # 25개씩 몇 페이지까지 동시에 볼지
+    PRICE_PAGE_SIZE = 25
+    PRICE_ACCEL_MIN = 0.5         # 등락률 가속 (%p / 분)
+    PRICE_VOLUME_ACCEL = 2.0      # 분당 거래량이 직전 구간의 몇 배
+    PRICE_RANK_JUMP = 10          # 순위 상승 폭
+    PRICE_SIGNAL_COOLDOWN = 900   # 같은 종목 가속 신호 재알림 간격 (초)
+    PRICE_HISTORY_MAX_GAP = 600   # 직전 스냅샷이 이보다 오래됐으면 이력 초기화 (초)
+
+    # 시간대별 상대 거래량 (20거래일 5분봉 기준선, 장 마감 후 재계산)
+    RVOL_DAYS = 20
+    RVOL_BUCKET_MINUTES = 5
+    RVOL_BUILD_HOUR = 18              # 이 시각(ET) 이후 하루 한 번 재계산
+    RVOL_MAX_SYMBOLS = 3000
+    RVOL_MIN = 2.0                    # 기준선이 있는 종목은 고정 거래대금 대신 이 RVOL 이상
+    RVOL_MIN_TRADE_VALUE = 1_000_000  # RVOL 로 판정할 때도 지키는 최소 거래대금 ($)
+
+    # 숏스퀴즈 (공매도 테이블은 하루 한 번, 점수는 매 스캔)
+    SQUEEZE_SCREEN_FILTER = 'sh_short_o10'  # 테이블에 담을 종목 (공매도 10% 이상)
+    FINVIZ_CONCURRENCY = 3
+    SQUEEZE_MIN_SHORT_FLOAT = 20
+    SQUEEZE_MIN_CHANGE = 3.0
+    SQUEEZE_MIN_SCORE = 5.0
+    SQUEEZE_QUOTE_MAX_AGE = 300  # 이보다 오래된 시세는 결합하지 않음 (초)
+
+    # 종목 유니버스 (하루 한 번 갱신, 스캐너 알림 직후 적격성 필터: MIN/MAX_MARKET_CAP, MIN/MAX_PRICE)
+    NASDAQ_TRADER_BASE = os.getenv('NASDAQ_TRADER_BASE', 'https://www.nasdaqtrader.com/dynamic/SymDir')
+    NASDAQ_SCREENER_URL = os.getenv('NASDAQ_SCREENER_URL',
+                                    'https://api.nasdaq.com/api/screener/stocks?tableonly=true&download=true')
+    UNIVERSE_ALLOWED_TYPES = ['COMMON', 'ADR']  # 워런트/유닛/권리/우선주/채권/ETF 제외
+
+    # 감시 목록 모드 (지정 종목 배치 시세 + 벡터 판정, MIN_PRICE_CHANGE / MIN_VOLUME_INCREASE 기준)
+    WATCHLIST_FILE = os.path.join(DATA_DIR, 'watchlist.txt')  # 한 줄에 한 종목
+    WATCHLIST_SYMBOLS = os.getenv('WATCHLIST_SYMBOLS', '')     # 쉼표 구분 (파일과 합침)
+    WATCHLIST_SOURCE = os.getenv('WATCHLIST_SOURCE', 'yahoo')  # 'yahoo' | 'stub'
+    WATCHLIST_QUOTE_MAX_AGE = 300   # 이보다 오래된 시세는 판정에서 제외 (초)
+    WATCHLIST_COOLDOWN = 3600       # 같은 종목 재알림 간격 (초)
+
+    # 한국 스캐너
+    KR_FETCH_CONCURRENCY = 6  # 네이버 금융 동시 연결 수
+    KR_SCAN_PAGES = 2         # 거래량 상위/상승 순위를 시장별로 몇 페이지까지 볼지
+
+    REDDIT_MIN_MENTIONS = 10          # 기준선이 쌓이기 전(시작 후 3시간)에만 쓰는 고정 기준
+    REDDIT_WINDOW_HOURS = 24          # 언급 수 슬라이딩 윈도우 길이
+    REDDIT_MIN_RECENT_MENTIONS = 5    # 최근 1시간 최소 언급 수
+    REDDIT_MIN_ZSCORE = 3.0           # 종목 자신의 시간대별 분포 대비 z-score
+    REDDIT_MIN_VELOCITY = 3.0         # 평소 시간당 언급 대비 배수
     REDDIT_SUBREDDITS = ['wallstreetbets', 'stocks', 'investing', 'pennystocks']
+    REDDIT_BASE = os.getenv('REDDIT_BASE', 'https://www.reddit.com')  # 목 서버 테스트용
+    
+    # 토론 스레드 댓글 수집 (데일리 / What Are Your Moves)
+    REDDIT_COMMENTS_ENABLED = True
+    REDDIT_COMMENT_SUBREDDIT = 'wallstreetbets'
+    REDDIT_THREAD_PATTERN = r'daily discussion|what are your moves|weekend discussion'
+    REDDIT_THREAD_REFRESH = 600       # 스레드 목록 재확인 간격 (초)
+    REDDIT_COMMENT_LIMIT = 500        # 스레드당 요청 댓글 수 (최신순)
 
 try:
     Config.validate()
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+import numpy as np
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    parse_mode TEXT,
+    urgent INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+MAX_MESSAGE_LEN = 4096  # Telegram sendMessage 한도
+DIGEST_SEPARATOR = "\n\n━━━━━━━━━━\n\n"
+
+
+class Delivery:
+    """전송 단위 (요약 메시지는 원본 여러 건의 row id 를 함께 가짐)"""
+
+    __slots__ = ('chat_id', 'text', 'parse_mode', 'urgent', 'row_ids', 'created', 'attempts')
+
+    def __init__(self, chat_id, text, parse_mode, urgent, row_ids, created):
+        self.chat_id = chat_id
+        self.text = text
+        self.parse_mode = parse_mode
+        self.urgent = urgent
+        self.row_ids = row_ids
+        self.created = created  # 가장 오래된 원본의 적재 시각 (epoch 초)
+        self.attempts = 0
+
+
+class DeliveryQueue:
+    """텔레그램 전송 큐 (SQLite 영속화 + 토큰 버킷 + 재시도 + 저긴급 알림 묶음 전송)
+
+    - urgent 메시지(점수 9+ 등)는 바로 전송 대기열로
+    - 그 외는 digest_window 초 안에 연달아 들어오면 모았다가 채팅방별로 한 메시지로 합침
+    - 429 는 retry_after 만큼 해당 채팅방 버킷을 멈춘 뒤 재시도
+    - 5xx/네트워크 오류는 지수 백오프, max_attempts 초과 시 폐기
+    - 전송 완료/폐기된 건만 DB 에서 삭제하므로 재시작 시 미전송분 복구
+    """
+
+    def __init__(self, bot, db_path, global_rate=30, chat_rate=1.0, group_rate=20 / 60,
+                 digest_window=60, max_attempts=5, backoff_base=1.0, workers=4):
+        self.bot = bot
+        self.digest_window = digest_window
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.workers = workers
+
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate    # 그룹/채널 (chat_id 음수) 분당 20건
+        self._chat_buckets = {}
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+        self._ready = asyncio.PriorityQueue()  # (0=긴급/1=일반, 순번, Delivery)
+        self._seq = itertools.count()
+        self._digest = {}                      # chat_id -> [(row_id, text, parse_mode, created)]
+        self._digest_task = None
+        self._last_normal = {}                 # chat_id -> 마지막 일반 메시지 적재 시각 (monotonic)
+        self._tasks = []
+        self._restored = False
+
+        self.latencies = deque(maxlen=2000)    # 적재 -> 전송 완료 (초)
+        self.sent = 0
+        self.coalesced = 0                     # 묶음 전송으로 절약한 메시지 수
+        self.retries = 0
+        self.rate_limited = 0
+        self.drops = Counter()
+
+    # === 적재 ===
+
+    async def send(self, text, urgent=False, chat_id=None, parse_mode='Markdown'):
+        """메시지 적재 (DB 기록 후 반환, 실제 전송은 워커가 담당)"""
+        row_ids = await self.send_many(text, [chat_id or self.bot.chat_id], urgent, parse_mode)
+        return row_ids[0]
+
+    async def send_many(self, text, chat_ids, urgent=False, parse_mode='Markdown'):
+        """같은 메시지를 여러 채팅방에 적재 (한 트랜잭션으로 기록)"""
+        self._restore()  # 복구보다 새 적재가 먼저 DB 에 들어가 중복되는 것 방지
+        chat_ids = [str(c) for c in chat_ids]
+        created = time.time()
+        row_ids = await asyncio.to_thread(self._insert, chat_ids, text, parse_mode, urgent, created)
+        for row_id, chat_id in zip(row_ids, chat_ids):
+            self._enqueue(row_id, chat_id, text, parse_mode, urgent, created)
+        return row_ids
+
+    def _insert(self, chat_ids, text, parse_mode, urgent, created):
+        sql = "INSERT INTO outbox (chat_id, text, parse_mode, urgent, created) VALUES (?, ?, ?, ?, ?)"
+        with self._lock, self._conn:
+            return [self._conn.execute(sql, (chat_id, text, parse_mode, int(urgent), created)).lastrowid
+                    for chat_id in chat_ids]
+
+    def _delete(self, row_ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in row_ids])
+
+    def _enqueue(self, row_id, chat_id, text, parse_mode, urgent, created):
+        if urgent:
+            self._put(Delivery(chat_id, text, parse_mode, True, [row_id], created))
+            return
+
+        # 한동안 조용했으면 바로 보내고, 연달아 들어오는 동안만 모아서 묶음 전송
+        now = time.monotonic()
+        if chat_id not in self._digest and now - self._last_normal.get(chat_id, -self.digest_window) >= self.digest_window:
+            self._last_normal[chat_id] = now
+            self._put(Delivery(chat_id, text, parse_mode, False, [row_id], created))
+            return
+        self._digest.setdefault(chat_id, []).append((row_id, text, parse_mode, created))
+        if self._digest_task is None or self._digest_task.done():
+            self._digest_task = asyncio.create_task(self._flush_digest_later())
+
+    def _put(self, delivery):
+        self._ready.put_nowait((0 if delivery.urgent else 1, next(self._seq), delivery))
+
+    def _restore(self):
+        """재시작 시 미전송 메시지 복구 (최초 1회)"""
+        if self._restored:
+            return
+        self._restored = True
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, chat_id, text, parse_mode, urgent, created FROM outbox ORDER BY id"
+            ).fetchall()
+        for row_id, chat_id, text, parse_mode, urgent, created in rows:
+            self._enqueue(row_id, chat_id, text, parse_mode, bool(urgent), created)
+        if rows:
+            logger.info(f"📮 미전송 메시지 {len(rows)}건 복구")
+
+    # === 묶음 전송 ===
+
+    async def _flush_digest_later(self):
+        await asyncio.sleep(self.digest_window)
+        self.flush_digest()
+
+    def flush_digest(self):
+        """모인 저긴급 메시지를 채팅방별로 합쳐 전송 대기열에 넣음"""
+        pending, self._digest = self._digest, {}
+        for chat_id, items in pending.items():
+            self._last_normal[chat_id] = time.monotonic()
+            for delivery in self._pack(chat_id, items):
+                self._put(delivery)
+
+    def _pack(self, chat_id, items):
+        """4096자 한도 안에서 최대한 합침 (1건이면 원문 그대로)"""
+        if len(items) == 1:
+            row_id, text, parse_mode, created = items[0]
+            return [Delivery(chat_id, text, parse_mode, False, [row_id], created)]
+
+        groups, current, length = [], [], 0
+        for item in items:
+            added = len(item[1]) + len(DIGEST_SEPARATOR)
+            if current and length + added > MAX_MESSAGE_LEN - 100:
+                groups.append(current)
+                current, length = [], 0
+            current.append(item)
+            length += added
+        groups.append(current)
+
+        deliveries = []
+        for group in groups:
+            if len(group) == 1:
+                row_id, text, parse_mode, created = group[0]
+                deliveries.append(Delivery(chat_id, text, parse_mode, False, [row_id], created))
+                continue
+            header = f"📦 **알림 요약 ({len(group)}건)**\n\n"
+            text = header + DIGEST_SEPARATOR.join(item[1] for item in group)
+            deliveries.append(Delivery(
+                chat_id, text[:MAX_MESSAGE_LEN], group[0][2], False,
+                [item[0] for item in group], min(item[3] for item in group)
+            ))
+            self.coalesced += len(group) - 1
+        return deliveries
+
+    # === 전송 워커 ===
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = self.group_rate if chat_id.startswith('-') else self.chat_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, capacity=1)
+        return bucket
+
+    async def run(self):
+        """미전송분 복구 후 전송 워커 실행"""
+        self._restore()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    async def _worker(self):
+        while True:
+            _, _, delivery = await self._ready.get()
+            try:
+                await self._deliver(delivery)
+            except Exception as e:
+                logger.error(f"전송 처리 오류: {e}")
+            finally:
+                self._ready.task_done()
+
+    async def _deliver(self, delivery):
+        chat_bucket = self._chat_bucket(delivery.chat_id)
+        await chat_bucket.acquire()
+        await self.global_bucket.acquire()
+
+        data = {
+            'chat_id': delivery.chat_id,
+            'text': delivery.text,
+            'disable_web_page_preview': True,
+        }
+        if delivery.parse_mode:
+            data['parse_mode'] = delivery.parse_mode
+
+        delivery.attempts += 1
+        try:
+            status, body = await self.bot.call('sendMessage', data)
+        except Exception as e:
+            status, body = None, {'description': str(e)}
+
+        if status == 200:
+            await asyncio.to_thread(self._delete, delivery.row_ids)
+            self.sent += 1
+            self.latencies.append(time.time() - delivery.created)
+            return
+
+        if status == 429:
+            # 재시도 횟수에 포함하지 않고 지정된 시간만큼 대기
+            retry_after = float((body.get('parameters') or {}).get('retry_after', 1))
+            self.rate_limited += 1
+            delivery.attempts -= 1
+            chat_bucket.pause(retry_after)
+            logger.warning(f"⏳ 텔레그램 속도 제한 ({delivery.chat_id}): {retry_after:.0f}초 후 재시도")
+            self._put(delivery)
+            return
+
+        if status == 400 and delivery.parse_mode:
+            # 마크다운 파싱 오류가 대부분 -> 서식 없이 다시 전송
+            logger.warning(f"⚠️ 텔레그램 서식 오류, 일반 텍스트로 재전송: {body.get('description')}")
+            delivery.parse_mode = None
+            self._put(delivery)
+            return
+
+        if status is not None and 400 <= status < 500:
+            await self._drop(delivery, f"http_{status}", body.get('description'))
+            return
+
+        if delivery.attempts >= self.max_attempts:
+            await self._drop(delivery, 'max_attempts', body.get('description'))
+            return
+
+        delay = self.backoff_base * 2 ** (delivery.attempts - 1)
+        self.retries += 1
+        logger.warning(f"🔁 텔레그램 전송 실패 ({status}): {delay:.0f}초 후 재시도 "
+                       f"({delivery.attempts}/{self.max_attempts})")
+        asyncio.get_running_loop().call_later(delay, self._put, delivery)
+
+    async def _drop(self, delivery, reason, description=None):
+        await asyncio.to_thread(self._delete, delivery.row_ids)
+        self.drops[reason] += len(delivery.row_ids)
+        logger.error(f"❌ 텔레그램 메시지 폐기 ({reason}, {len(delivery.row_ids)}건): {description}")
+
+    async def close(self, timeout=10):
+        """모인 메시지를 내보내고 대기열이 빌 때까지 잠시 대기 (남은 건 DB 에 보존)"""
+        self.flush_digest()
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ 미전송 {self._ready.qsize()}건은 다음 실행 때 전송")
+        for task in self._tasks:
+            task.cancel()
+        await self.bot.close()
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self):
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            'sent': self.sent,
+            'queued': self._ready.qsize() + sum(len(v) for v in self._digest.values()),
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'drops': dict(self.drops),
+            'latency_p50_s': round(float(p50), 2),
+            'latency_p95_s': round(float(p95), 2),
+            'latency_p99_s': round(float(p99), 2),
+        }
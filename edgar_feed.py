@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""SEC EDGAR 최신 공시 피드 공용 폴러 (InsiderScanner / WhaleScanner)
+
+스캐너마다 getcurrent 를 따로 부르던 것을 하나로 묶고, 양식별 피드(type=4, SC 13D ...)를
+마지막으로 본 접수번호가 나올 때까지 페이지를 넘겨 읽음.
+바쁜 시간에 다른 양식에 밀려 13D 가 창 밖으로 빠지던 문제를 없애고,
+SEC 공정 접근 한도(초당 10회)는 토큰 버킷으로 지킴.
+"""
+import asyncio
+import bisect
+import logging
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple, Tuple
+import aiohttp
+from lxml import etree
+from config import Config
+from rate_limit import TokenBucket
+from ttl_map import TTLMap
+
+logger = logging.getLogger(__name__)
+
+_ATOM = '{http://www.w3.org/2005/Atom}'
+# 'SC 13D - Icahn Carl C (0000921669) (Filed by)' -> 양식, 이름, CIK, 역할
+_TITLE_RE = re.compile(r'^(.+?) - (.+) \((\d{10})\) \((Subject|Filed by|Issuer|Reporting|Filer)\)\s*$')
+_ACCESSION_TAG = 'accession-number='
+PAGE_SIZE = 100
+
+
+class EdgarEntity(NamedTuple):
+    name: str
+    cik: int
+    role: str                   # Subject / Filed by / Issuer / Reporting / Filer
+
+
+def parse_filing_title(title):
+    """getcurrent 항목 제목 -> EdgarEntity (형식이 다르면 None)"""
+    match = _TITLE_RE.match(title)
+    if not match:
+        return None
+    return EdgarEntity(match.group(2).strip(), int(match.group(3)), match.group(4))
+
+
+class EdgarFiling(NamedTuple):
+    accession: str
+    form: str
+    updated: float              # epoch 초
+    link: str                   # 공시 색인 페이지 (-index.htm)
+    titles: Tuple[str, ...]     # 같은 접수번호의 항목 제목들 (Reporting / Issuer / Subject / Filed by)
+
+    def entities(self, role=None):
+        """제목에서 읽은 관련자 목록 (role 을 주면 그 역할만)"""
+        found = (parse_filing_title(title) for title in self.titles)
+        return [e for e in found if e is not None and (role is None or e.role == role)]
+
+
+def parse_edgar_atom(xml):
+    """getcurrent atom -> ([EdgarFiling], 항목 수)
+
+    한 공시가 관련자마다 한 항목씩 나오므로 접수번호로 묶음 (피드 순서 = 최신순 유지)
+    """
+    root = etree.fromstring(xml)
+    filings = {}
+    entries = root.iterfind(f'{_ATOM}entry')
+    count = 0
+    for entry in entries:
+        count += 1
+        entry_id = entry.findtext(f'{_ATOM}id') or ''
+        accession = entry_id.rpartition(_ACCESSION_TAG)[2]
+        if not accession:
+            continue
+        title = (entry.findtext(f'{_ATOM}title') or '').strip()
+        filing = filings.get(accession)
+        if filing is not None:
+            filings[accession] = filing._replace(titles=filing.titles + (title,))
+            continue
+
+        category = entry.find(f'{_ATOM}category')
+        form = category.get('term') if category is not None else title.partition(' - ')[0]
+        link = entry.find(f'{_ATOM}link')
+        updated = entry.findtext(f'{_ATOM}updated') or ''
+        try:
+            ts = datetime.fromisoformat(updated.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            ts = time.time()
+        filings[accession] = EdgarFiling(accession, form, ts, link.get('href') if link is not None else '', (title,))
+    return list(filings.values()), count
+
+
+class EdgarFeedPoller:
+    """양식별 피드를 읽어 새 공시를 구독자 콜백으로 전달
+
+    poll() 은 여러 스캐너가 동시에 불러도 EDGAR_POLL_INTERVAL 마다 한 번만 실제 조회함.
+    """
+
+    def __init__(self, forms=None, rate=None, max_pages=None, interval=None, base_url=None):
+        self.forms = list(forms or Config.EDGAR_FORMS)
+        self.max_pages = max_pages or Config.EDGAR_MAX_PAGES
+        self.interval = Config.EDGAR_POLL_INTERVAL if interval is None else interval
+        self.url = f"{(base_url or Config.SEC_BASE).rstrip('/')}/cgi-bin/browse-edgar"
+        self.headers = {'User-Agent': Config.SEC_USER_AGENT}
+        self.bucket = TokenBucket(rate or Config.SEC_RATE_LIMIT)
+
+        self.last_seen = {}  # 양식 -> 마지막으로 본 최신 접수번호 (체크포인트 대상)
+        self.seen = TTLMap(3 * 86400, max_size=50_000)  # 여러 피드에 겹쳐 나오는 공시 중복 전달 방지
+        self._subscribers = []  # [(양식 집합, 콜백)]
+        self._lock = asyncio.Lock()
+        self._last_poll = -float('inf')
+
+        self.cycles = 0
+        self.requests = 0
+        self.cycle_requests = 0     # 직전 조회의 요청 수
+        self.dispatched = 0
+        self.gaps = 0               # 최대 페이지까지 읽어도 마지막 공시를 못 찾은 횟수 (누락 가능)
+        self.errors = 0
+
+    def subscribe(self, forms, callback):
+        """forms 양식의 새 공시마다 callback(filing) 호출"""
+        self._subscribers.append((frozenset(forms), callback))
+
+    # === 조회 ===
+
+    async def _fetch(self, session, form, start):
+        params = {
+            'action': 'getcurrent', 'type': form, 'company': '', 'dateb': '',
+            'owner': 'include', 'start': str(start), 'count': str(PAGE_SIZE), 'output': 'atom',
+        }
+        await self.bucket.acquire()
+        self.requests += 1
+        self.cycle_requests += 1
+        async with session.get(self.url, params=params, headers=self.headers, timeout=15) as response:
+            if response.status in (403, 429):
+                # 한도 초과 시 SEC 는 10분 차단을 권고 -> 전체 요청 잠시 중단
+                self.bucket.pause(60)
+                raise RuntimeError(f"SEC 접근 제한 ({response.status})")
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            return await response.read()
+
+    async def _poll_form(self, session, form):
+        """마지막으로 본 접수번호가 나올 때까지 페이지 이어서 읽기 (최신순)"""
+        last = self.last_seen.get(form)
+        # 접수번호 -> 공시 (한 공시의 Subject / Filed by 항목이 페이지 경계에 걸쳐도 제목을 합침)
+        new = {}
+        # 처음(기준 없음)에는 첫 페이지만
+        pages = self.max_pages if last else 1
+        for page in range(pages):
+            filings, count = parse_edgar_atom(await self._fetch(session, form, page * PAGE_SIZE))
+            found = False
+            for filing in filings:
+                if filing.accession == last:
+                    found = True
+                    break
+                merged = new.get(filing.accession)
+                if merged is not None:
+                    filing = merged._replace(titles=merged.titles + filing.titles)
+                new[filing.accession] = filing
+            if found or count < PAGE_SIZE:
+                break
+        else:
+            if last is not None:
+                self.gaps += 1
+                logger.warning(f"⚠️ EDGAR {form}: {pages}페이지 안에 마지막 공시 없음 (누락 가능)")
+        if new:
+            self.last_seen[form] = next(iter(new))
+        return list(new.values())
+
+    async def _poll_all(self):
+        self.cycle_requests = 0
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(*(self._poll_form(session, form) for form in self.forms),
+                                           return_exceptions=True)
+
+        filings = []
+        for form, result in zip(self.forms, results):
+            if isinstance(result, Exception):
+                self.errors += 1
+                logger.warning(f"EDGAR {form} 피드 조회 실패: {result}")
+                continue
+            filings.extend(result)
+
+        # 오래된 것부터 전달
+        filings.sort(key=lambda f: f.updated)
+        for filing in filings:
+            if not self.seen.check_and_set(filing.accession):
+                continue
+            for forms, callback in self._subscribers:
+                if filing.form in forms:
+                    try:
+                        callback(filing)
+                    except Exception as e:
+                        logger.debug(f"공시 전달 오류 ({filing.accession}): {e}")
+            self.dispatched += 1
+        self.cycles += 1
+
+    async def poll(self):
+        """interval 이 지났으면 전 양식 조회 후 구독자에게 전달 (동시 호출 시 한 번만)"""
+        async with self._lock:
+            if time.monotonic() - self._last_poll < self.interval:
+                return
+            self._last_poll = time.monotonic()
+            await self._poll_all()
+
+    def get_stats(self):
+        return {
+            'cycles': self.cycles,
+            'requests': self.requests,
+            'req_per_cycle': self.cycle_requests,
+            'dispatched': self.dispatched,
+            'gaps': self.gaps,
+            'errors': self.errors,
+            **self.bucket.get_stats(),
+        }
+
+
+# === 녹화 피드 재생 벤치마크 ===
+# python edgar_feed.py [시뮬레이션 시간] [사이클 초]
+# 하루치 공시 타임라인(장 마감 후 Form 4 몰림)을 만들어 두고, 기존 방식
+# (전체 양식 100건 / Form 4 40건 창)과 양식별 페이지 폴러의 요청 수와 누락 공시를 비교
+
+_OTHER_FORMS = ['8-K', '424B2', '10-Q', 'S-8', 'FWP', '6-K', '13F-HR', 'D', '497K']
+
+
+def _record_feed(hours, seed=0):
+    """[(epoch, 접수번호, 양식, 항목 제목들)] 시간순"""
+    rng = random.Random(seed)
+    start = datetime(2025, 5, 14, 12, 0, tzinfo=timezone.utc).timestamp()  # 08:00 ET
+    feed, seq = [], 0
+
+    def rate_per_min(form_kind, hour_et):
+        close_burst = 16 <= hour_et < 18
+        if form_kind == '4':
+            return 15 if close_burst else 1.5
+        if form_kind == '13':
+            return 0.6 if close_burst else 0.15
+        return 40 if close_burst else 6
+
+    for minute in range(int(hours * 60)):
+        hour_et = 8 + minute / 60
+        for kind in ('4', '13', 'other'):
+            n = sum(1 for _ in range(100) if rng.random() < rate_per_min(kind, hour_et) / 100)
+            for _ in range(n):
+                seq += 1
+                ts = start + minute * 60 + rng.uniform(0, 60)
+                accession = f"{rng.randint(1000000, 1999999):010d}-25-{seq:06d}"
+                if kind == '4':
+                    form = rng.choice(['4', '4', '4', '4/A'])
+                    titles = (f"{form} - Insider {seq} (00{rng.randint(10**7, 10**8 - 1)}) (Reporting)",
+                              f"{form} - Issuer Corp {seq % 900} (000{rng.randint(10**6, 10**7 - 1)}) (Issuer)")
+                elif kind == '13':
+                    form = rng.choice(['SC 13D', 'SC 13D/A', 'SC 13G', 'SC 13G/A'])
+                    titles = (f"{form} - Target Inc {seq} (000{rng.randint(10**6, 10**7 - 1)}) (Subject)",
+                              f"{form} - Fund LP {seq % 50} (000{rng.randint(10**6, 10**7 - 1)}) (Filed by)")
+                else:
+                    form = rng.choice(_OTHER_FORMS)
+                    titles = (f"{form} - Company {seq} (000{rng.randint(10**6, 10**7 - 1)}) (Filer)",)
+                feed.append((ts, accession, form, titles))
+    feed.sort()
+    return feed
+
+
+def _render_atom(entries):
+    parts = ['<?xml version="1.0" encoding="ISO-8859-1" ?>\n<feed xmlns="http://www.w3.org/2005/Atom">']
+    for ts, accession, form, title in entries:
+        updated = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        parts.append(
+            f'<entry><title>{title}</title>'
+            f'<link rel="alternate" type="text/html" href="https://www.sec.gov/Archives/edgar/data/1/{accession.replace("-", "")}/{accession}-index.htm"/>'
+            f'<summary type="html"> &lt;b&gt;AccNo:&lt;/b&gt; {accession}</summary><updated>{updated}</updated>'
+            f'<category scheme="https://www.sec.gov/" label="form type" term="{form}"/>'
+            f'<id>urn:tag:sec.gov,2008:accession-number={accession}</id></entry>')
+    parts.append('</feed>')
+    return ''.join(parts).encode()
+
+
+class _ReplayFeed:
+    """녹화 피드를 시뮬레이션 시각 기준으로 getcurrent 처럼 잘라서 응답"""
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.now = 0.0
+        self._by_prefix = {}
+
+    def page(self, form_prefix, start, count=PAGE_SIZE):
+        # getcurrent 의 type 은 접두어 일치 (type=4 -> 4, 4/A), 최신순, 관련자마다 한 항목
+        rows = self._by_prefix.get(form_prefix)
+        if rows is None:
+            rows = self._by_prefix[form_prefix] = [r for r in self.feed if r[2].startswith(form_prefix)]
+        end = bisect.bisect_right(rows, (self.now, '~'))
+        entries = []
+        for ts, accession, form, titles in reversed(rows[:end]):
+            entries.extend((ts, accession, form, title) for title in titles)
+            if len(entries) >= start + count:
+                break
+        return _render_atom(entries[start:start + count])
+
+
+class _ReplayPoller(EdgarFeedPoller):
+    def __init__(self, replay, **kwargs):
+        super().__init__(rate=1e9, interval=0, **kwargs)
+        self.replay = replay
+
+    async def _fetch(self, session, form, start):
+        self.requests += 1
+        self.cycle_requests += 1
+        return self.replay.page(form, start)
+
+
+async def _bench_async(hours, cycle):
+    feed = _record_feed(hours)
+    replay = _ReplayFeed(feed)
+    end = feed[-1][0] + cycle
+    want_whale = {a for _, a, f, _ in feed if f.startswith('SC 13')}
+    want_insider = {a for _, a, f, _ in feed if f in ('4', '4/A')}  # type=4 는 424B2 등도 접두어로 걸림
+    print(f"녹화 피드: {hours:g}시간, 공시 {len(feed):,}건 (Form 4 {len(want_insider):,}, 13D/G {len(want_whale):,}), 사이클 {cycle:g}s")
+
+    # 기존 방식: 고래 = 전체 양식 100항목, 내부자 = Form 4 100항목 중 앞 40개
+    got_whale, got_insider, old_requests, cycles = set(), set(), 0, 0
+    replay.now = feed[0][0]
+    while replay.now < end:
+        replay.now += cycle
+        cycles += 1
+        whale_page, _ = parse_edgar_atom(replay.page('', 0, 100))
+        got_whale.update(f.accession for f in whale_page if f.form.startswith('SC 13'))
+        insider_page, _ = parse_edgar_atom(replay.page('4', 0, 40))
+        got_insider.update(f.accession for f in insider_page if f.form in ('4', '4/A'))
+        old_requests += 2
+
+    # 양식별 페이지 폴러
+    poller = _ReplayPoller(replay, forms=['4', 'SC 13D', 'SC 13G'])
+    new_whale, new_insider, per_cycle = set(), set(), []
+    poller.subscribe(['SC 13D', 'SC 13D/A', 'SC 13G', 'SC 13G/A'], lambda f: new_whale.add(f.accession))
+    poller.subscribe(['4', '4/A'], lambda f: new_insider.add(f.accession))
+    replay.now = feed[0][0]
+    # 첫 조회(기준 설정) 이전 공시는 양쪽 모두 볼 수 없으므로 비교에서 제외
+    await poller.poll()
+    baseline = {accession for ts, accession, _, _ in feed if ts <= replay.now}
+    started = time.perf_counter()
+    while replay.now < end:
+        replay.now += cycle
+        await poller.poll()
+        per_cycle.append(poller.cycle_requests)
+    elapsed = time.perf_counter() - started
+
+    def missed(want, got):
+        return len((want - baseline) - got)
+
+    print(f"기존 방식:  요청 {old_requests:,}회 ({old_requests / cycles:.1f}/사이클), "
+          f"누락 13D/G {missed(want_whale, got_whale)}건, Form 4 {missed(want_insider, got_insider):,}건")
+    print(f"양식별 폴러: 요청 {poller.requests:,}회 (평균 {sum(per_cycle) / len(per_cycle):.1f}/사이클, 최대 {max(per_cycle)}), "
+          f"누락 13D/G {missed(want_whale, new_whale)}건, Form 4 {missed(want_insider, new_insider):,}건, "
+          f"중단 {poller.gaps}회, 파싱 포함 {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:3]
+    asyncio.run(_bench_async(float(args[0]) if args else 12, float(args[1]) if len(args) > 1 else 60))
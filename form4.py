@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""Form 4 (내부자 거래) 본문 XML 파싱 + 동시 조회
+
+getcurrent 피드에는 거래 내용이 없어서 옵션 부여/세금 원천징수/매도까지 전부 알림이 나가던 것을,
+공시 원문(.txt 안의 ownershipDocument XML)에서 거래 코드와 금액을 읽어
+장내 매수(코드 P)만 남길 수 있게 함.
+"""
+import asyncio
+import logging
+import random
+import sys
+import time
+from typing import NamedTuple, Tuple
+from lxml import etree
+from ttl_map import TTLMap
+
+logger = logging.getLogger(__name__)
+
+# 거래 코드 (SEC Form 4 General Instructions 8)
+TRANSACTION_CODES = {
+    'P': '장내 매수', 'S': '장내 매도', 'A': '부여/보상', 'M': '옵션 행사', 'F': '세금 원천징수',
+    'G': '증여', 'D': '발행사 반환', 'C': '전환', 'X': '옵션 행사(장내)', 'J': '기타',
+}
+
+
+class Form4Transaction(NamedTuple):
+    code: str
+    date: str
+    shares: float
+    price: float
+    acquired: bool          # A(취득) / D(처분)
+    owned_after: float
+
+    @property
+    def value(self):
+        return self.shares * self.price
+
+
+class Form4Owner(NamedTuple):
+    cik: str
+    name: str
+    relationship: str       # 'CEO', 'Director', '10% Owner' ...
+
+
+class Form4(NamedTuple):
+    accession: str
+    issuer_cik: str
+    issuer_name: str
+    ticker: str
+    owners: Tuple[Form4Owner, ...]  # 공동 신고(펀드 + GP, 여러 내부자)면 여러 명
+    transactions: Tuple[Form4Transaction, ...]
+
+    # 공동 신고는 같은 거래를 함께 보고한 것이라 신고인 묶음을 매수자 하나로 봄
+    @property
+    def owner_cik(self):
+        return '+'.join(o.cik for o in self.owners)
+
+    @property
+    def owner_name(self):
+        return ' / '.join(o.name for o in self.owners)
+
+    @property
+    def relationship(self):
+        return ', '.join(dict.fromkeys(r for o in self.owners for r in o.relationship.split(', ') if r))
+
+    def purchases(self, min_value=0):
+        """장내 매수(P, 취득) 거래 중 금액이 min_value 이상인 것"""
+        return [t for t in self.transactions if t.code == 'P' and t.acquired and t.value >= min_value]
+
+
+def _value(el, path):
+    text = el.findtext(path)
+    return text.strip() if text else ''
+
+
+def _number(el, path):
+    try:
+        return float(_value(el, path).replace(',', ''))
+    except ValueError:
+        return 0.0
+
+
+def _relationship(owner):
+    rel = owner.find('reportingOwnerRelationship')
+    if rel is None:
+        return ''
+    roles = []
+    if _value(rel, 'isOfficer') in ('1', 'true'):
+        roles.append(_value(rel, 'officerTitle') or 'Officer')
+    if _value(rel, 'isDirector') in ('1', 'true'):
+        roles.append('Director')
+    if _value(rel, 'isTenPercentOwner') in ('1', 'true'):
+        roles.append('10% Owner')
+    return ', '.join(roles)
+
+
+def extract_ownership_xml(text):
+    """공시 원문(.txt)에서 <XML> ... </XML> 구간만 (없으면 본문 그대로)"""
+    start = text.find(b'<ownershipDocument')
+    if start < 0:
+        return text
+    end = text.find(b'</ownershipDocument>', start)
+    return text[start:end + len(b'</ownershipDocument>')] if end > 0 else text[start:]
+
+
+def parse_form4(accession, content):
+    """공시 원문 또는 XML 바이트 -> Form4 (비파생 증권 거래만)"""
+    root = etree.fromstring(extract_ownership_xml(content), etree.XMLParser(recover=True, huge_tree=True))
+    issuer = root.find('issuer')
+    owners = tuple(
+        Form4Owner(_value(owner, 'reportingOwnerId/rptOwnerCik').lstrip('0'),
+                   _value(owner, 'reportingOwnerId/rptOwnerName'),
+                   _relationship(owner))
+        for owner in root.findall('reportingOwner')
+    )
+
+    transactions = []
+    for tx in root.iterfind('nonDerivativeTable/nonDerivativeTransaction'):
+        transactions.append(Form4Transaction(
+            code=_value(tx, 'transactionCoding/transactionCode'),
+            date=_value(tx, 'transactionDate/value'),
+            shares=_number(tx, 'transactionAmounts/transactionShares/value'),
+            price=_number(tx, 'transactionAmounts/transactionPricePerShare/value'),
+            acquired=_value(tx, 'transactionAmounts/transactionAcquiredDisposedCode/value') == 'A',
+            owned_after=_number(tx, 'postTransactionAmounts/sharesOwnedFollowingTransaction/value'),
+        ))
+
+    return Form4(
+        accession=accession,
+        issuer_cik=_value(issuer, 'issuerCik').lstrip('0') if issuer is not None else '',
+        issuer_name=_value(issuer, 'issuerName') if issuer is not None else '',
+        ticker=_value(issuer, 'issuerTradingSymbol').upper() if issuer is not None else '',
+        owners=owners,
+        transactions=tuple(transactions),
+    )
+
+
+def document_url(index_link):
+    """공시 색인 페이지(-index.htm) -> 전체 원문(.txt) (요청 1회로 XML 포함)"""
+    if index_link.endswith('-index.htm'):
+        return index_link[:-len('-index.htm')] + '.txt'
+    if index_link.endswith('-index.html'):
+        return index_link[:-len('-index.html')] + '.txt'
+    return index_link
+
+
+class Form4Fetcher:
+    """Form 4 원문 동시 조회 + 접수번호별 파싱 결과 캐시
+
+    bucket 은 EdgarFeedPoller 와 같은 것을 넘겨 SEC 초당 한도를 함께 지킴
+    """
+
+    def __init__(self, bucket, headers, concurrency=5, cache_ttl=3 * 86400):
+        self.bucket = bucket
+        self.headers = headers
+        self.concurrency = concurrency
+        self.cache = TTLMap(cache_ttl, max_size=20_000)  # 접수번호 -> Form4 (공시는 바뀌지 않음)
+
+        self.fetched = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.parse_time = 0.0
+
+    async def _fetch_one(self, session, semaphore, filing):
+        cached = self.cache.get(filing.accession)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        async with semaphore:
+            await self.bucket.acquire()
+            async with session.get(document_url(filing.link), headers=self.headers, timeout=15) as response:
+                if response.status in (403, 429):
+                    self.bucket.pause(60)
+                    raise RuntimeError(f"SEC 접근 제한 ({response.status})")
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                content = await response.read()
+        self.fetched += 1
+        started = time.perf_counter()
+        form = parse_form4(filing.accession, content)
+        self.parse_time += time.perf_counter() - started
+        self.cache.set(filing.accession, form)
+        return form
+
+    async def fetch_many(self, session, filings):
+        """([Form4], [실패한 공시]) - 실패분은 호출하는 쪽에서 다시 시도"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._fetch_one(session, semaphore, f) for f in filings),
+                                       return_exceptions=True)
+        forms, failed = [], []
+        for filing, result in zip(filings, results):
+            if isinstance(result, Exception):
+                self.errors += 1
+                failed.append(filing)
+                logger.debug(f"Form 4 원문 조회 실패 ({filing.accession}): {result}")
+                continue
+            forms.append(result)
+        return forms, failed
+
+    def get_stats(self):
+        return {
+            'fetched': self.fetched,
+            'cache_hits': self.cache_hits,
+            'errors': self.errors,
+            'parse_ms': round(self.parse_time * 1000, 1),
+        }
+
+
+# === 저장된 공시 파싱 벤치마크 ===
+# python form4.py [공시.txt|xml ...]
+# 인자가 없으면 실제 분포(부여/원천징수/매도가 대부분, 장내 매수는 소수)를 흉내 낸 합성 공시 사용
+
+_SYNTHETIC_CODES = ['A'] * 30 + ['F'] * 20 + ['S'] * 25 + ['M'] * 12 + ['G'] * 5 + ['P'] * 8
+
+
+def _synthetic_filing(rng, i):
+    n_tx = rng.choice([1, 1, 1, 2, 2, 3, 5])
+    rows = []
+    for k in range(n_tx):
+        code = rng.choice(_SYNTHETIC_CODES)
+        acquired = 'D' if code in ('S', 'F', 'G') else 'A'
+        price = 0 if code in ('A', 'G') else round(rng.uniform(2, 300), 2)
+        rows.append(f"""
+        <nonDerivativeTransaction>
+            <securityTitle><value>Common Stock</value></securityTitle>
+            <transactionDate><value>2025-05-1{k % 10}</value></transactionDate>
+            <transactionCoding><transactionFormType>4</transactionFormType><transactionCode>{code}</transactionCode><equitySwapInvolved>0</equitySwapInvolved></transactionCoding>
+            <transactionAmounts>
+                <transactionShares><value>{rng.randint(100, 200_000)}</value></transactionShares>
+                <transactionPricePerShare><value>{price}</value></transactionPricePerShare>
+                <transactionAcquiredDisposedCode><value>{acquired}</value></transactionAcquiredDisposedCode>
+            </transactionAmounts>
+            <postTransactionAmounts><sharesOwnedFollowingTransaction><value>{rng.randint(1000, 5_000_000)}</value></sharesOwnedFollowingTransaction></postTransactionAmounts>
+            <ownershipNature><directOrIndirectOwnership><value>D</value></directOrIndirectOwnership></ownershipNature>
+        </nonDerivativeTransaction>""")
+    xml = f"""<?xml version="1.0"?>
+<ownershipDocument>
+    <schemaVersion>X0508</schemaVersion>
+    <documentType>4</documentType>
+    <periodOfReport>2025-05-14</periodOfReport>
+    <issuer><issuerCik>000{1000000 + i % 700}</issuerCik><issuerName>Issuer {i % 700} Inc</issuerName><issuerTradingSymbol>T{i % 700:03d}</issuerTradingSymbol></issuer>
+    <reportingOwner>
+        <reportingOwnerId><rptOwnerCik>000{2000000 + i}</rptOwnerCik><rptOwnerName>Owner {i}</rptOwnerName></reportingOwnerId>
+        <reportingOwnerRelationship><isDirector>{rng.choice('01')}</isDirector><isOfficer>1</isOfficer><officerTitle>CFO</officerTitle></reportingOwnerRelationship>
+    </reportingOwner>
+    <nonDerivativeTable>{''.join(rows)}
+    </nonDerivativeTable>
+    <footnotes><footnote id="F1">Weighted average price.</footnote></footnotes>
+</ownershipDocument>"""
+    header = f"<SEC-DOCUMENT>0001-25-{i:06d}.txt\n<SEC-HEADER>ACCESSION NUMBER: 0001-25-{i:06d}\nCONFORMED SUBMISSION TYPE: 4\n</SEC-HEADER>\n<DOCUMENT>\n<TYPE>4\n<TEXT>\n<XML>\n"
+    return (header + xml + "\n</XML>\n</TEXT>\n</DOCUMENT>\n</SEC-DOCUMENT>\n").encode()
+
+
+def _bench(paths, min_value=100_000):
+    if paths:
+        docs = [(p, open(p, 'rb').read()) for p in paths]
+    else:
+        rng = random.Random(0)
+        docs = [(f'0001-25-{i:06d}', _synthetic_filing(rng, i)) for i in range(5000)]
+
+    started = time.perf_counter()
+    forms = [parse_form4(name, content) for name, content in docs]
+    elapsed = time.perf_counter() - started
+
+    codes = {}
+    for form in forms:
+        for tx in form.transactions:
+            codes[tx.code] = codes.get(tx.code, 0) + 1
+    buyers = [f for f in forms if f.purchases(min_value)]
+    issuers = {f.issuer_cik for f in buyers}
+    mb = sum(len(c) for _, c in docs) / 1e6
+
+    print(f"파싱: 공시 {len(forms):,}건 ({mb:.1f} MB) {elapsed:.2f}s -> {len(forms) / elapsed:,.0f}건/s")
+    print("거래 코드: " + ', '.join(f"{c}({TRANSACTION_CODES.get(c, '?')}) {n:,}" for c, n in sorted(codes.items(), key=lambda kv: -kv[1])))
+    print(f"장내 매수 ${min_value:,.0f} 이상: 공시 {len(buyers):,}건, 발행사 {len(issuers):,}곳 "
+          f"-> AI 분석 대상 {len(forms):,} -> {len(issuers):,} ({len(forms) / max(1, len(issuers)):.0f}배 감소)")
+
+
+if __name__ == '__main__':
+    _bench(sys.argv[1:])
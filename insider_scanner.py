@@ -1,108 +1,145 @@
 # -*- coding: utf-8 -*-
-import aiohttp
-import asyncio
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-import re
 import logging
+import time
+from collections import deque
+import aiohttp
+from config import Config
+from edgar_feed import EdgarFeedPoller
+from form4 import Form4Fetcher
+from ttl_map import TTLMap
 
 logger = logging.getLogger(__name__)
 
 class InsiderScanner:
-    def __init__(self):
-        # SEC EDGAR RSS (공식 무료)
-        self.rss_url = "https://www.sec.gov/cgi-bin/browse-edgar"
-        self.seen_filings = set()
+    def __init__(self, feed=None, tickers=None):
+        # SEC EDGAR 공시 피드 (WhaleScanner 와 공유, 없으면 단독 사용)
+        self.feed = feed or EdgarFeedPoller(forms=['4'])
+        self.pending = deque(maxlen=1000)  # 피드에서 넘어온 Form 4 (다음 scan 에서 처리)
+        self.retries = {}  # 접수번호 -> 원문 조회 실패 횟수 (피드는 이미 본 공시라 다시 주지 않음)
+        self.feed.subscribe(Config.INSIDER_FORMS, self.pending.append)
+        self.tickers = tickers  # CikTickerIndex (공시에 티커가 비어 있을 때 발행사 CIK 로)
+        
+        # Form 4 원문 (거래 코드/금액), 피드와 같은 토큰 버킷 사용
+        self.fetcher = Form4Fetcher(self.feed.bucket, self.feed.headers,
+                                    concurrency=Config.INSIDER_FETCH_CONCURRENCY)
+        # 발행사 CIK -> {내부자 CIK: (이름, 직책, 매수 금액)} (기간 안에 여러 명이 사면 클러스터)
+        self.clusters = TTLMap(Config.INSIDER_CLUSTER_DAYS * 86400, max_size=20_000)
+        
+        self.filings = 0
+        self.purchases = 0
+        self.alerts = 0
+        self.dropped = 0  # 재시도 한도를 넘겨 포기한 공시
         
     async def scan(self):
-        """Form 4 내부자 거래 스캔"""
+        """Form 4 내부자 거래 스캔 (장내 매수만)"""
         alerts = []
         
         try:
             # Form 4 = 임원/대주주 거래 신고
-            params = {
-                'action': 'getcurrent',
-                'type': '4',  # Form 4
-                'company': '',
-                'dateb': '',
-                'owner': 'include',
-                'start': '0',
-                'count': '100',
-                'output': 'atom'
-            }
+            await self.feed.poll()
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (InsiderBot/1.0; contact@example.com)'
-            }
+            filings = []
+            while self.pending:
+                filing = self.pending.popleft()
+                # 최근 6시간 이내만
+                if time.time() - filing.updated <= 21600:  # 6시간
+                    filings.append(filing)
+                else:
+                    self.retries.pop(filing.accession, None)
+            if not filings:
+                return alerts
             
             async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.rss_url,
-                    params=params,
-                    headers=headers,
-                    timeout=15
-                ) as response:
-                    if response.status != 200:
-                        logger.warning(f"SEC Form 4 접근 실패: {response.status}")
-                        return alerts
-                    
-                    xml = await response.text()
-                    soup = BeautifulSoup(xml, 'xml')
-                    entries = soup.find_all('entry')[:40]
-                    
-                    for entry in entries:
-                        try:
-                            title = entry.find('title').text
-                            link = entry.find('link')['href']
-                            updated = entry.find('updated').text
-                            
-                            # 중복 체크
-                            if link in self.seen_filings:
-                                continue
-                            
-                            # 최근 6시간 이내만
-                            filing_time = datetime.fromisoformat(
-                                updated.replace('Z', '+00:00')
-                            )
-                            now = datetime.now(filing_time.tzinfo)
-                            
-                            if (now - filing_time).total_seconds() > 21600:  # 6시간
-                                continue
-                            
-                            # 티커 추출
-                            ticker_match = re.search(r'\(([A-Z]{1,5})\)', title)
-                            if not ticker_match:
-                                continue
-                            
-                            ticker = ticker_match.group(1)
-                            
-                            # Form 4는 매수/매도 구분이 어려우므로 일단 전부 알림
-                            # (AI가 나중에 분석)
-                            self.seen_filings.add(link)
-                            
-                            logger.info(f"👔 내부자 거래: {ticker}")
-                            
-                            alerts.append({
-                                'symbol': ticker,
-                                'price': 0,
-                                'change_percent': 0,
-                                'volume': 0,
-                                'trigger_type': 'insider_trading',
-                                'trigger_reason': '👔 임원/대주주 매매 신고 (Form 4)',
-                                'news_url': link,
-                                'title': title,
-                                'priority': 7  # AI 점수 참고용
-                            })
-                            
-                        except Exception as e:
-                            logger.debug(f"Form 4 파싱 오류: {e}")
-                            continue
-                    
-                    # 메모리 관리
-                    if len(self.seen_filings) > 500:
-                        self.seen_filings.clear()
+                forms, failed = await self.fetcher.fetch_many(session, filings)
+            self.filings += len(forms)
+            for form in forms:
+                self.retries.pop(form.accession, None)
+            self._requeue(failed)
+            
+            # 옵션 부여/원천징수/매도는 버리고 기준 금액 이상 장내 매수만, 발행사별로 묶음
+            buys = {}
+            for form in forms:
+                purchases = form.purchases(Config.INSIDER_MIN_PURCHASE_USD)
+                if not purchases:
+                    continue
+                self.purchases += 1
+                buys.setdefault(form.issuer_cik, []).append((form, purchases))
+            
+            links = {filing.accession: filing.link for filing in filings}
+            for issuer_cik, items in buys.items():
+                try:
+                    alert = self._build_alert(issuer_cik, items, links)
+                    if alert:
+                        alerts.append(alert)
+                except Exception as e:
+                    logger.debug(f"Form 4 처리 오류 ({issuer_cik}): {e}")
+            self.alerts += len(alerts)
                         
         except Exception as e:
             logger.error(f"내부자 스캔 오류: {e}")
         
         return alerts
+    
+    def _requeue(self, failed):
+        """원문 조회에 실패한 공시를 다음 scan 으로 (SEC 제한/타임아웃/5xx), 최대 횟수 넘으면 포기"""
+        for filing in failed:
+            attempts = self.retries.get(filing.accession, 0) + 1
+            if attempts > Config.INSIDER_FETCH_RETRIES:
+                self.retries.pop(filing.accession, None)
+                self.dropped += 1
+                logger.warning(f"⚠️ Form 4 원문 {attempts - 1}회 조회 실패, 포기: {filing.accession}")
+                continue
+            self.retries[filing.accession] = attempts
+            self.pending.append(filing)
+    
+    def _build_alert(self, issuer_cik, items, links):
+        form = items[0][0]
+        ticker = form.ticker
+        if (not ticker or ticker == 'NONE') and self.tickers is not None:
+            ticker = self.tickers.ticker(issuer_cik)
+        if not ticker or ticker == 'NONE':
+            return None
+        
+        # 클러스터 갱신 (같은 내부자가 여러 번 사면 금액 합산)
+        cluster = dict(self.clusters.get(issuer_cik, {}))
+        for buyer, purchases in items:
+            value = sum(t.value for t in purchases)
+            name, relationship, prev = cluster.get(buyer.owner_cik, (buyer.owner_name, buyer.relationship, 0.0))
+            cluster[buyer.owner_cik] = (name, relationship, prev + value)
+        self.clusters.set(issuer_cik, cluster)
+        
+        buyers_now = ', '.join(
+            f"{b.relationship or '내부자'} {b.owner_name} ${sum(t.value for t in p):,.0f}"
+            f" (@${p[-1].price:,.2f})" for b, p in items[:3])
+        reason = f'👔 내부자 장내 매수: {buyers_now}'
+        priority = 7
+        if len(cluster) >= 2:
+            total = sum(v for _, _, v in cluster.values())
+            reason += f'\n👥 클러스터 매수: {len(cluster)}명 / {Config.INSIDER_CLUSTER_DAYS}일, 총 ${total:,.0f}'
+            priority += 2
+        
+        logger.info(f"👔 내부자 매수: {ticker} ({len(items)}건, 클러스터 {len(cluster)}명)")
+        
+        return {
+            'symbol': ticker,
+            'price': items[0][1][-1].price,
+            'change_percent': 0,
+            'volume': 0,
+            'trigger_type': 'insider_trading',
+            'trigger_reason': reason,
+            'news_url': links.get(form.accession, ''),
+            'title': f"Form 4 - {form.issuer_name}",
+            'priority': priority  # AI 점수 참고용
+        }
+    
+    def get_stats(self):
+        return {
+            'filings': self.filings,
+            'purchases': self.purchases,
+            'alerts': self.alerts,
+            'ai_calls_saved': self.filings - self.alerts,
+            'clusters': len(self.clusters),
+            'retrying': len(self.retries),
+            'dropped': self.dropped,
+            **self.fetcher.get_stats(),
+        }
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+import aiohttp
+import pytz
+from parsers import extract_naver_market_sum, extract_naver_last_page
+
+logger = logging.getLogger(__name__)
+
+MARKET_SUM_URL = "https://finance.naver.com/sise/sise_market_sum.naver?sosok={market}&page={page}"
+MARKETS = {0: 'KOSPI', 1: 'KOSDAQ'}
+KST = pytz.timezone('Asia/Seoul')
+
+
+class KRMarketCapTable:
+    """KRX 전 종목 상장주식수 테이블 (하루 한 번 일괄 갱신, 시총은 현재가 x 주식수로 추정)"""
+
+    RETRY_INTERVAL = 600  # 갱신 실패 후 재시도 간격 (초)
+
+    def __init__(self, snapshot_path, concurrency=6):
+        self.snapshot_path = snapshot_path
+        self.concurrency = concurrency  # 네이버 동시 연결 수
+        self.shares = {}                # code -> 상장주식수
+        self.names = {}
+        self.snapshot_date = None       # KST 기준 갱신 날짜 (YYYY-MM-DD)
+        self._refresh_task = None
+        self._last_attempt = -self.RETRY_INTERVAL
+
+        self.hits = 0
+        self.misses = 0
+        self.refresh_seconds = 0.0
+
+        self.load()
+
+    # === 스냅샷 파일 ===
+
+    def load(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.snapshot_date = data['date']
+            for code, (name, shares) in data['rows'].items():
+                self.names[code] = name
+                self.shares[code] = shares
+            logger.info(f"📂 KRX 상장주식수 스냅샷 로드: {len(self.shares)}종목 ({self.snapshot_date})")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"KRX 스냅샷 로드 실패: {e}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        data = {
+            'date': self.snapshot_date,
+            'rows': {code: [self.names.get(code, ''), shares] for code, shares in self.shares.items()},
+        }
+        with open(self.snapshot_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(self.snapshot_path + '.tmp', self.snapshot_path)
+
+    # === 일괄 갱신 ===
+
+    def is_stale(self):
+        return self.snapshot_date != datetime.now(KST).strftime('%Y-%m-%d')
+
+    def schedule_refresh(self):
+        """날짜가 바뀌었으면 백그라운드로 갱신 (스캔 루프는 기존 테이블로 계속 진행)"""
+        if not self.is_stale():
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.monotonic() - self._last_attempt < self.RETRY_INTERVAL:
+            return
+        self._last_attempt = time.monotonic()
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        headers = {'User-Agent': 'Mozilla/5.0'}
+
+        async def fetch(session, market, page):
+            async with semaphore:
+                url = MARKET_SUM_URL.format(market=market, page=page)
+                async with session.get(url, headers=headers, timeout=10) as response:
+                    if response.status != 200:
+                        return ''
+                    return await response.text()
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                # 1페이지로 마지막 페이지 번호 확인 후 나머지를 동시에
+                first_pages = await asyncio.gather(*(fetch(session, m, 1) for m in MARKETS))
+                pages = list(first_pages)
+                rest = [(m, p) for m, html in zip(MARKETS, first_pages)
+                        for p in range(2, extract_naver_last_page(html) + 1)]
+                results = await asyncio.gather(*(fetch(session, m, p) for m, p in rest), return_exceptions=True)
+                pages.extend(r for r in results if isinstance(r, str))
+        except Exception as e:
+            logger.error(f"KRX 시가총액 목록 조회 실패: {e}")
+            return
+
+        rows = [row for html in pages for row in extract_naver_market_sum(html)]
+        if len(rows) < 1000:
+            # 일부 페이지만 받아진 경우 기존 테이블 유지
+            logger.warning(f"KRX 시가총액 목록 불완전 ({len(rows)}종목), 기존 테이블 유지")
+            return
+
+        self.shares = {row.code: row.shares for row in rows if row.shares > 0}
+        self.names = {row.code: row.name for row in rows}
+        self.snapshot_date = datetime.now(KST).strftime('%Y-%m-%d')
+        self.refresh_seconds = time.perf_counter() - started
+        await asyncio.to_thread(self.save)
+        logger.info(f"🔄 KRX 상장주식수 갱신: {len(self.shares)}종목, {len(pages)}페이지 "
+                    f"{self.refresh_seconds:.1f}초")
+
+    # === 조회 ===
+
+    def estimate(self, code, price):
+        """현재가 기준 시가총액 (억 원), 모르는 종목이면 None"""
+        shares = self.shares.get(code)
+        if shares is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return price * shares / 100_000_000
+
+    def get_stats(self):
+        return {
+            'codes': len(self.shares),
+            'snapshot': self.snapshot_date,
+            'hits': self.hits,
+            'misses': self.misses,
+            'refresh_s': round(self.refresh_seconds, 1),
+        }
@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 import aiohttp
 import asyncio
-from datetime import datetime
+import os
+import time
+from collections import deque
 import logging
+import numpy as np
 from bs4 import BeautifulSoup
-import re
 from config import Config
+from parsers import extract_naver_quant, extract_naver_market_cap
+from kr_market_cap import KRMarketCapTable
+from ttl_map import TTLMap
 
 logger = logging.getLogger(__name__)
 
@@ -13,11 +18,22 @@ class KRStockScanner:
     def __init__(self, telegram_bot, ai_analyzer):
         self.telegram = telegram_bot
         self.ai = ai_analyzer
-        self.alerted_stocks = {}
-        self.cooldown = 7200 # 2시간 쿨다운
+        self.alerted_stocks = TTLMap(Config.ALERT_COOLDOWN_KR, max_size=Config.DEDUP_MAX_SIZE)  # 종목코드
+        self.seen_news = TTLMap(Config.NEWS_DEDUP_TTL, max_size=Config.DEDUP_MAX_SIZE)           # 뉴스 링크
+        
+        # 상장주식수 테이블 (하루 한 번 일괄 갱신)
+        self.market_caps = KRMarketCapTable(
+            os.path.join(Config.DATA_DIR, 'krx_market_cap.json'),
+            concurrency=Config.KR_FETCH_CONCURRENCY
+        )
+        self.cycle_times = deque(maxlen=200)
+        self.page_fetches = 0  # 종목 페이지 개별 조회 (테이블에 없는 종목만)
+        self.rows_scanned = 0  # 병합 후 순위 테이블 종목 수 누적
         
     async def scan(self):
         all_alerts = []
+        started = time.perf_counter()
+        self.market_caps.schedule_refresh()
         try:
             results = await asyncio.gather(
                 self.scan_naver_news(),
@@ -29,6 +45,10 @@ class KRStockScanner:
                     for alert in result: alert['market'] = 'KR'
                     all_alerts.extend(result)
         except Exception: pass
+        
+        elapsed = time.perf_counter() - started
+        self.cycle_times.append(elapsed)
+        logger.debug(f"⏱️ 한국 스캔 {elapsed:.2f}초")
         return all_alerts
     
     async def scan_naver_news(self):
@@ -52,9 +72,9 @@ class KRStockScanner:
                             if not title: continue
                             link = news['href']
                             if not link.startswith('http'): link = "https://finance.naver.com" + link
-                            if link in self.alerted_stocks: continue
+                            if link in self.seen_news: continue
                             if self.is_important_kr_news(title):
-                                self.alerted_stocks[link] = datetime.now()
+                                self.seen_news.set(link)
                                 # [수정됨] symbol 키 추가 ('KR_NEWS') -> 에러 방지 핵심
                                 alerts.append({
                                     'symbol': 'KR_NEWS', 
@@ -67,78 +87,82 @@ class KRStockScanner:
         except Exception: pass
         return alerts
     
+    def _surge_urls(self):
+        """거래량 상위/상승 (코스피, 코스닥 x N페이지) + 상한가"""
+        urls = [f"https://finance.naver.com/sise/{page}.naver?sosok={market}&page={n}"
+                for page in ('sise_quant', 'sise_rise')
+                for market in (0, 1)
+                for n in range(1, Config.KR_SCAN_PAGES + 1)]
+        urls.append("https://finance.naver.com/sise/sise_upper.naver")
+        return urls
+
+    async def _fetch_page(self, session, url):
+        try:
+            async with session.get(url, timeout=10) as response:
+                if response.status != 200: return []
+                return extract_naver_quant(await response.text())
+        except Exception as e:
+            logger.debug(f"네이버 시세 페이지 조회 실패 ({url}): {e}")
+            return []
+
     async def scan_price_surge(self):
-        """급등주 스캔 (시가총액 필터 적용)"""
+        """급등주 스캔 (여러 순위 페이지 동시 조회 -> 종목코드 기준 병합 -> 배열 필터)"""
         alerts = []
         try:
-            url = "https://finance.naver.com/sise/sise_quant.naver"
-            async with aiohttp.ClientSession() as session:
-                headers = {'User-Agent': 'Mozilla/5.0'}
-                async with session.get(url, headers=headers, timeout=10) as response:
-                    if response.status != 200: return alerts
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    rows = soup.select('table.type_2 tr')[2:100]
-                    
+            connector = aiohttp.TCPConnector(limit_per_host=Config.KR_FETCH_CONCURRENCY)
+            headers = {'User-Agent': 'Mozilla/5.0'}
+            async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+                pages = await asyncio.gather(*(self._fetch_page(session, url) for url in self._surge_urls()))
+                
+                merged = {}
+                for rows in pages:
                     for row in rows:
-                        try:
-                            cols = row.select('td')
-                            if len(cols) < 12: continue
-                            name_elem = cols[1].select_one('a')
-                            if not name_elem: continue
-                            
-                            name = name_elem.get_text(strip=True)
-                            code_match = re.search(r'code=(\d+)', name_elem['href'])
-                            if not code_match: continue
-                            code = code_match.group(1)
-                            
-                            price_txt = cols[2].get_text(strip=True).replace(',', '')
-                            price = int(price_txt) if price_txt.isdigit() else 0
-                            
-                            change_txt = cols[4].get_text(strip=True).replace('%', '').replace('+', '').strip()
-                            change_pct = float(change_txt) if change_txt.replace('.','',1).isdigit() else 0.0
-                            
-                            vol_txt = cols[6].get_text(strip=True).replace(',', '')
-                            volume = int(vol_txt) if vol_txt.isdigit() else 0
-                            
-                            # 거래대금 (억 단위)
-                            trade_value_100m = (price * volume) / 100000000
-
-                            # 1차 필터
-                            if price < 1000: continue
-                            if price > 100000: continue
-                            if change_pct < 4.0: continue
-                            if trade_value_100m < 50: continue
-
-                            # 쿨다운 체크
-                            if code in self.alerted_stocks:
-                                last_alert = self.alerted_stocks[code]
-                                # [수정] .seconds -> .total_seconds() 로 변경
-                                if (datetime.now() - last_alert).total_seconds() < self.cooldown:
-                                    continue
-
-                            # 2차 필터 (시가총액)
+                        merged.setdefault(row.code, row)
+                if not merged: return alerts
+                
+                rows = list(merged.values())
+                price = np.array([r.price for r in rows], dtype=np.float64)
+                change_pct = np.array([r.change_pct for r in rows], dtype=np.float64)
+                volume = np.array([r.volume for r in rows], dtype=np.float64)
+                
+                # 거래대금 (억 단위) + 1차 필터
+                trade_value = price * volume / 100000000
+                mask = (price >= 1000) & (price <= 100000) & (change_pct >= 4.0) & (trade_value >= 50)
+                self.rows_scanned += len(rows)
+                
+                for i in np.flatnonzero(mask):
+                    code, name = rows[i].code, rows[i].name
+                    try:
+                        # 쿨다운 체크
+                        if code in self.alerted_stocks: continue
+                        
+                        trade_value_100m = float(trade_value[i])
+                        
+                        # 2차 필터 (시가총액: 현재가 x 상장주식수, 테이블에 없으면 종목 페이지)
+                        market_cap_100m = self.market_caps.estimate(code, rows[i].price)
+                        if market_cap_100m is None:
+                            self.page_fetches += 1
                             market_cap_100m = await self.get_market_cap(code, session)
-                            
-                            if market_cap_100m > 8000 and trade_value_100m < 2000:
-                                continue
-
-                            reason = f"💎 가벼운 급등주 (시총 {int(market_cap_100m)}억)\n💰 거래대금 {int(trade_value_100m)}억 터짐 (+{change_pct:.1f}%)"
-                            
-                            self.alerted_stocks[code] = datetime.now()
-                            alerts.append({
-                                'symbol': code,
-                                'name': name,
-                                'price': price,
-                                'change_percent': change_pct,
-                                'volume': volume,
-                                'trade_value_100m': trade_value_100m,
-                                'trigger_type': 'price_surge',
-                                'trigger_reason': reason,
-                                'news_url': f"https://finance.naver.com/item/main.naver?code={code}"
-                            })
-                            
-                        except Exception: continue
+                        
+                        if market_cap_100m > 8000 and trade_value_100m < 2000:
+                            continue
+                        
+                        reason = f"💎 가벼운 급등주 (시총 {int(market_cap_100m)}억)\n💰 거래대금 {int(trade_value_100m)}억 터짐 (+{change_pct[i]:.1f}%)"
+                        
+                        self.alerted_stocks.set(code)
+                        alerts.append({
+                            'symbol': code,
+                            'name': name,
+                            'price': rows[i].price,
+                            'change_percent': float(change_pct[i]),
+                            'volume': rows[i].volume,
+                            'trade_value_100m': trade_value_100m,
+                            'trigger_type': 'price_surge',
+                            'trigger_reason': reason,
+                            'news_url': f"https://finance.naver.com/item/main.naver?code={code}"
+                        })
+                        
+                    except Exception: continue
         except Exception: pass
         return alerts
 
@@ -148,24 +172,24 @@ class KRStockScanner:
             async with session.get(url, timeout=5) as response:
                 if response.status != 200: return 999999
                 html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                mc_elem = soup.select_one('#_market_sum')
-                if mc_elem:
-                    val = 0
-                    if '조' in mc_elem.get_text():
-                        parts = mc_elem.get_text().split('조')
-                        trillion = int(re.sub(r'\D', '', parts[0])) * 10000
-                        billion = 0
-                        if len(parts) > 1 and parts[1].strip():
-                            billion = int(re.sub(r'\D', '', parts[1]))
-                        val = trillion + billion
-                    else:
-                        val = int(re.sub(r'\D', '', mc_elem.get_text()))
-                    return val
+                market_cap = extract_naver_market_cap(html)
+                if market_cap is not None:
+                    return market_cap
         except: pass
         return 999999
 
+    def get_stats(self):
+        times = np.array(self.cycle_times) if self.cycle_times else np.zeros(1)
+        return {
+            'cycle_p50_s': round(float(np.percentile(times, 50)), 2),
+            'cycle_max_s': round(float(times.max()), 2),
+            'page_fetches': self.page_fetches,
+            'rows_scanned': self.rows_scanned,
+            'cooldown_size': len(self.alerted_stocks),
+            'news_seen': len(self.seen_news),
+            **{f"cap_{k}": v for k, v in self.market_caps.get_stats().items()},
+        }
+
     def is_important_kr_news(self, title):
         has_pos = any(kw in title for kw in Config.POSITIVE_KEYWORDS)
         has_neg = any(kw in title for kw in Config.NEGATIVE_KEYWORDS)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import builtins
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class LoopLagMonitor:
+    """이벤트 루프 지연 측정 + 루프를 붙잡고 있는 콜백 스택 캡처"""
+
+    def __init__(self, interval=0.5, threshold=0.25, debug=False, max_samples=1200):
+        self.interval = interval        # 샘플링 주기 (초)
+        self.threshold = threshold      # 이 이상 멈추면 스택 캡처 (초)
+        self.debug = debug              # 동기 블로킹 호출 감지 모드
+        self.samples = deque(maxlen=max_samples)  # 최근 10분 (0.5초 간격)
+
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self.blocking_calls = Counter()
+
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_beat = time.monotonic()
+        self._stall_reported = False
+        self._stop = threading.Event()
+        self._originals = {}
+
+    async def run(self):
+        """메인 루프와 함께 실행되는 측정 태스크"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+
+        watchdog = threading.Thread(target=self._watchdog, name='loop-watchdog', daemon=True)
+        watchdog.start()
+
+        if self.debug:
+            self._enable_debug()
+
+        try:
+            while True:
+                expected = self._loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, self._loop.time() - expected)
+
+                self.samples.append(lag)
+                self.max_lag = max(self.max_lag, lag)
+                self._last_beat = time.monotonic()
+                self._stall_reported = False
+        finally:
+            self._stop.set()
+            if self.debug:
+                self._disable_debug()
+
+    def _watchdog(self):
+        """별도 스레드: 하트비트가 끊기면 루프 스레드의 현재 스택을 기록"""
+        while not self._stop.wait(self.threshold / 2):
+            stalled = time.monotonic() - self._last_beat - self.interval
+            if stalled < self.threshold or self._stall_reported:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            self._stall_reported = True
+            self.stall_count += 1
+            stack = ''.join(traceback.format_stack(frame, limit=12))
+            logger.warning(f"🐢 이벤트 루프 {stalled:.2f}초 정지 - 점유 중인 코드:\n{stack}")
+
+    # === 디버그 모드: 코루틴 안의 블로킹 호출 감지 ===
+
+    def _on_loop_thread(self):
+        return (threading.get_ident() == self._loop_thread_id
+                and asyncio._get_running_loop() is not None)
+
+    def _wrap(self, name, func):
+        monitor = self
+
+        def wrapper(*args, **kwargs):
+            if monitor._on_loop_thread():
+                caller = traceback.extract_stack(limit=2)[0]
+                site = f"{name} @ {caller.filename.rsplit('/', 1)[-1]}:{caller.lineno}"
+                if site not in monitor.blocking_calls:
+                    logger.warning(f"⛔ 코루틴 안에서 블로킹 호출: {site}")
+                monitor.blocking_calls[site] += 1
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    def _patch(self, owner, attr, name):
+        original = getattr(owner, attr, None)
+        if original is None:
+            return
+        self._originals[(owner, attr)] = original
+        setattr(owner, attr, self._wrap(name, original))
+
+    def _enable_debug(self):
+        self._loop.set_debug(True)
+        self._loop.slow_callback_duration = self.threshold
+
+        self._patch(builtins, 'open', 'open()')
+        self._patch(time, 'sleep', 'time.sleep()')
+        try:
+            import feedparser
+            self._patch(feedparser, 'parse', 'feedparser.parse()')
+        except ImportError:
+            pass
+        try:
+            from bs4 import BeautifulSoup
+            self._patch(BeautifulSoup, '__init__', 'BeautifulSoup()')
+        except ImportError:
+            pass
+
+        logger.info("🔬 루프 디버그 모드: 블로킹 호출 감지 활성화")
+
+    def _disable_debug(self):
+        for (owner, attr), original in self._originals.items():
+            setattr(owner, attr, original)
+        self._originals.clear()
+
+    def get_stats(self):
+        values = sorted(self.samples)
+        stats = {
+            'lag_p50_ms': round(_percentile(values, 50) * 1000, 1),
+            'lag_p95_ms': round(_percentile(values, 95) * 1000, 1),
+            'lag_p99_ms': round(_percentile(values, 99) * 1000, 1),
+            'lag_max_ms': round(self.max_lag * 1000, 1),
+            'stalls': self.stall_count,
+        }
+        if self.debug:
+            stats['blocking_calls'] = dict(self.blocking_calls.most_common(5))
+        return stats
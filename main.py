@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import asyncio
 import logging
+import os
+import time
 from datetime import datetime
 import pytz
 from config import Config
@@ -10,13 +12,25 @@ from social_scanner import SocialScanner
 from kr_stock_scanner import KRStockScanner
 from ai_analyzer import AIAnalyzer
 from telegram_bot import TelegramBot
+from delivery_queue import DeliveryQueue
+from subscriptions import SubscriptionRegistry, Subscription
 
 # === 🆕 고급 기능 ===
 from insider_scanner import InsiderScanner
 from short_squeeze_scanner import ShortSqueezeScanner
 from whale_scanner import WhaleScanner
+from watchlist_scanner import WatchlistScanner
+from edgar_feed import EdgarFeedPoller
+from sec_tickers import CikTickerIndex
+from symbol_universe import SymbolUniverse
 from validator import Validator
 from performance_tracker import PerformanceTracker
+from loop_monitor import LoopLagMonitor
+from bar_store import BarStore
+from rvol_baseline import RvolBaseline
+from ttl_map import TTLMap
+from session_calendar import SessionCalendar
+from checkpoint import Checkpointer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,26 +42,131 @@ class GlobalStockAlertSystem:
     def __init__(self):
         try:
             self.config = Config()
-            self.telegram = TelegramBot(self.config.TELEGRAM_TOKEN, self.config.TELEGRAM_CHAT_ID)
+            self.telegram = TelegramBot(self.config.TELEGRAM_TOKEN, self.config.TELEGRAM_CHAT_ID,
+                                        api_base=self.config.TELEGRAM_API_BASE)
+            self.delivery = DeliveryQueue(
+                self.telegram,
+                os.path.join(self.config.DATA_DIR, 'outbox.db'),
+                global_rate=self.config.TELEGRAM_GLOBAL_RATE,
+                chat_rate=self.config.TELEGRAM_CHAT_RATE,
+                digest_window=self.config.TELEGRAM_DIGEST_WINDOW,
+                max_attempts=self.config.TELEGRAM_MAX_RETRIES,
+                workers=self.config.TELEGRAM_SEND_WORKERS
+            )
+            
+            # 구독자별 필터 (파일이 없으면 기본 채팅방 하나로 시작)
+            self.subscriptions = SubscriptionRegistry(os.path.join(self.config.DATA_DIR, 'subscriptions.json'))
+            if not self.subscriptions.subs and self.config.TELEGRAM_CHAT_ID:
+                self.subscriptions.add(Subscription(self.config.TELEGRAM_CHAT_ID))
+                self.subscriptions.save()
             self.ai = AIAnalyzer(self.config.GEMINI_API_KEY)
             
+            # 거래소 세션 달력 (휴장일/조기 폐장/장전·장후), 시장별로 스캔할 세션 구독
+            self.calendar = SessionCalendar()
+            self.calendar.subscribe('us', 'US', {'PRE', 'REG', 'POST'})
+            self.calendar.subscribe('kr', 'KR', {'REG'})
+            
+            # 봉 저장소 (검증기/백테스트/RVOL 기준선 공유)
+            self.bar_store = BarStore(os.path.join(self.config.DATA_DIR, 'bars'))
+            self.rvol = RvolBaseline(
+                os.path.join(self.config.DATA_DIR, 'rvol_baseline.npz'),
+                self.bar_store,
+                days=self.config.RVOL_DAYS,
+                bucket_minutes=self.config.RVOL_BUCKET_MINUTES,
+                build_hour=self.config.RVOL_BUILD_HOUR,
+                max_symbols=self.config.RVOL_MAX_SYMBOLS
+            )
+            
             # 기본 스캐너
             self.us_news = NewsScanner(self.config.FINNHUB_API_KEY)
-            self.us_price = PriceScanner(self.config.ALPHA_VANTAGE_KEY)
+            self.us_price = PriceScanner(self.config.ALPHA_VANTAGE_KEY, rvol=self.rvol, calendar=self.calendar)
             self.us_social = SocialScanner()
             self.kr_scanner = KRStockScanner(self.telegram, self.ai)
             
             # 🆕 고급 스캐너
-            self.insider = InsiderScanner()
-            self.short_squeeze = ShortSqueezeScanner()
-            self.whale = WhaleScanner()
+            self.edgar = EdgarFeedPoller()  # Form 4 / 13D·G 피드 공용
+            self.sec_tickers = CikTickerIndex(os.path.join(self.config.DATA_DIR, 'sec_tickers.json'))
+            self.insider = InsiderScanner(self.edgar, self.sec_tickers)
+            self.short_squeeze = ShortSqueezeScanner(self.us_price)
+            self.whale = WhaleScanner(self.edgar, self.sec_tickers)
+            self.watchlist = WatchlistScanner()
+            # 상장 종목 유니버스 (부적격 알림은 검증/AI 전에 제외, 유동주식수는 공매도 테이블에서)
+            self.universe = SymbolUniverse(os.path.join(self.config.DATA_DIR, 'universe.json'),
+                                           float_source=self.short_squeeze.table)
+            
+            # 🆕 검증기 & 백테스팅 (봉 저장소 공유)
+            self.validator = Validator(self.bar_store, rvol=self.rvol)
+            self.tracker = PerformanceTracker(self.bar_store)
+            
+            # 중복 알림 방지 (시장별 쿨다운, 만료된 키는 자동 정리)
+            self.alerted_stocks = TTLMap(self.config.ALERT_COOLDOWN_US, max_size=self.config.DEDUP_MAX_SIZE)
+            
+            # 재시작 시 중복 알림/재분석 방지용 상태 저장
+            self.checkpoint = Checkpointer(
+                os.path.join(self.config.DATA_DIR, 'state.ckpt'),
+                interval=self.config.CHECKPOINT_INTERVAL
+            )
+            for name, target in (
+                ('alerted_stocks', self.alerted_stocks),
+                ('us_news.seen_news', self.us_news.seen_news),
+                ('us_price.last_scan_result', self.us_price.last_scan_result),
+                ('us_price.history_pre', self.us_price.histories['PRE']),
+                ('us_price.history_reg', self.us_price.histories['REG']),
+                ('us_social.last_posts', self.us_social.last_posts),
+                ('us_social.mentions', self.us_social.mentions),
+                ('us_social.cursors', self.us_social.cursors),
+                ('us_social.threads', self.us_social.threads),
+                ('us_social.seen_comments', self.us_social.seen_comments),
+                ('kr.alerted_stocks', self.kr_scanner.alerted_stocks),
+                ('kr.seen_news', self.kr_scanner.seen_news),
+                ('edgar.last_seen', self.edgar.last_seen),
+                ('edgar.seen', self.edgar.seen),
+                ('insider.clusters', self.insider.clusters),
+                ('whale.learned_ciks', self.whale.learned_ciks),
+                ('watchlist.alerted', self.watchlist.alerted),
+                ('rvol.wanted', self.rvol.wanted),
+                ('validator.cache', self.validator.cache),
+                ('ai.cache', self.ai.cache),
+                ('ai.news_cache', self.ai.news.cache),
+            ):
+                self.checkpoint.register(name, target)
+            self.checkpoint.restore()
+            self.restored_alert_keys = {key for key, _, _ in self.alerted_stocks.dump()}
+            
+            # 이벤트 루프 지연 모니터
+            self.loop_monitor = LoopLagMonitor(
+                threshold=self.config.LOOP_LAG_THRESHOLD,
+                debug=self.config.LOOP_MONITOR_DEBUG
+            )
             
-            # 🆕 검증기 & 백테스팅
-            self.validator = Validator()
-            self.tracker = PerformanceTracker()
+            # 주기적으로 로그에 남길 지표 (get_stats() 제공 컴포넌트)
+            # 백테스트 스케줄 상태
+            self.last_backtest_update = 0
+            self.last_report_date = None
+            self.backtest_task = None
             
-            self.alerted_stocks = {}
-            self.alert_cooldown = 14400  # 4시간
+            self.metrics = {
+                'loop': self.loop_monitor,
+                'alert_store': self.tracker.store,
+                'bar_store': self.bar_store,
+                'telegram': self.delivery,
+                'subscriptions': self.subscriptions,
+                'kr_scanner': self.kr_scanner,
+                'cooldown': self.alerted_stocks,
+                'checkpoint': self.checkpoint,
+                'reddit': self.us_social,
+                'edgar': self.edgar,
+                'insider': self.insider,
+                'whale': self.whale,
+                'sec_tickers': self.sec_tickers,
+                'short_squeeze': self.short_squeeze,
+                'price': self.us_price,
+                'watchlist': self.watchlist,
+                'rvol': self.rvol,
+                'calendar': self.calendar,
+                'universe': self.universe,
+                'news_body': self.ai.news,
+            }
             
             logger.info("✅ 10억 만들기 시스템 초기화 완료")
             logger.info("   ✓ 내부자 거래 (Form 4)")
@@ -60,6 +179,16 @@ class GlobalStockAlertSystem:
             logger.critical(f"❌ 초기화 실패: {e}")
             raise
     
+    def log_metrics(self):
+        """컴포넌트별 지표 로그"""
+        for name, component in self.metrics.items():
+            try:
+                stats = component.get_stats()
+                summary = ', '.join(f"{k}={v}" for k, v in stats.items())
+                logger.info(f"📈 [{name}] {summary}")
+            except Exception as e:
+                logger.debug(f"지표 수집 실패 ({name}): {e}")
+    
     async def send_error_alert(self, error):
         """오류 텔레그램 알림"""
         try:
@@ -68,41 +197,72 @@ class GlobalStockAlertSystem:
             logger.critical(f"오류 알림 실패: {e}")
     
     def is_us_market_hours(self):
-        try:
-            ny_tz = pytz.timezone('America/New_York')
-            now = datetime.now(ny_tz)
-            if now.weekday() >= 5: return False
-            market_start = now.replace(hour=4, minute=0, second=0, microsecond=0)
-            market_end = now.replace(hour=20, minute=0, second=0, microsecond=0)
-            return market_start <= now <= market_end
-        except Exception as e:
-            logger.error(f"미국 시간 체크 오류: {e}")
-            return True
+        """NYSE 장전~장후 (휴장일/조기 폐장 반영)"""
+        return self.calendar.is_active('us')
     
     def is_kr_market_hours(self):
-        try:
-            kr_tz = pytz.timezone('Asia/Seoul')
-            now = datetime.now(kr_tz)
-            if now.weekday() >= 5: return False
-            from datetime import time
-            market_start = time(9, 0)
-            market_end = time(15, 30)
-            current_time = now.time()
-            return market_start <= current_time <= market_end
-        except Exception as e:
-            logger.error(f"한국 시간 체크 오류: {e}")
-            return True
+        """KRX 정규장 (휴장일/첫 거래일/수능일 반영)"""
+        return self.calendar.is_active('kr')
+    
+    def next_sleep(self, scan_interval):
+        """구독한 세션이 하나라도 열려 있으면 스캔 주기, 아니면 다음 세션 시작까지"""
+        sleep = self.calendar.sleep_time(scan_interval, self.config.SESSION_MAX_SLEEP)
+        if sleep > scan_interval:
+            name, at = self.calendar.next_wake()
+            wake = datetime.fromtimestamp(at, pytz.timezone('Asia/Seoul'))
+            logger.info(f"💤 전 시장 장외, {sleep / 60:.0f}분 대기 (다음: {name} {wake:%m-%d %H:%M} KST)")
+        return sleep
+    
+    async def run_backtest_job(self):
+        """성과 증분 평가 + 하루 한 번 리포트 전송"""
+        await self.tracker.update()
+        
+        now = datetime.now(pytz.timezone('Asia/Seoul'))
+        if now.hour >= self.config.BACKTEST_REPORT_HOUR and self.last_report_date != now.date():
+            self.last_report_date = now.date()
+            await self.broadcast(self.tracker.report())
+    
+    async def broadcast(self, text):
+        """시스템 메시지는 전체 구독자에게 즉시 전송"""
+        await self.delivery.send_many(text, list(self.subscriptions.subs), urgent=True)
+    
+    async def publish_alert(self, stock_data, analysis, ai_score):
+        """조건이 맞는 구독자에게 포맷별로 한 번만 렌더링해서 전송"""
+        groups = self.subscriptions.match_by_format(
+            stock_data.get('symbol', 'UNKNOWN'),
+            stock_data.get('market', 'US'),
+            stock_data.get('trigger_type', ''),
+            ai_score,
+            stock_data.get('price', 0)
+        )
+        # 고득점은 즉시, 나머지는 몰릴 때 묶어서
+        urgent = analysis['score'] >= self.config.TELEGRAM_URGENT_SCORE
+        for fmt, chat_ids in groups.items():
+            if fmt == 'compact':
+                message = self.format_compact_message(stock_data, analysis)
+            else:
+                message = self.format_alert_message(stock_data, analysis)
+            await self.delivery.send_many(message, chat_ids, urgent=urgent)
+        return sum(len(chat_ids) for chat_ids in groups.values())
+    
+    def schedule_backtest(self):
+        """메인 루프를 막지 않도록 백그라운드 태스크로 실행"""
+        if time.time() - self.last_backtest_update < self.config.BACKTEST_UPDATE_INTERVAL:
+            return
+        if self.backtest_task is not None and not self.backtest_task.done():
+            return
+        self.last_backtest_update = time.time()
+        self.backtest_task = asyncio.create_task(self.run_backtest_job())
     
     def should_alert(self, symbol, market):
         """중복 알림 방지"""
-        now = datetime.now()
+        ttl = self.config.ALERT_COOLDOWN_KR if market == 'KR' else self.config.ALERT_COOLDOWN_US
         alert_key = f"{market}_{symbol}"
-        if alert_key in self.alerted_stocks:
-            last_alert = self.alerted_stocks[alert_key]
-            if (now - last_alert).total_seconds() < self.alert_cooldown:
-                return False
-        self.alerted_stocks[alert_key] = now
-        return True
+        if self.alerted_stocks.check_and_set(alert_key, ttl=ttl):
+            return True
+        if alert_key in self.restored_alert_keys:
+            self.checkpoint.suppressed += 1  # 재시작 전 상태가 없었다면 다시 보냈을 알림
+        return False
     
     async def process_alert(self, stock_data):
         """알림 처리 (AI 분석 + 옵션/다크풀 검증)"""
@@ -116,6 +276,12 @@ class GlobalStockAlertSystem:
                 logger.info(f"⏭️ {symbol} 쿨다운 중")
                 return
             
+            # 시간대별 상대 거래량 (AI 프롬프트용, 스캐너가 이미 넣었으면 그대로)
+            if market == 'US' and stock_data.get('rvol') is None and isinstance(stock_data.get('volume'), (int, float)):
+                rvol = self.rvol.rvol(symbol, stock_data['volume'])
+                if rvol is not None:
+                    stock_data['rvol'] = round(rvol, 2)
+            
             # === 🆕 2차 검증 (미국 주식만) ===
             if market == 'US' and symbol != 'US' and symbol != 'UNKNOWN':
                 logger.info(f"🔍 {symbol} 2차 검증 중...")
@@ -158,13 +324,10 @@ class GlobalStockAlertSystem:
             # 백테스팅 기록
             await self.tracker.log_alert(stock_data, analysis)
             
-            # 메시지 포맷팅
-            message = self.format_alert_message(stock_data, analysis)
+            # 구독자별 전송
+            recipients = await self.publish_alert(stock_data, analysis, ai_score)
             
-            # 전송
-            await self.telegram.send_message(message)
-            
-            logger.info(f"✅ {symbol} 알림 전송 완료 (점수: {ai_score:.1f}/10)")
+            logger.info(f"✅ {symbol} 알림 전송 대기열 등록 (점수: {ai_score:.1f}/10, 수신 {recipients}명)")
             
         except Exception as e:
             logger.error(f"알림 처리 오류 ({stock_data.get('symbol', 'UNKNOWN')}): {e}")
@@ -224,6 +387,20 @@ class GlobalStockAlertSystem:
         
         return msg
     
+    def format_compact_message(self, stock, analysis):
+        """한 줄 요약 포맷 (다수 종목 구독자용)"""
+        market = stock.get('market', 'US')
+        market_emoji = "🇰🇷" if market == 'KR' else "🇺🇸"
+        name = stock.get('name', stock.get('symbol')) if market == 'KR' else f"${stock.get('symbol')}"
+        
+        msg = f"{market_emoji} **{name}** AI {analysis['score']}/10"
+        if stock.get('change_percent'):
+            msg += f" | {stock.get('change_percent', 0):+.1f}%"
+        if analysis.get('target_price', 0) > 0 and analysis.get('upside'):
+            msg += f" | 목표 +{analysis['upside']:.0f}%"
+        msg += f"\n{stock.get('trigger_reason', '')[:120]}"
+        return msg
+    
     async def scan_us_stocks(self):
         """미국 주식 스캔"""
         if not self.is_us_market_hours(): return []
@@ -237,6 +414,7 @@ class GlobalStockAlertSystem:
                 self.insider.scan(),
                 self.short_squeeze.scan(),
                 self.whale.scan(),
+                self.watchlist.scan(),
                 return_exceptions=True
             )
             
@@ -248,6 +426,9 @@ class GlobalStockAlertSystem:
                     for alert in result: alert['market'] = 'US'
                     alerts.extend(result)
             
+            # 워런트/유닛/OTC/시총·가격 범위 밖 종목은 여기서 제외
+            alerts = self.universe.filter(alerts, self.alerted_stocks)
+            
             if alerts: 
                 logger.info(f"🇺🇸 미국: {len(alerts)}개 발견")
                 
@@ -271,6 +452,9 @@ class GlobalStockAlertSystem:
     async def run(self):
         logger.info("🚀 10억 만들기 글로벌 주식 알림 시스템 시작")
         
+        monitor_task = asyncio.create_task(self.loop_monitor.run())
+        delivery_task = asyncio.create_task(self.delivery.run())
+        
         try:
             start_msg = "✅ **10억 만들기 시스템 가동**\n\n"
             start_msg += "🔧 탑재 기능:\n"
@@ -279,14 +463,17 @@ class GlobalStockAlertSystem:
             start_msg += "✓ 고래 추적 (13D/G)\n"
             start_msg += "✓ 옵션/다크풀 검증\n"
             start_msg += "✓ 자동 백테스팅\n\n"
+            for warning in self.calendar.warnings():
+                start_msg += f"⚠️ {warning}\n"
             start_msg += f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            await self.telegram.send_message(start_msg)
+            await self.broadcast(start_msg)
         except Exception as e: 
             logger.error(f"시작 메시지 전송 실패: {e}")
         
         scan_interval = 30
         error_count = 0
         max_errors = 10
+        cycle = 0
         
         while True:
             try:
@@ -304,7 +491,16 @@ class GlobalStockAlertSystem:
                         await self.process_alert(alert)
                         await asyncio.sleep(2)
                 
-                await asyncio.sleep(scan_interval)
+                self.schedule_backtest()
+                self.rvol.schedule_refresh()
+                self.universe.schedule_refresh()
+                await self.checkpoint.maybe_save()
+                
+                cycle += 1
+                if cycle % self.config.METRICS_LOG_INTERVAL == 0:
+                    self.log_metrics()
+                
+                await asyncio.sleep(self.next_sleep(scan_interval))
                 error_count = 0
                 
             except KeyboardInterrupt:
@@ -317,10 +513,16 @@ class GlobalStockAlertSystem:
                 await self.send_error_alert(f"메인 루프 오류: {e}")
                 
                 if error_count >= max_errors:
-                    await self.telegram.send_message("🚨 **시스템 중단**\n\n연속 오류 발생")
+                    await self.broadcast("🚨 **시스템 중단**\n\n연속 오류 발생")
                     break
                 
                 await asyncio.sleep(60)
+        
+        monitor_task.cancel()
+        await self.checkpoint.save()
+        await self.delivery.close()
+        delivery_task.cancel()
+        await self.tracker.store.close()
 
 if __name__ == "__main__":
     try:
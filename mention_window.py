@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""종목별 언급 수 슬라이딩 윈도우 (1분 칸 x 24시간 링 버퍼, NumPy 배열)
+
+고정 언급 수 대신 '최근 1시간 언급 수'를 각 종목 자신의 지난 시간대별 분포와
+비교해 속도(평소 대비 배수)와 z-score 로 급증을 판단함.
+"""
+import time
+import numpy as np
+
+
+class MentionWindow:
+    def __init__(self, hours=24, bucket_seconds=60, max_tickers=5000):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = hours * 3600 // bucket_seconds
+        self.buckets_per_hour = 3600 // bucket_seconds
+        self.max_tickers = max_tickers
+
+        self.rows = {}  # ticker -> 행 번호
+        self.counts = np.zeros((64, self.n_buckets), dtype=np.uint16)
+        self._free = list(range(63, -1, -1))  # 비어 있는 행 (pop 하면 작은 번호부터)
+        self.current = None  # 마지막으로 기록한 칸 번호 (epoch // bucket_seconds)
+        self.started = None  # 윈도우 시작 칸 (기준선 길이 판단용)
+
+        self.added = 0
+        self.dropped = 0  # 행이 꽉 차서 버린 언급
+
+    # === 기록 ===
+
+    def _advance(self, bucket):
+        """bucket 까지 시간을 진행하면서 지나간 칸 비우기"""
+        if self.current is None:
+            self.current = self.started = bucket
+            return
+        if bucket <= self.current:
+            return
+        steps = min(bucket - self.current, self.n_buckets)
+        cols = (self.current + 1 + np.arange(steps)) % self.n_buckets
+        self.counts[:, cols] = 0
+        self.current = bucket
+
+    def _row(self, ticker):
+        row = self.rows.get(ticker)
+        if row is not None:
+            return row
+        if not self._free:
+            size = self.counts.shape[0]
+            if size < self.max_tickers:
+                grown = np.zeros((min(self.max_tickers, size * 2), self.n_buckets), dtype=np.uint16)
+                grown[:size] = self.counts
+                self.counts = grown
+                self._free = list(range(grown.shape[0] - 1, size - 1, -1))
+            elif not self._reclaim():
+                return None
+        row = self.rows[ticker] = self._free.pop()
+        return row
+
+    def _reclaim(self):
+        """윈도우 안에 언급이 하나도 없는 종목 행 반납"""
+        totals = self.counts.sum(axis=1)
+        empty = [t for t, r in self.rows.items() if totals[r] == 0]
+        for ticker in empty:
+            self._free.append(self.rows.pop(ticker))
+        return bool(empty)
+
+    def add(self, ticker, ts=None, count=1):
+        bucket = int((ts or time.time()) // self.bucket_seconds)
+        self._advance(bucket)
+        if bucket <= self.current - self.n_buckets:
+            return  # 윈도우보다 오래된 글
+        row = self._row(ticker)
+        if row is None:
+            self.dropped += count
+            return
+        col = bucket % self.n_buckets
+        self.counts[row, col] = min(65535, int(self.counts[row, col]) + count)
+        self.added += count
+
+    # === 급증 판단 ===
+
+    def surges(self, now=None, min_count=5, min_zscore=3.0, min_ratio=3.0, warmup_hours=3, warmup_count=10):
+        """[(ticker, 최근 1시간 언급, 평소 시간당 평균, z-score)] 급증 종목 (z 내림차순)
+
+        기준선이 warmup_hours 보다 짧으면 고정 언급 수(warmup_count)로 판단
+        """
+        if not self.rows:
+            return []
+        self._advance(int((now or time.time()) // self.bucket_seconds))
+
+        tickers = list(self.rows)
+        rows = np.fromiter((self.rows[t] for t in tickers), dtype=np.int64, count=len(tickers))
+        order = (self.current - np.arange(self.n_buckets)[::-1]) % self.n_buckets  # 오래된 칸 -> 최근 칸
+        hourly = self.counts[rows][:, order].reshape(len(tickers), -1, self.buckets_per_hour).sum(axis=2, dtype=np.int64)
+
+        recent = hourly[:, -1]
+        history = min(hourly.shape[1] - 1, (self.current - self.started) // self.buckets_per_hour)
+        if history < warmup_hours:
+            mask = recent >= warmup_count
+            mean = np.zeros(len(tickers))
+            z = np.where(mask, np.inf, 0.0)
+        else:
+            base = hourly[:, -1 - history:-1]
+            mean = base.mean(axis=1)
+            # 거의 언급이 없던 종목은 표준편차가 0 이라 포아송 근사 sqrt(mean) 와 1 중 큰 값으로 하한
+            std = np.maximum(base.std(axis=1), np.maximum(np.sqrt(mean), 1.0))
+            z = (recent - mean) / std
+            mask = (recent >= min_count) & (z >= min_zscore) & (recent >= min_ratio * np.maximum(mean, 1.0))
+
+        hits = np.flatnonzero(mask)
+        hits = hits[np.argsort(-z[hits])]
+        return [(tickers[i], int(recent[i]), float(mean[i]), float(z[i])) for i in hits]
+
+    # === 체크포인트 ===
+
+    def dump(self):
+        rows = sorted(self.rows.items(), key=lambda kv: kv[1])
+        return {
+            'tickers': [t for t, _ in rows],
+            'counts': self.counts[[r for _, r in rows]].copy(),
+            'current': self.current,
+            'started': self.started,
+        }
+
+    def load(self, state, elapsed=0.0):
+        tickers = state['tickers']
+        if state['counts'].shape[1] != self.n_buckets or not tickers:
+            return
+        capacity = max(64, min(self.max_tickers, len(tickers)))
+        n = min(capacity, len(tickers))
+        self.counts = np.zeros((capacity, self.n_buckets), dtype=np.uint16)
+        self.counts[:n] = state['counts'][:n]
+        self.rows = {t: i for i, t in enumerate(tickers[:n])}
+        self._free = list(range(capacity - 1, len(self.rows) - 1, -1))
+        self.current, self.started = state['current'], state['started']
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get_stats(self):
+        return {
+            'tickers': len(self.rows),
+            'added': self.added,
+            'dropped': self.dropped,
+            'kb': self.counts.nbytes // 1024,
+        }
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""뉴스 본문 스트리밍 추출 (lxml HTMLPullParser) + URL 캐시
+
+기사 HTML 전체를 받아 BeautifulSoup 트리를 만든 뒤 3,000자만 쓰던 것을,
+응답을 조각 단위로 받아가며 파싱하고 <p> 문단이 충분히 모이면 바로 연결을 끊음.
+받는 바이트에도 상한을 두고, 같은 URL 재분석은 TTL 캐시에서 바로 돌려줌.
+"""
+import asyncio
+import logging
+import re
+import sys
+import time
+import aiohttp
+from lxml import etree
+from ttl_map import TTLMap
+
+logger = logging.getLogger(__name__)
+
+SKIP_TAGS = frozenset({'script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'form', 'svg'})
+# 인라인 요소는 끝날 때 비우지 않고 부모 블록이 한꺼번에 읽음 (문장 순서 유지)
+INLINE_TAGS = frozenset({'a', 'b', 'i', 'em', 'strong', 'span', 'font', 'u', 'small', 'sup', 'sub', 'br', 'abbr', 'time'})
+_SPACE_RE = re.compile(r'\s+')
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+class ParagraphCollector:
+    """HTML 조각을 feed() 로 넣으면 <p> 문단을 max_chars 까지 모음 (done 이 되면 그만 넣어도 됨)"""
+
+    def __init__(self, max_chars=3000, encoding=None):
+        self.max_chars = max_chars
+        self.encoding = encoding    # 없으면 첫 조각의 <meta charset> 을 보고, 그것도 없으면 UTF-8
+        self.parser = None
+        self.paragraphs = []
+        self.chars = 0
+        self.fallback = []          # <p> 가 거의 없는 페이지용 (본문 전체 텍스트)
+        self.fallback_chars = 0
+        self._skip = 0              # script/nav/footer 등 안쪽 깊이
+
+    @property
+    def done(self):
+        return self.chars >= self.max_chars
+
+    def feed(self, data):
+        if self.parser is None:
+            if self.encoding is None:
+                match = _META_CHARSET_RE.search(data[:16384])
+                self.encoding = match.group(1).decode('ascii') if match else 'utf-8'
+            self.parser = etree.HTMLPullParser(events=('start', 'end'), encoding=self.encoding)
+        self.parser.feed(data)
+        self._drain()
+
+    def close(self):
+        if self.parser is None:
+            return
+        try:
+            self.parser.close()
+        except etree.LxmlError:
+            pass
+        self._drain()
+
+    def _drain(self):
+        for event, el in self.parser.read_events():
+            tag = el.tag if isinstance(el.tag, str) else ''
+            if event == 'start':
+                if tag in SKIP_TAGS:
+                    self._skip += 1
+                continue
+
+            if tag in SKIP_TAGS:
+                self._skip -= 1
+            elif tag in INLINE_TAGS and not self._skip:
+                continue
+            elif not self._skip:
+                if tag == 'p':
+                    text = _SPACE_RE.sub(' ', ''.join(el.itertext())).strip()
+                    if text and not self.done:
+                        self.paragraphs.append(text)
+                        self.chars += len(text) + 1
+                else:
+                    # 자기 텍스트 + 인라인 자식 + 자식 꼬리 (블록 자식은 자기 차례에 이미 처리)
+                    parts = [el.text]
+                    for child in el:
+                        if child.tag in INLINE_TAGS:
+                            parts.append(''.join(child.itertext()))
+                        parts.append(child.tail)
+                    text = _SPACE_RE.sub(' ', ''.join(p for p in parts if p)).strip()
+                if text and self.fallback_chars < self.max_chars:
+                    self.fallback.append(text)
+                    self.fallback_chars += len(text) + 1
+            # 처리한 요소는 비워서 메모리 유지 (꼬리 텍스트는 부모 차례에 필요)
+            el.clear(keep_tail=True)
+
+    def text(self):
+        text = ' '.join(self.paragraphs)
+        if len(text) < 100 and self.fallback_chars > len(text):
+            text = ' '.join(self.fallback)
+        return text[:self.max_chars] + "..." if len(text) > self.max_chars else text
+
+
+def extract_text(html, max_chars=3000, chunk_size=16384):
+    """이미 받은 HTML (bytes) -> (본문, 실제로 파싱한 바이트 수)"""
+    collector = ParagraphCollector(max_chars)
+    consumed = 0
+    for start in range(0, len(html), chunk_size):
+        chunk = html[start:start + chunk_size]
+        collector.feed(chunk)
+        consumed += len(chunk)
+        if collector.done:
+            break
+    else:
+        collector.close()
+    return collector.text(), consumed
+
+
+class NewsExtractor:
+    def __init__(self, max_bytes=512 * 1024, max_chars=3000, cache_ttl=86400, timeout=5, chunk_size=16384):
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        }
+        # URL -> 추출한 본문 (실패는 캐시하지 않음)
+        self.cache = TTLMap(cache_ttl, max_size=5000)
+
+        self.fetched = 0
+        self.cache_hits = 0
+        self.bytes_read = 0
+        self.early_stops = 0    # 문단이 다 모여 중간에 끊은 횟수
+        self.byte_caps = 0      # 바이트 상한에 걸린 횟수
+        self.parse_time = 0.0
+
+    async def fetch(self, url, session=None):
+        """URL -> 본문 (실패하면 사유 문자열, 기존 프롬프트 형식 그대로)"""
+        if not url or not url.startswith('http'):
+            return "본문 수집 불가 (잘못된 URL)"
+        cached = self.cache.get(url)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        try:
+            if session is None:
+                async with aiohttp.ClientSession() as own:
+                    text = await self._fetch(own, url)
+            else:
+                text = await self._fetch(session, url)
+        except Exception as e:
+            return f"본문 수집 중 에러: {str(e)}"
+
+        if text and not text.startswith("본문 접근 실패"):
+            self.cache.set(url, text)
+        return text
+
+    async def _fetch(self, session, url):
+        async with session.get(url, headers=self.headers, timeout=self.timeout) as response:
+            if response.status != 200:
+                return f"본문 접근 실패 (상태코드: {response.status})"
+
+            self.fetched += 1
+            collector = ParagraphCollector(self.max_chars, encoding=response.charset)
+            received = 0
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                received += len(chunk)
+                started = time.perf_counter()
+                collector.feed(chunk)
+                self.parse_time += time.perf_counter() - started
+                if collector.done:
+                    self.early_stops += 1
+                    break
+                if received >= self.max_bytes:
+                    self.byte_caps += 1
+                    collector.close()  # 열린 요소를 닫아 지금까지 받은 텍스트 확보
+                    break
+            else:
+                collector.close()
+            self.bytes_read += received
+            # 중간에 빠져나오면 나머지 본문을 받지 않고 연결을 닫음
+            if not response.content.at_eof():
+                response.close()
+            return collector.text()
+
+    def get_stats(self):
+        requests = max(1, self.fetched)
+        return {
+            'fetched': self.fetched,
+            'cache_hits': self.cache_hits,
+            'kb': self.bytes_read // 1024,
+            'kb_per_article': round(self.bytes_read / requests / 1024, 1),
+            'early_stops': self.early_stops,
+            'byte_caps': self.byte_caps,
+            'parse_ms': round(self.parse_time / requests * 1000, 2),
+        }
+
+
+# === 저장한 기사로 비교: BeautifulSoup 전체 파싱 vs 스트리밍 ===
+# python news_extractor.py [기사.html ...]
+# 인자가 없으면 흔한 뉴스 페이지 구조(거대한 head 스크립트, 메뉴, 본문 문단, 댓글/추천 기사)를 흉내 낸 합성 기사 사용
+
+def _synthetic_article(i, paragraphs=40, tail_kb=300):
+    head = '<script>' + 'var x=1;' * 4000 + '</script><style>' + '.a{color:red}' * 2000 + '</style>'
+    nav = '<nav>' + ''.join(f'<a href="/s{k}">Section {k}</a>' for k in range(200)) + '</nav>'
+    body = ''.join(f'<p>Company {i} announced paragraph {k}: the FDA granted approval for the phase 3 '
+                   f'trial results, and revenue guidance was raised for the coming fiscal year.</p>'
+                   for k in range(paragraphs))
+    tail = '<aside>' + ''.join(f'<div class="c"><p>comment {k} ' + 'lorem ipsum ' * 20 + '</p></div>'
+                               for k in range(tail_kb * 1024 // 300)) + '</aside>'
+    return (f'<html><head><title>Article {i}</title>{head}</head><body><header>{nav}</header>'
+            f'<article>{body}</article>{tail}<footer>(c) News</footer></body></html>').encode()
+
+
+def _bench(paths, repeat=3):
+    if paths:
+        articles = [open(p, 'rb').read() for p in paths]
+    else:
+        articles = [_synthetic_article(i) for i in range(30)]
+    total = sum(len(a) for a in articles)
+
+    from bs4 import BeautifulSoup
+    started = time.perf_counter()
+    for html in articles:
+        soup = BeautifulSoup(html, 'html.parser')
+        for tag in soup(["script", "style", "nav", "footer", "header"]):
+            tag.decompose()
+        text = ' '.join(p.get_text() for p in soup.find_all('p'))[:3000]
+    bs_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    consumed = 0
+    for html in articles:
+        text, used = extract_text(html)
+        consumed += used
+    stream_time = time.perf_counter() - started
+
+    n = len(articles)
+    print(f"기사 {n}건 ({total / 1e6:.1f} MB)")
+    print(f"BeautifulSoup 전체: {bs_time / n * 1000:.1f} ms/건, {total / n / 1024:.0f} KB/건 수신")
+    print(f"스트리밍 (3,000자에서 중단): {stream_time / n * 1000:.1f} ms/건, {consumed / n / 1024:.0f} KB/건 수신 "
+          f"({consumed / total:.0%})")
+    print(f"본문 예: {text[:120]}...")
+
+    # 같은 URL 반복 분석 (재시작/재신호) -> 캐시
+    extractor = NewsExtractor()
+
+    async def replay():
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/a/{i}', lambda req: web.Response(body=articles[int(req.match_info['i'])],
+                                                               content_type='text/html'))
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        async with aiohttp.ClientSession() as session:
+            for _ in range(repeat):
+                for i in range(n):
+                    await extractor.fetch(f'http://127.0.0.1:{port}/a/{i}', session)
+        await runner.cleanup()
+
+    asyncio.run(replay())
+    print(f"HTTP 재생 ({n}건 x {repeat}회): {extractor.get_stats()}")
+
+
+if __name__ == '__main__':
+    _bench(sys.argv[1:])
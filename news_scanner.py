@@ -2,7 +2,7 @@ import aiohttp
 import asyncio
 import logging
 import feedparser
-from bs4 import BeautifulSoup
+from parsers import extract_prnewswire_cards
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -101,25 +101,10 @@ class NewsScanner:
                 async with session.get(source['url'], headers=headers, timeout=10) as response:
                     if response.status != 200: return news_items
                     html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
                     
-                    articles = soup.select('.card-list .card')[:15]
-                    for article in articles:
-                        try:
-                            title_elem = article.select_one('h3')
-                            if not title_elem: continue
-                            a_tag = title_elem.find('a')
-                            if a_tag:
-                                title = a_tag.get_text(strip=True)
-                                link = a_tag['href']
-                            else:
-                                title = title_elem.get_text(strip=True)
-                                link = article.find('a')['href']
-                            
-                            if link and not link.startswith('http'): 
-                                link = source['base_url'] + link
-                            self._add_if_valid(news_items, title, link, "US", source['name'])
-                        except: continue
+                    cards = extract_prnewswire_cards(html, source['base_url'], limit=15)
+                    for title, link in cards:
+                        self._add_if_valid(news_items, title, link, "US", source['name'])
         except Exception: pass
         return news_items
 
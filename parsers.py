@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+"""스크래핑 테이블 전용 고속 추출기 (lxml + XPath)
+
+페이지 전체를 BeautifulSoup 트리로 만들지 않고, 필요한 영역(테이블/카드 목록)만
+문자열에서 잘라내 lxml 로 파싱한 뒤 타입이 지정된 튜플로 돌려줌.
+"""
+import os
+import re
+import sys
+import time
+import tracemalloc
+from typing import NamedTuple, Optional
+from lxml import html as lxml_html
+
+
+class YahooRow(NamedTuple):
+    symbol: str
+    price: float
+    change_pct: float
+    volume: float
+
+
+class FinvizRow(NamedTuple):
+    symbol: str
+    price: float
+    short_float: float
+    change_pct: float
+
+
+class FinvizShortRow(NamedTuple):
+    symbol: str
+    float_shares: float
+    short_float: float     # %
+    short_ratio: float     # 일 (days to cover)
+    avg_volume: float
+    price: float
+
+
+class NaverQuantRow(NamedTuple):
+    code: str
+    name: str
+    price: int
+    change_pct: float
+    volume: int
+
+
+class NaverMarketSumRow(NamedTuple):
+    code: str
+    name: str
+    price: int
+    market_cap_100m: int   # 억 원
+    shares: int            # 주
+
+
+class NewsCard(NamedTuple):
+    title: str
+    link: str
+
+
+_CODE_RE = re.compile(r'code=(\d+)')
+_PAGE_RE = re.compile(r'page=(\d+)')
+_FINVIZ_TOTAL_RE = re.compile(r'/\s*([\d,]+)\s*Total')
+_NON_DIGIT_RE = re.compile(r'\D')
+_CLASS_XPATH = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+
+
+def _text(el):
+    """BeautifulSoup get_text(strip=True) 와 같은 결과"""
+    return ''.join(s.strip() for s in el.itertext())
+
+
+def _slice_region(html, marker, start_tag, end_tag=None):
+    """marker 를 포함하는 start_tag 부터 end_tag 까지만 잘라냄 (없으면 None)"""
+    pos = html.find(marker)
+    if pos < 0:
+        return None
+    start = html.rfind(start_tag, 0, pos)
+    if start < 0:
+        start = pos
+    if end_tag is None:
+        return html[start:]
+    end = html.find(end_tag, pos)
+    return html[start:] if end < 0 else html[start:end + len(end_tag)]
+
+
+def _fragment(region):
+    try:
+        return lxml_html.fromstring(region)
+    except Exception:
+        return None
+
+
+def parse_volume(text):
+    """'1.2M', '350K' 형식의 거래량을 숫자로 변환"""
+    text = text.upper().replace(',', '')
+    try:
+        if 'B' in text: return float(text.replace('B', '')) * 1_000_000_000
+        elif 'M' in text: return float(text.replace('M', '')) * 1_000_000
+        elif 'K' in text: return float(text.replace('K', '')) * 1_000
+        else: return float(text)
+    except: return 0.0
+
+
+def extract_yahoo_gainers(html):
+    """야후 급등/프리마켓 테이블 (table tbody tr)"""
+    rows = []
+    region = _slice_region(html, '<tbody', '<table', '</table>')
+    root = _fragment(region) if region else None
+    if root is None:
+        return rows
+
+    for tr in root.xpath('//tbody/tr'):
+        try:
+            cols = tr.xpath('./td')
+            if len(cols) < 6: continue
+
+            symbol_el = cols[0].xpath('.//*[' + _CLASS_XPATH.format('symbol') + ']')
+            symbol = _text(symbol_el[0] if symbol_el else cols[0]).split(' ')[0]
+            price = float(_text(cols[1]).replace(',', ''))
+            change_pct = float(_text(cols[3]).replace('%', '').replace('+', '').replace(',', ''))
+            volume = parse_volume(_text(cols[5]))
+
+            rows.append(YahooRow(symbol, price, change_pct, volume))
+        except Exception:
+            continue
+    return rows
+
+
+def extract_finviz_screener(html, limit=20):
+    """Finviz 스크리너 테이블 (screener_table / #screener-table)"""
+    rows = []
+    region = (_slice_region(html, 'screener_table', '<table', '</table>')
+              or _slice_region(html, 'id="screener-table"', '<table', '</table>'))
+    root = _fragment(region) if region else None
+    if root is None:
+        return rows
+
+    trs = root.xpath('(//table)[1]//tr')[1:limit + 1]  # 헤더 제외
+    for tr in trs:
+        try:
+            # 1: 티커, 6: 가격, 9: 공매도 비율, 10: 등락률
+            cols = [_text(td).strip() for td in tr.xpath('./td')]
+            if len(cols) < 12: continue
+
+            price_text = cols[6]
+            price = float(price_text) if price_text.replace('.', '', 1).isdigit() else 0
+
+            short_text = cols[9].replace('%', '')
+            short_float = float(short_text) if short_text.replace('.', '', 1).isdigit() else 0
+
+            change_text = cols[10].replace('%', '').replace('+', '')
+            change_pct = float(change_text) if change_text.replace('.', '', 1).replace('-', '', 1).isdigit() else 0
+
+            rows.append(FinvizRow(cols[1], price, short_float, change_pct))
+        except Exception:
+            continue
+    return rows
+
+
+def extract_finviz_total(html):
+    """스크리너 결과 총 종목 수 ('#1 / 523 Total', 없으면 0)"""
+    match = _FINVIZ_TOTAL_RE.search(html)
+    return int(match.group(1).replace(',', '')) if match else 0
+
+
+def extract_finviz_short_table(html):
+    """Finviz 소유 구조 뷰(v=131) 한 페이지 -> 유동주식/공매도 비율/숏 레이쇼 (헤더 이름으로 열 찾기)"""
+    rows = []
+    region = (_slice_region(html, 'screener_table', '<table', '</table>')
+              or _slice_region(html, 'id="screener-table"', '<table', '</table>'))
+    root = _fragment(region) if region else None
+    if root is None:
+        return rows
+
+    table = root if root.tag == 'table' else (root.xpath('//table') or [root])[0]
+    columns = {name: i for i, name in enumerate(_text(td) for td in table.xpath('(.//tr)[1]/*'))}
+    try:
+        ticker_col = columns['Ticker']
+        float_col = columns['Float']
+        short_col = columns.get('Short Float', columns.get('Float Short'))
+        ratio_col = columns['Short Ratio']
+        avg_col = columns['Avg Volume']
+        price_col = columns['Price']
+    except KeyError:
+        return rows
+    if short_col is None:
+        return rows
+    last = max(ticker_col, float_col, short_col, ratio_col, avg_col, price_col)
+
+    for tr in table.xpath('.//tr')[1:]:
+        try:
+            cols = [_text(td) for td in tr.xpath('./td')]
+            if len(cols) <= last: continue
+            rows.append(FinvizShortRow(
+                cols[ticker_col],
+                parse_volume(cols[float_col]),
+                _to_float(cols[short_col]),
+                _to_float(cols[ratio_col]),
+                parse_volume(cols[avg_col]),
+                _to_float(cols[price_col]),
+            ))
+        except Exception:
+            continue
+    return rows
+
+
+def _to_int(text):
+    digits = _NON_DIGIT_RE.sub('', text)
+    return int(digits) if digits else 0
+
+
+def _to_float(text):
+    try:
+        return float(text.replace(',', '').replace('%', '').replace('+', '').strip())
+    except ValueError:
+        return 0.0
+
+
+def _header_index(table):
+    """헤더 th 텍스트 -> 열 번호 (열 순서가 바뀌어도 이름으로 찾기 위함)"""
+    return {_text(th): i for i, th in enumerate(table.xpath('.//thead//th | .//tr[1]/th'))}
+
+
+def extract_naver_last_page(html):
+    """페이지 이동 영역의 '맨뒤' 링크 페이지 번호 (없으면 1)"""
+    region = _slice_region(html, 'class="pgRR"', '<td', '</td>')
+    match = _PAGE_RE.search(region) if region else None
+    return int(match.group(1)) if match else 1
+
+
+def extract_naver_market_sum(html):
+    """네이버 시가총액 목록 (sise_market_sum, 시가총액 억 / 상장주식수 천주)"""
+    rows = []
+    region = _slice_region(html, 'class="type_2"', '<table', '</table>')
+    root = _fragment(region) if region else None
+    if root is None:
+        return rows
+
+    columns = _header_index(root)
+    try:
+        price_col, cap_col, shares_col = columns['현재가'], columns['시가총액'], columns['상장주식수']
+    except KeyError:
+        return rows
+
+    for tr in root.xpath('.//tr[td]'):
+        try:
+            cols = tr.xpath('./td')
+            if len(cols) <= max(price_col, cap_col, shares_col): continue
+            name_el = tr.xpath('.//a[contains(@href, "code=")]')
+            if not name_el: continue
+
+            code_match = _CODE_RE.search(name_el[0].get('href', ''))
+            if not code_match: continue
+
+            rows.append(NaverMarketSumRow(
+                code_match.group(1),
+                _text(name_el[0]),
+                _to_int(_text(cols[price_col])),
+                _to_int(_text(cols[cap_col])),
+                _to_int(_text(cols[shares_col])) * 1000,
+            ))
+        except Exception:
+            continue
+    return rows
+
+
+def extract_naver_quant(html):
+    """네이버 시세 순위 테이블 (거래량 상위/상승/상한가 공통, 헤더 이름으로 열 찾기)
+
+    상한가 페이지처럼 한 페이지에 시장별 테이블이 여러 개여도 모두 읽음
+    """
+    rows = []
+    region = _slice_region(html, 'class="type_', '<table')
+    root = _fragment(region) if region else None
+    if root is None:
+        return rows
+
+    for table in root.xpath('//table[.//th[normalize-space()="종목명"]]'):
+        columns = _header_index(table)
+        try:
+            price_col, change_col, volume_col = columns['현재가'], columns['등락률'], columns['거래량']
+        except KeyError:
+            continue
+
+        for tr in table.xpath('.//tr[td]'):
+            try:
+                cols = tr.xpath('./td')
+                if len(cols) <= max(price_col, change_col, volume_col): continue
+                name_el = tr.xpath('.//a[contains(@href, "code=")]')
+                if not name_el: continue
+
+                code_match = _CODE_RE.search(name_el[0].get('href', ''))
+                if not code_match: continue
+
+                rows.append(NaverQuantRow(
+                    code_match.group(1),
+                    _text(name_el[0]),
+                    _to_int(_text(cols[price_col])),
+                    _to_float(_text(cols[change_col])),
+                    _to_int(_text(cols[volume_col])),
+                ))
+            except Exception:
+                continue
+    return rows
+
+
+def extract_naver_market_cap(html) -> Optional[int]:
+    """종목 메인 페이지의 #_market_sum (억 단위)"""
+    region = _slice_region(html, 'id="_market_sum"', '<em', '</em>')
+    root = _fragment(region) if region else None
+    if root is None:
+        return None
+
+    try:
+        text = root.text_content()
+        if '조' in text:
+            parts = text.split('조')
+            trillion = int(_NON_DIGIT_RE.sub('', parts[0])) * 10000
+            billion = 0
+            if len(parts) > 1 and parts[1].strip():
+                billion = int(_NON_DIGIT_RE.sub('', parts[1]))
+            return trillion + billion
+        return int(_NON_DIGIT_RE.sub('', text))
+    except Exception:
+        return None
+
+
+def extract_prnewswire_cards(html, base_url='', limit=15):
+    """PR Newswire 보도자료 카드 (.card-list .card)"""
+    cards = []
+    region = _slice_region(html, 'card-list', '<div')
+    root = _fragment(region) if region else None
+    if root is None:
+        return cards
+
+    xpath = ('//*[' + _CLASS_XPATH.format('card-list') + ']'
+             '//*[' + _CLASS_XPATH.format('card') + ']')
+    for card in root.xpath(xpath)[:limit]:
+        try:
+            h3 = card.xpath('.//h3')
+            if not h3: continue
+            a_tag = h3[0].xpath('.//a')
+            if a_tag:
+                title = _text(a_tag[0])
+                link = a_tag[0].get('href')
+            else:
+                title = _text(h3[0])
+                link = card.xpath('.//a')[0].get('href')
+
+            if link and not link.startswith('http'):
+                link = base_url + link
+            cards.append(NewsCard(title, link))
+        except Exception:
+            continue
+    return cards
+
+
+# === 벤치마크 + 회귀 확인 (저장된 페이지로 실행) ===
+# python parsers.py                              -> fixtures/pages 의 소스별 저장 페이지 전부
+# python parsers.py yahoo saved_gainers.html [반복횟수]
+#
+# 비교 기준은 예전 BeautifulSoup 선택자 코드 (행/칸 선택은 그대로, 열 위치와 숫자 변환은
+# 이후 바뀐 규칙(헤더 이름 기준, 음수 등락률)에 맞춤). 두 결과 행이 하나라도 다르면 실패.
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+
+
+def _bs4_header_index(table):
+    return {th.get_text(strip=True): i for i, th in enumerate(table.select('thead th') or table.find('tr').find_all('th'))}
+
+
+def _bs4_yahoo(soup):
+    rows = []
+    for row in soup.select('table tbody tr'):
+        try:
+            cols = row.select('td')
+            if len(cols) < 6: continue
+            symbol_div = cols[0].select_one('.symbol') or cols[0]
+            symbol = symbol_div.get_text(strip=True).split(' ')[0]
+            price = float(cols[1].get_text(strip=True).replace(',', ''))
+            change_pct = float(cols[3].get_text(strip=True).replace('%', '').replace('+', '').replace(',', ''))
+            rows.append(YahooRow(symbol, price, change_pct, parse_volume(cols[5].get_text(strip=True))))
+        except Exception:
+            continue
+    return rows
+
+
+def _bs4_finviz(soup):
+    rows = []
+    table = soup.find('table', class_='screener_table') or soup.find('table', id='screener-table')
+    if not table:
+        return rows
+    for row in table.find_all('tr')[1:21]:
+        cols = row.find_all('td')
+        if len(cols) < 12: continue
+        price_text = cols[6].text.strip()
+        price = float(price_text) if price_text.replace('.', '', 1).isdigit() else 0
+        short_text = cols[9].text.strip().replace('%', '')
+        short_float = float(short_text) if short_text.replace('.', '', 1).isdigit() else 0
+        change_text = cols[10].text.strip().replace('%', '').replace('+', '')
+        change_pct = float(change_text) if change_text.replace('.', '', 1).replace('-', '', 1).isdigit() else 0
+        rows.append(FinvizRow(cols[1].text.strip(), price, short_float, change_pct))
+    return rows
+
+
+def _bs4_finviz_short(soup):
+    rows = []
+    table = soup.find('table', class_='screener_table') or soup.find('table', id='screener-table')
+    if not table:
+        return rows
+    columns = _bs4_header_index(table)
+    short_col = columns.get('Short Float', columns.get('Float Short'))
+    for row in table.find_all('tr')[1:]:
+        cols = [td.get_text(strip=True) for td in row.find_all('td')]
+        if len(cols) < len(columns): continue
+        rows.append(FinvizShortRow(cols[columns['Ticker']], parse_volume(cols[columns['Float']]),
+                                   _to_float(cols[short_col]), _to_float(cols[columns['Short Ratio']]),
+                                   parse_volume(cols[columns['Avg Volume']]), _to_float(cols[columns['Price']])))
+    return rows
+
+
+def _bs4_naver_rows(soup, selector, fields):
+    rows = []
+    for table in soup.select(selector):
+        columns = _bs4_header_index(table)
+        for row in table.select('tr'):
+            cols = row.select('td')
+            if len(cols) < len(columns): continue
+            name_elem = cols[1].select_one('a')
+            if not name_elem: continue
+            code_match = re.search(r'code=(\d+)', name_elem['href'])
+            if not code_match: continue
+            rows.append((code_match.group(1), name_elem.get_text(strip=True),
+                         *(convert(cols[columns[name]].get_text(strip=True)) for name, convert in fields)))
+    return rows
+
+
+def _bs4_naver_quant(soup):
+    fields = (('현재가', _to_int), ('등락률', _to_float), ('거래량', _to_int))
+    return [NaverQuantRow(*row) for row in _bs4_naver_rows(soup, 'table.type_2, table.type_5', fields)]
+
+
+def _bs4_naver_market_sum(soup):
+    fields = (('현재가', _to_int), ('시가총액', _to_int), ('상장주식수', lambda t: _to_int(t) * 1000))
+    return [NaverMarketSumRow(*row) for row in _bs4_naver_rows(soup, 'table.type_2', fields)]
+
+
+def _bs4_naver_cap(soup):
+    mc_elem = soup.select_one('#_market_sum')
+    if not mc_elem:
+        return None
+    if '조' in mc_elem.get_text():
+        parts = mc_elem.get_text().split('조')
+        trillion = int(re.sub(r'\D', '', parts[0])) * 10000
+        billion = 0
+        if len(parts) > 1 and parts[1].strip():
+            billion = int(re.sub(r'\D', '', parts[1]))
+        return trillion + billion
+    return int(re.sub(r'\D', '', mc_elem.get_text()))
+
+
+def _bs4_prnewswire(soup):
+    cards = []
+    for article in soup.select('.card-list .card')[:15]:
+        try:
+            title_elem = article.select_one('h3')
+            if not title_elem: continue
+            a_tag = title_elem.find('a')
+            if a_tag:
+                title, link = a_tag.get_text(strip=True), a_tag['href']
+            else:
+                title, link = title_elem.get_text(strip=True), article.find('a')['href']
+            cards.append(NewsCard(title, link))
+        except Exception:
+            continue
+    return cards
+
+
+# 소스 -> (추출기, BeautifulSoup 기준, 저장 페이지)
+_BENCH = {
+    'yahoo': (extract_yahoo_gainers, _bs4_yahoo, 'yahoo_gainers.html'),
+    'finviz': (extract_finviz_screener, _bs4_finviz, 'finviz_screener.html'),
+    'finviz_short': (extract_finviz_short_table, _bs4_finviz_short, 'finviz_short.html'),
+    'naver_quant': (extract_naver_quant, _bs4_naver_quant, 'naver_quant.html'),
+    'naver_cap': (extract_naver_market_cap, _bs4_naver_cap, 'naver_main.html'),
+    'naver_market_sum': (extract_naver_market_sum, _bs4_naver_market_sum, 'naver_market_sum.html'),
+    'prnewswire': (extract_prnewswire_cards, _bs4_prnewswire, 'prnewswire.html'),
+}
+
+
+def _measure(fn, html, repeat):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(html)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _bench(source, path=None, repeat=20):
+    from bs4 import BeautifulSoup
+
+    extractor, reference, fixture = _BENCH[source]
+    with open(path or os.path.join(FIXTURE_DIR, fixture), encoding='utf-8') as f:
+        html = f.read()
+
+    results = {}
+    for label, fn in (('lxml', extractor), ('bs4', lambda h: reference(BeautifulSoup(h, 'html.parser')))):
+        result, elapsed, peak = _measure(fn, html, repeat)
+        results[label] = result
+        count = len(result) if isinstance(result, list) else int(result is not None)
+        rows_per_sec = count * repeat / elapsed if elapsed else 0
+        print(f"{source:16s} {label:5s} rows={count:4d} {rows_per_sec:12,.0f} rows/s "
+              f"{elapsed / repeat * 1000:8.2f} ms/page peak={peak / 1024:,.0f} KiB")
+
+    assert results['lxml'], f"{source}: 추출 결과 없음"
+    assert results['lxml'] == results['bs4'], f"{source}: 추출기 결과가 BeautifulSoup 기준과 다름"
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 1:
+        for name in _BENCH:
+            _bench(name)
+        print(f"저장 페이지 {len(_BENCH)}종 모두 BeautifulSoup 기준과 일치")
+    elif sys.argv[1] in _BENCH:
+        _bench(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None,
+               int(sys.argv[3]) if len(sys.argv) > 3 else 20)
+    else:
+        print(f"사용법: python parsers.py [{'|'.join(_BENCH)} [저장된 html] [반복횟수]]")
+        sys.exit(1)
@@ -1,21 +1,33 @@
 # -*- coding: utf-8 -*-
-import json
 import os
 from datetime import datetime, timedelta
 import logging
-import yfinance as yf
+import time
 import asyncio
+import numpy as np
+from config import Config
+from alert_store import AlertStore
+from bar_store import BarStore
+from backtest_engine import (
+    BacktestEngine, RunningAggregates, HORIZONS, EXCURSION_WINDOW, SUCCESS_PCT
+)
 
 logger = logging.getLogger(__name__)
 
 class PerformanceTracker:
-    def __init__(self):
-        self.history_file = '/mnt/user-data/outputs/alert_history.jsonl'
+    def __init__(self, bar_store=None):
+        # 구버전 JSONL 기록은 최초 1회 SQLite 로 이관
+        self.history_file = os.path.join(Config.DATA_DIR, 'alert_history.jsonl')
+        self.store = AlertStore(os.path.join(Config.DATA_DIR, 'alert_history.db'))
+        self.store.import_jsonl(self.history_file)
         
-        # 파일 없으면 생성
-        if not os.path.exists(self.history_file):
-            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-            open(self.history_file, 'a').close()
+        self.bar_store = bar_store or BarStore(os.path.join(Config.DATA_DIR, 'bars'))
+        self.engine = BacktestEngine(self.bar_store)
+        
+        # 증분 평가 누적 집계 (DB 에서 복원)
+        self.aggregates = RunningAggregates()
+        self.aggregates.load(self.store.load_aggregates())
+        self.last_update = None
     
     async def log_alert(self, stock_data, analysis):
         """알림 발송 시 기록"""
@@ -28,126 +40,163 @@ class PerformanceTracker:
                 'trigger_type': stock_data.get('trigger_type', ''),
                 'trigger_reason': stock_data.get('trigger_reason', ''),
                 'target_price': analysis.get('target_price', 0),
+                'stop_loss': analysis.get('stop_loss', 0),
                 'upside': analysis.get('upside', 0),
                 'market': stock_data.get('market', 'US')
             }
             
-            # JSONL 형식으로 추가 (한 줄씩)
-            with open(self.history_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            # 그룹 커밋 큐에 적재 (이벤트 루프에서 파일 I/O 없음)
+            self.store.add(record)
             
             logger.debug(f"📊 백테스팅 기록: {stock_data.get('symbol')}")
             
         except Exception as e:
             logger.error(f"성과 로그 실패: {e}")
     
-    async def backtest(self, days=7):
-        """과거 알림 성과 분석"""
+    async def update(self, now=None):
+        """새로 만기된 구간만 평가해 누적 집계에 반영 (O(신규 알림))"""
         try:
-            if not os.path.exists(self.history_file):
-                return "백테스팅 데이터 없음"
+            now = now or time.time()
+            await self.store.flush()
+            
+            # 최소 구간(1h)이 지났지만 아직 평가가 끝나지 않은 알림만
+            pending = await asyncio.to_thread(self.store.fetch_pending, now - min(HORIZONS.values()))
+            if not pending:
+                return 0
             
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                records = [json.loads(line) for line in f if line.strip()]
+            rows = await asyncio.to_thread(self._evaluate_pending, pending, now)
+            await asyncio.to_thread(self.store.save_evaluations, rows)
+            await asyncio.to_thread(self.store.save_aggregates, self.aggregates.dump_dirty())
             
-            if not records:
+            self.last_update = now
+            logger.info(f"📊 백테스트 증분 평가: 대기 {len(pending)}건 중 {sum(r['evaluated'] for r in rows)}건 완료")
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"백테스트 증분 평가 오류: {e}")
+            return 0
+    
+    def _evaluate_pending(self, pending, now):
+        """대기 알림 평가 -> 저장할 상태 행 (이미 평가된 구간은 건드리지 않음)"""
+        labels = list(HORIZONS)
+        excursion_bit = 1 << len(labels)
+        all_matured = (excursion_bit << 1) - 1
+        grace = 2 * 86400  # 가격 데이터가 끝내 없으면 구간 종료 2일 후 포기
+        
+        by_id = {r['id']: dict(r) for r in pending}
+        result = self.engine.run(pending, now)
+        
+        if result is not None:
+            ids = result['ids']
+            prev = np.array([by_id[i]['matured'] or 0 for i in ids], dtype=np.int64)
+            triggers, buckets = result['trigger_type'], result['score_bucket']
+            
+            for bit, label in enumerate(labels):
+                values = result['returns'][label]
+                newly = ~np.isnan(values) & ((prev >> bit) & 1 == 0)
+                self.aggregates.add(label, triggers[newly], buckets[newly], values[newly], values[newly] > 0)
+                for i in np.flatnonzero(newly):
+                    by_id[ids[i]][f'ret_{label}'] = float(values[i])
+                    by_id[ids[i]]['matured'] = int(by_id[ids[i]]['matured'] or 0) | (1 << bit)
+            
+            mfe = result['mfe']
+            newly = ~np.isnan(mfe) & (prev & excursion_bit == 0)
+            self.aggregates.add('mfe', triggers[newly], buckets[newly], mfe[newly], mfe[newly] >= SUCCESS_PCT)
+            for i in np.flatnonzero(newly):
+                record = by_id[ids[i]]
+                record.update(mfe=float(mfe[i]), mae=float(result['mae'][i]),
+                              hit_target=int(result['hit_target'][i]), hit_stop=int(result['hit_stop'][i]))
+                record['matured'] = int(record['matured'] or 0) | excursion_bit
+        
+        # 평가 불가(한국/placeholder) 또는 데이터 없이 기한이 지난 알림은 종료 처리
+        evaluable = set(result['ids']) if result is not None else set()
+        for record in by_id.values():
+            expired = record['ts'] + EXCURSION_WINDOW + grace <= now
+            if record['id'] not in evaluable or expired:
+                record['matured'] = all_matured
+            record['evaluated'] = int(record['matured'] == all_matured)
+        
+        return list(by_id.values())
+    
+    def report(self):
+        """누적 집계 기반 리포트 (과거 데이터 재조회 없음)"""
+        overall = self.aggregates.get('all', 'all', 'mfe')
+        if overall is None or overall.n == 0:
+            return "📊 백테스팅 대기 중 (평가 완료된 알림 없음)"
+        
+        report = "📊 **누적 백테스팅 리포트**\n\n"
+        report += f"평가 완료: {overall.n}개\n"
+        report += f"성공률 (7일 내 {SUCCESS_PCT:.0f}%+): {overall.hit_rate:.1f}%\n"
+        report += f"평균 최고 상승폭: {overall.mean:+.1f}%\n\n"
+        
+        report += "구간별 (상승 비율 | 평균 | 중앙값)\n"
+        for label in HORIZONS:
+            stat = self.aggregates.get('all', 'all', label)
+            if stat is None or stat.n == 0: continue
+            report += f"  {label}: {stat.hit_rate:.0f}% | {stat.mean:+.1f}% | {stat.median:+.1f}%\n"
+        
+        for kind, title in (('trigger', '트리거별'), ('score', 'AI 점수별')):
+            report += f"\n{title} (1d 평균 | 7일 성공률)\n"
+            for group in self.aggregates.groups(kind):
+                day = self.aggregates.get(kind, group, '1d')
+                mfe = self.aggregates.get(kind, group, 'mfe')
+                if mfe is None or mfe.n == 0: continue
+                day_text = f"{day.mean:+.1f}%" if day is not None and day.n else "-"
+                report += f"  {group}: {mfe.n}개, {day_text} | {mfe.hit_rate:.0f}%\n"
+        
+        return report
+    
+    async def backtest(self, days=7):
+        """과거 알림 성과 분석"""
+        try:
+            await self.store.flush()
+            if await asyncio.to_thread(self.store.count) == 0:
                 return "백테스팅 데이터 없음"
             
-            # N일 지난 알림들만
+            # N일 지난 알림들만 (ts 인덱스 범위 조회)
             cutoff = datetime.now() - timedelta(days=days)
-            old_records = []
-            
-            for record in records:
-                try:
-                    alert_time = datetime.fromisoformat(record['timestamp'])
-                    if alert_time < cutoff:
-                        old_records.append(record)
-                except:
-                    continue
+            old_records = await asyncio.to_thread(self.store.fetch_range, None, cutoff.timestamp())
             
             if not old_records:
                 return f"최근 {days}일 이내 알림만 존재 (백테스팅 대기 중)"
             
-            # 실제 성과 측정
-            results = []
+            # 전체 이력 일괄 평가 (종목별 가격은 한 번에 내려받음)
+            result = await asyncio.to_thread(self.engine.run, old_records)
             
-            for record in old_records[:50]:  # 최근 50개만 (API 제한)
-                try:
-                    symbol = record['symbol']
-                    
-                    # 한국 종목은 스킵 (yfinance 한계)
-                    if record.get('market') == 'KR':
-                        continue
-                    
-                    price_then = record.get('price_at_alert', 0)
-                    if price_then == 0:
-                        continue
-                    
-                    # 현재 가격 조회
-                    actual_gain = await asyncio.to_thread(
-                        self._get_current_price,
-                        symbol,
-                        price_then
-                    )
-                    
-                    if actual_gain is not None:
-                        results.append({
-                            'symbol': symbol,
-                            'ai_score': record.get('ai_score', 0),
-                            'predicted_upside': record.get('upside', 0),
-                            'actual_gain': actual_gain,
-                            'success': actual_gain > 20  # 20% 이상 = 성공
-                        })
-                        
-                except Exception:
-                    continue
-            
-            if not results:
+            if result is None or np.isnan(result['mfe']).all():
                 return "측정 가능한 데이터 없음"
             
-            # 통계 계산
-            total = len(results)
-            success_count = sum(1 for r in results if r['success'])
-            success_rate = (success_count / total) * 100 if total > 0 else 0
-            
-            avg_gain = sum(r['actual_gain'] for r in results) / total if total > 0 else 0
-            
-            # AI 점수별 정확도
-            high_score = [r for r in results if r['ai_score'] >= 8]
-            high_score_success = sum(1 for r in high_score if r['success'])
-            high_score_rate = (high_score_success / len(high_score)) * 100 if high_score else 0
-            
-            report = f"""
-📊 백테스팅 결과 ({days}일 전 알림)
-
-총 알림: {total}개
-성공 (20%+ 상승): {success_count}개
-성공률: {success_rate:.1f}%
-평균 수익률: {avg_gain:+.1f}%
-
-고점수(8+) 알림: {len(high_score)}개
-고점수 성공률: {high_score_rate:.1f}%
-"""
-            
-            return report
+            return self._format_report(result, days)
             
         except Exception as e:
             logger.error(f"백테스팅 오류: {e}")
             return f"백테스팅 오류: {e}"
     
-    def _get_current_price(self, symbol, price_then):
-        """현재 가격 조회 및 수익률 계산"""
-        try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period='1d')
-            
-            if hist.empty:
-                return None
-            
-            price_now = hist['Close'].iloc[-1]
-            gain_pct = ((price_now - price_then) / price_then) * 100
-            
-            return gain_pct
-            
-        except Exception:
-            return None
+    def _format_report(self, result, days):
+        """구간별 수익률 + 트리거/점수별 성과 리포트"""
+        mfe = result['mfe']
+        evaluated = ~np.isnan(mfe)
+        total = int(evaluated.sum())
+        success_count = int((mfe[evaluated] >= SUCCESS_PCT).sum())
+        
+        report = f"📊 백테스팅 결과 ({days}일 전까지의 알림)\n\n"
+        report += f"총 알림: {total}개\n"
+        report += f"성공 (구간 내 {SUCCESS_PCT:.0f}%+ 상승): {success_count}개\n"
+        report += f"성공률: {success_count / total * 100:.1f}%\n"
+        report += f"평균 MFE/MAE: {np.nanmean(mfe):+.1f}% / {np.nanmean(result['mae']):+.1f}%\n"
+        report += f"목표가 도달: {result['hit_target'].sum()}개 | 손절가 도달: {result['hit_stop'].sum()}개\n\n"
+        
+        report += "구간별 평균 수익률\n"
+        for label, values in result['returns'].items():
+            if np.isnan(values).all(): continue
+            report += f"  {label}: {np.nanmean(values):+.1f}% (중앙값 {np.nanmedian(values):+.1f}%)\n"
+        
+        for by, title in (('trigger_type', '트리거별'), ('score_bucket', 'AI 점수별')):
+            report += f"\n{title}\n"
+            for group, row in self.engine.summarize(result, by).items():
+                if not row['evaluated']: continue
+                mean_1d = row['mean_1d']
+                report += (f"  {group}: {row['evaluated']}개, 성공률 {row['success_rate']:.1f}%"
+                           f"{f', 1d {mean_1d:+.1f}%' if mean_1d is not None else ''}\n")
+        
+        return report
@@ -1,16 +1,31 @@
 import aiohttp
 import asyncio
 import logging
-from bs4 import BeautifulSoup
-from datetime import datetime
-import pytz 
+import time
+import numpy as np
 from config import Config
+from parsers import extract_yahoo_gainers, parse_volume
+from session_calendar import SessionCalendar
+from snapshot_history import SnapshotHistory
+from ttl_map import TTLMap
 
 logger = logging.getLogger(__name__)
 
 class PriceScanner:
-    def __init__(self, av_key=None, finnhub_key=None):
-        self.last_scan_result = set()
+    def __init__(self, av_key=None, finnhub_key=None, rvol=None, calendar=None):
+        # 거래소 세션 달력 (장전/정규장 URL 선택)
+        self.calendar = calendar or SessionCalendar()
+        # 시간대별 상대 거래량 기준선 (RvolBaseline, 없으면 고정 거래대금만)
+        self.rvol = rvol
+        
+        # 같은 종목 연속 알림 방지 (구간 돌파 대신 가속 신호 기준)
+        self.last_scan_result = TTLMap(Config.PRICE_SIGNAL_COOLDOWN, max_size=5000)
+        # 장 구분별 급등 테이블 스냅샷 이력
+        self.histories = {'PRE': SnapshotHistory(), 'REG': SnapshotHistory()}
+        
+        # 마지막으로 받은 급등 테이블 시세 (숏스퀴즈 등 다른 스캐너가 결합용으로 사용)
+        self.latest = {}
+        self.latest_at = 0.0
         
         # 1. 정규장 급등 (Regular Market)
         self.url_regular = "https://finance.yahoo.com/markets/stocks/gainers/"
@@ -21,22 +36,18 @@ class PriceScanner:
     async def scan(self):
         """현재 시간에 맞는 시장 데이터를 가져옴"""
         
-        # 한국 시간 기준 현재 시간 확인
-        kst = pytz.timezone('Asia/Seoul')
-        now = datetime.now(kst)
-        
+        # [세션 달력] 서머타임/휴장일/조기 폐장 반영된 NYSE 상태
+        # 장전에는 야후 메인(Regular)이 멈춰있으므로 Pre-Market을 봐야 함
+        # 장후에는 별도 테이블이 없어 정규장 테이블(당일 확정 등락률)을 계속 봄
+        session = self.calendar.state('US')
         target_urls = []
         
-        # [시간대 자동 감지]
-        # 프리마켓(데이마켓): 한국시간 오후 5시 ~ 밤 11시 30분
-        # 이 시간대에는 야후 메인(Regular)이 멈춰있으므로 Pre-Market을 봐야 함
-        if 16 <= now.hour < 23 or (now.hour == 23 and now.minute < 30):
+        if session == 'PRE':
             logger.info(f"🕒 [프리마켓] 장전 거래 데이터를 스캔합니다.")
             target_urls.append(("PRE", self.url_premarket))
-        else:
+        elif session in ('REG', 'POST'):
             logger.info(f"🕒 [정규장] 실시간 거래 데이터를 스캔합니다.")
             target_urls.append(("REG", self.url_regular))
-            # 정규장 초반에는 프리마켓 데이터도 유효할 수 있으므로 필요시 추가 가능
         
         all_alerts = []
         
@@ -46,6 +57,14 @@ class PriceScanner:
             
         return all_alerts
 
+    async def _fetch_page(self, session, url, start):
+        page_url = f"{url}?start={start}&count={Config.PRICE_PAGE_SIZE}"
+        async with session.get(page_url, timeout=10) as response:
+            if response.status != 200:
+                logger.error(f"접속 실패 ({page_url}): {response.status}")
+                return []
+            return extract_yahoo_gainers(await response.text())
+
     async def _fetch_data(self, url, market_type):
         alerts = []
         try:
@@ -60,92 +79,122 @@ class PriceScanner:
                 max_field_size=65536, 
                 max_line_size=65536
             ) as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status != 200:
-                        logger.error(f"접속 실패 ({url}): {response.status}")
-                        return alerts
+                # 첫 25개 뒤 페이지도 동시에 (같은 주기에 더 많은 종목)
+                pages = await asyncio.gather(*(
+                    self._fetch_page(session, url, page * Config.PRICE_PAGE_SIZE)
+                    for page in range(Config.PRICE_SCAN_PAGES)
+                ), return_exceptions=True)
+            
+            rows = {}
+            for page in pages:
+                if isinstance(page, Exception):
+                    logger.debug(f"페이지 조회 실패 ({url}): {page}")
+                    continue
+                for row in page:
+                    rows.setdefault(row.symbol, row)  # 페이지 순서 = 순위
+            rows = list(rows.values())
+            if not rows:
+                return alerts
+            self.latest = {row.symbol: row for row in rows}
+            self.latest_at = time.time()
+            
+            # 직전 스냅샷들과 비교 (등락률/거래량 가속, 순위 상승, 신규 진입)
+            # (이번 세션 첫 조회거나 조회가 오래 끊겼으면 이력을 비우고 새로 시작)
+            history = self.histories[market_type]
+            price = np.array([r.price for r in rows])
+            change = np.array([r.change_pct for r in rows])
+            volume = np.array([r.volume for r in rows])
+            now = time.time()
+            deltas = history.push([r.symbol for r in rows], price, change, volume, ts=now,
+                                  session_start=self.calendar.session_start('US', market_type, now),
+                                  max_gap=Config.PRICE_HISTORY_MAX_GAP)
+            
+            # ===============================================
+            # 🦁 하이에나 모드 (토스 괴물 잡기)
+            # ===============================================
+            # 1. 가격: $0.5 미만 휴지조각만 제외 (동전주 허용)
+            # 2. 거래대금 조건: 프리마켓은 유동성이 적으므로 30억($2M)만 터져도 1위급
+            # 3. 등락률: 최소 5% 이상
+            trade_value = price * volume
+            threshold = 2000000 if market_type == "PRE" else 10000000
+            eligible = (price >= 0.5) & (trade_value >= threshold) & (change >= 5.0)
+            
+            # 정규장: 기준선이 있는 종목은 같은 시각 평소 거래량 대비(RVOL)로 판정
+            # (장 초반엔 고정 거래대금을 못 넘는 급등도 잡고, 오후엔 원래 많은 종목은 거름)
+            rvol = np.full(len(rows), np.nan)
+            if self.rvol is not None and market_type == "REG":
+                for i, row in enumerate(rows):
+                    value = self.rvol.rvol(row.symbol, row.volume)
+                    if value is not None:
+                        rvol[i] = value
+                known = ~np.isnan(rvol)
+                eligible[known] = ((price[known] >= 0.5) & (change[known] >= 5.0)
+                                   & (trade_value[known] >= Config.RVOL_MIN_TRADE_VALUE)
+                                   & (rvol[known] >= Config.RVOL_MIN))
+            
+            # 4. 구간 돌파가 아니라 가속일 때만 알림 (NaN 비교는 False)
+            with np.errstate(invalid='ignore'):
+                accel = deltas.change_accel >= Config.PRICE_ACCEL_MIN
+                volume_accel = deltas.volume_accel >= Config.PRICE_VOLUME_ACCEL
+                rank_jump = deltas.rank_jump >= Config.PRICE_RANK_JUMP
+            new_entry = deltas.new_entry & (history.count > 1)
+            signal = eligible & (accel | volume_accel | rank_jump | new_entry)
+            
+            market_label = "☀️[프리]" if market_type == "PRE" else "🌕[정규]"
+            
+            for i in np.flatnonzero(signal):
+                try:
+                    row = rows[i]
+                    symbol, change_pct = row.symbol, row.change_pct
                     
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
+                    # 같은 종목 연속 알림 방지
+                    if not self.last_scan_result.check_and_set(symbol): continue
                     
-                    rows = soup.select('table tbody tr')
+                    if change_pct >= 100.0:
+                        msg = f'{market_label} 2배 폭등! +{change_pct:.1f}%'
+                    elif change_pct >= 50.0:
+                        msg = f'{market_label} 미친 급등 +{change_pct:.1f}%'
+                    elif change_pct >= 20.0:
+                        msg = f'{market_label} 폭등 감지 +{change_pct:.1f}%'
+                    else:
+                        msg = f'{market_label} 급등 출발 +{change_pct:.1f}%'
                     
-                    for row in rows:
-                        try:
-                            cols = row.select('td')
-                            if len(cols) < 6: continue
-                            
-                            symbol_div = cols[0].select_one('.symbol') or cols[0]
-                            symbol = symbol_div.get_text(strip=True).split(' ')[0]
-                            
-                            price_text = cols[1].get_text(strip=True).replace(',', '')
-                            price = float(price_text)
-                            
-                            change_text = cols[3].get_text(strip=True).replace('%', '').replace('+', '').replace(',', '')
-                            change_pct = float(change_text)
-                            
-                            vol_text = cols[5].get_text(strip=True)
-                            volume = self.parse_volume(vol_text)
-                            
-                            trade_value_usd = price * volume
-                            
-                            # ===============================================
-                            # 🦁 하이에나 모드 (토스 괴물 잡기)
-                            # ===============================================
-                            
-                            # 1. 가격: $0.5 미만 휴지조각만 제외 (동전주 허용)
-                            if price < 0.5: continue
-
-                            # 2. 거래대금 조건
-                            # 프리마켓은 유동성이 적으므로 30억($2M)만 터져도 1위급
-                            threshold = 2000000 if market_type == "PRE" else 10000000
-                            
-                            if trade_value_usd < threshold: continue
-
-                            # 3. 등락률: 최소 5% 이상
-                            if change_pct < 5.0: continue
-
-                            # 4. 메시지 작성
-                            market_label = "☀️[프리]" if market_type == "PRE" else "🌕[정규]"
-                            
-                            if change_pct >= 100.0:
-                                msg = f'{market_label} 2배 폭등! +{change_pct:.1f}%'
-                            elif change_pct >= 50.0:
-                                msg = f'{market_label} 미친 급등 +{change_pct:.1f}%'
-                            elif change_pct >= 20.0:
-                                msg = f'{market_label} 폭등 감지 +{change_pct:.1f}%'
-                            else:
-                                msg = f'{market_label} 급등 출발 +{change_pct:.1f}%'
-
-                            # 중복 방지 (등락률 2% 변동 시 재알림)
-                            scan_id = f"{symbol}_{int(change_pct/2)}" 
-                            if scan_id in self.last_scan_result: continue
-                                
-                            alerts.append({
-                                'symbol': symbol,
-                                'price': price,
-                                'change_percent': change_pct,
-                                'volume': volume,
-                                'trade_value_usd': trade_value_usd,
-                                'trigger_type': 'price_surge',
-                                'trigger_reason': f"{msg} (거래대금 ${int(trade_value_usd/1000000)}M)"
-                            })
-                            self.last_scan_result.add(scan_id)
-                            
-                        except Exception: continue
-            
-            if len(self.last_scan_result) > 1000: self.last_scan_result.clear()
+                    reasons = []
+                    if new_entry[i]: reasons.append(f'신규 진입 {i + 1}위')
+                    if accel[i]: reasons.append(f'가속 {deltas.change_accel[i]:+.1f}%p/분')
+                    if rank_jump[i]: reasons.append(f'순위 ↑{deltas.rank_jump[i]:.0f}')
+                    if volume_accel[i]: reasons.append(f'거래량 가속 {deltas.volume_accel[i]:.1f}배')
+                    if not np.isnan(rvol[i]): reasons.append(f'RVOL {rvol[i]:.1f}배')
+                    
+                    alerts.append({
+                        'symbol': symbol,
+                        'price': row.price,
+                        'change_percent': change_pct,
+                        'volume': row.volume,
+                        'trade_value_usd': float(trade_value[i]),
+                        'rvol': None if np.isnan(rvol[i]) else round(float(rvol[i]), 2),
+                        'trigger_type': 'price_surge',
+                        'trigger_reason': f"{msg} ({', '.join(reasons)}, 거래대금 ${int(trade_value[i]/1000000)}M)"
+                    })
+                    
+                except Exception: continue
             
         except Exception as e:
             logger.error(f"Scan Error ({url}): {e}")
             
         return alerts
 
+    def latest_quotes(self, max_age=300):
+        """[(티커, 가격, 등락률, 거래량)] - max_age 초보다 오래됐으면 빈 목록"""
+        if time.time() - self.latest_at > max_age:
+            return []
+        return [(r.symbol, r.price, r.change_pct, r.volume) for r in self.latest.values()]
+
     def parse_volume(self, text):
-        text = text.upper().replace(',', '')
-        try:
-            if 'B' in text: return float(text.replace('B', '')) * 1_000_000_000
-            elif 'M' in text: return float(text.replace('M', '')) * 1_000_000
-            elif 'K' in text: return float(text.replace('K', '')) * 1_000
-            else: return float(text)
-        except: return 0.0
\ No newline at end of file
+        return parse_volume(text)
+
+    def get_stats(self):
+        return {
+            'quotes': len(self.latest),
+            **{f"{market.lower()}_{k}": v for market, h in self.histories.items() for k, v in h.get_stats().items()},
+        }
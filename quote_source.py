@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""감시 목록용 시세 공급자 (교체 가능)
+
+fetch(session, symbols) 는 [Quote] 를 돌려주면 되고, 배치 크기/동시성은 공급자가 정함.
+YahooQuoteSource: 야후 v7 quote API 배치 조회 / StubQuoteSource: 네트워크 없는 테스트·벤치마크용
+"""
+import asyncio
+import logging
+import random
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class Quote(NamedTuple):
+    symbol: str
+    price: float
+    prev_close: float
+    volume: float
+    avg_volume: float   # 최근 평균 일 거래량
+
+
+class QuoteSource:
+    batch_size = 100
+
+    async def fetch_batch(self, session, symbols):
+        raise NotImplementedError
+
+    async def fetch(self, session, symbols):
+        """batch_size 씩 나눠 동시에 조회 (실패한 배치는 빠짐)"""
+        batches = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        results = await asyncio.gather(*(self.fetch_batch(session, b) for b in batches), return_exceptions=True)
+        quotes = []
+        errors = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                errors.append(result)
+                logger.debug(f"시세 배치 조회 실패 ({batch[0]}.. {len(batch)}개): {result}")
+                continue
+            quotes.extend(result)
+        if errors and len(errors) == len(batches):
+            logger.warning(f"⚠️ 시세 조회 전부 실패 ({len(batches)}배치, {len(symbols)}종목): {errors[0]}")
+        return quotes
+
+
+class YahooQuoteSource(QuoteSource):
+    """query1.finance.yahoo.com/v7/finance/quote?symbols=A,B,... (요청당 최대 수백 종목)
+
+    v7 quote 는 쿠키 + crumb 없이 부르면 401 (Invalid Crumb) 이라, fc.yahoo.com 에서 쿠키를 받고
+    /v1/test/getcrumb 로 crumb 을 얻어 재사용함 (401/403 이 오면 다음 배치에서 새로 받음)
+    """
+
+    def __init__(self, base_url='https://query1.finance.yahoo.com', batch_size=200, concurrency=4,
+                 cookie_url='https://fc.yahoo.com'):
+        base_url = base_url.rstrip('/')
+        self.url = f"{base_url}/v7/finance/quote"
+        self.crumb_url = f"{base_url}/v1/test/getcrumb"
+        self.cookie_url = cookie_url
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        # 스캔마다 세션이 새로 열리므로 쿠키/crumb 은 여기 보관
+        self.cookies = {}
+        self.crumb = None
+        self._crumb_lock = asyncio.Lock()
+
+    async def _ensure_crumb(self, session):
+        if self.crumb:
+            return
+        async with self._crumb_lock:
+            if self.crumb:
+                return
+            # fc.yahoo.com 은 404 를 주지만 쿠키(A3)는 심어줌
+            async with session.get(self.cookie_url, headers=self.headers, timeout=10,
+                                   allow_redirects=True) as response:
+                cookies = {key: morsel.value for key, morsel in response.cookies.items()}
+            async with session.get(self.crumb_url, headers=self.headers, cookies=cookies, timeout=10) as response:
+                crumb = (await response.text()).strip()
+                if response.status != 200 or not crumb or '<' in crumb:
+                    raise RuntimeError(f"crumb 발급 실패 (HTTP {response.status})")
+            self.cookies, self.crumb = cookies, crumb
+            logger.info("🔑 야후 시세 crumb 발급")
+
+    async def fetch_batch(self, session, symbols):
+        await self._ensure_crumb(session)
+        params = {'symbols': ','.join(symbols), 'crumb': self.crumb,
+                  'fields': 'regularMarketPrice,regularMarketPreviousClose,regularMarketVolume,averageDailyVolume10Day'}
+        async with self.semaphore:
+            async with session.get(self.url, params=params, headers=self.headers, cookies=self.cookies,
+                                   timeout=10) as response:
+                if response.status in (401, 403):
+                    self.crumb = None  # 만료 -> 다음 배치에서 재발급
+                    raise RuntimeError(f"HTTP {response.status} (crumb 만료)")
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                data = await response.json(content_type=None)
+
+        quotes = []
+        for item in data.get('quoteResponse', {}).get('result', []):
+            price = item.get('regularMarketPrice')
+            if price is None:
+                continue
+            quotes.append(Quote(
+                item['symbol'],
+                float(price),
+                float(item.get('regularMarketPreviousClose') or 0),
+                float(item.get('regularMarketVolume') or 0),
+                float(item.get('averageDailyVolume10Day') or 0),
+            ))
+        return quotes
+
+
+class StubQuoteSource(QuoteSource):
+    """가짜 시세 (랜덤 워크 + 가끔 급등), 같은 seed 면 같은 결과"""
+
+    def __init__(self, batch_size=500, seed=0, surge_rate=0.002, latency=0.0):
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.surge_rate = surge_rate
+        self.latency = latency  # 배치당 가짜 네트워크 지연 (초)
+        self.state = {}         # 티커 -> [가격, 전일 종가, 거래량, 평균 거래량]
+
+    async def fetch_batch(self, session, symbols):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        rng = self.rng
+        quotes = []
+        for symbol in symbols:
+            state = self.state.get(symbol)
+            if state is None:
+                close = rng.uniform(1, 200)
+                avg = rng.uniform(1e5, 2e7)
+                state = self.state[symbol] = [close, close, 0.0, avg]
+            drift = rng.uniform(0.15, 0.6) if rng.random() < self.surge_rate else rng.gauss(0, 0.003)
+            state[0] = max(0.01, state[0] * (1 + drift))
+            state[2] += state[3] * (rng.uniform(0.5, 3.0) if drift > 0.1 else rng.uniform(0.0, 0.01))
+            quotes.append(Quote(symbol, state[0], state[1], state[2], state[3]))
+        return quotes
+
+
+def create_quote_source(name):
+    """Config.WATCHLIST_SOURCE -> 공급자 ('yahoo' | 'stub')"""
+    if name == 'stub':
+        return StubQuoteSource()
+    return YahooQuoteSource()
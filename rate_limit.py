@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+
+class TokenBucket:
+    """비동기 토큰 버킷 (초당 rate 개 충전, 최대 capacity 개까지 몰아서 사용)"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # 서버가 지정한 대기 (retry_after 등)
+
+        self.acquired = 0
+        self.waited = 0.0  # 토큰을 기다린 누적 시간 (초)
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return False
+        self._refill(now)
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        self.acquired += 1
+        return True
+
+    async def acquire(self, tokens=1):
+        """토큰이 생길 때까지 대기 (락으로 요청 순서대로 처리)"""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    break
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+        self.acquired += 1
+        self.waited += time.monotonic() - started
+
+    def pause(self, seconds):
+        """seconds 동안 토큰 지급 중단 (429 retry_after 반영)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def get_stats(self):
+        return {'acquired': self.acquired, 'waited_s': round(self.waited, 2)}
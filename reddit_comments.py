@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""레딧 토론 스레드 댓글 스트리밍 파싱
+
+데일리 토론 스레드의 댓글 목록(/comments/{id}.json)은 수 MB 짜리 중첩 JSON 이라
+통째로 json.loads 하지 않고 ijson 이벤트를 받아 댓글 하나씩 꺼냄.
+메모리는 현재 읽고 있는 댓글 경로(답글 깊이)만큼만 사용.
+ijson 이 없으면 json.loads 후 트리 순회로 대체.
+"""
+import json
+import sys
+import time
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+FIELDS = frozenset(('id', 'body', 'created_utc', 'author'))
+_DATA_SUFFIX = 'children.item.data'
+READ_SIZE = 64 * 1024
+
+
+class CommentCollector:
+    """ijson (prefix, event, value) 이벤트 -> 댓글 dict (id, body, created_utc, author)
+
+    글(t3)과 '더 보기'(more) 항목은 body 가 없으므로 자연히 제외됨.
+    """
+
+    def __init__(self):
+        self._stack = []  # [(data prefix, 필드 dict)] - 답글 깊이만큼
+
+    def feed(self, prefix, event, value):
+        """댓글 하나가 끝나면 dict 반환, 아니면 None"""
+        if event == 'start_map':
+            if prefix.endswith(_DATA_SUFFIX):
+                self._stack.append((prefix, {}))
+        elif event == 'end_map':
+            if self._stack and prefix == self._stack[-1][0]:
+                fields = self._stack.pop()[1]
+                if 'body' in fields:
+                    return fields
+        elif self._stack:
+            top, fields = self._stack[-1]
+            parent, _, key = prefix.rpartition('.')
+            if key in FIELDS and parent == top:
+                fields[key] = value
+        return None
+
+
+def iter_comments(stream):
+    """파일 객체(바이너리)에서 댓글을 하나씩 (녹화된 응답 벤치마크/대체 경로 공용)"""
+    if ijson is None:
+        yield from walk_comments(json.load(stream))
+        return
+    collector = CommentCollector()
+    for prefix, event, value in ijson.parse(stream, buf_size=READ_SIZE, use_float=True):
+        comment = collector.feed(prefix, event, value)
+        if comment is not None:
+            yield comment
+
+
+async def aiter_comments(reader):
+    """aiohttp 응답 본문(StreamReader 등 async read 지원 객체)에서 댓글을 하나씩"""
+    if ijson is None:
+        for comment in walk_comments(json.loads(await reader.read())):
+            yield comment
+        return
+    collector = CommentCollector()
+    async for prefix, event, value in ijson.parse_async(reader, buf_size=READ_SIZE, use_float=True):
+        comment = collector.feed(prefix, event, value)
+        if comment is not None:
+            yield comment
+
+
+def walk_comments(payload):
+    """json.loads 결과에서 댓글 트리 순회 (ijson 미설치 시)"""
+    pending = list(payload) if isinstance(payload, list) else [payload]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, dict):
+            continue
+        data = node.get('data')
+        if not isinstance(data, dict):
+            continue
+        if 'children' in data:
+            pending.extend(reversed(data['children']))
+            continue
+        if 'body' in data:
+            yield {key: data[key] for key in FIELDS if key in data}
+        replies = data.get('replies')
+        if isinstance(replies, dict):
+            pending.append(replies)
+
+
+class CountingReader:
+    """async read 래퍼 (받은 바이트 수 집계)"""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.bytes = 0
+
+    async def read(self, n=-1):
+        chunk = await self.reader.read(n)
+        self.bytes += len(chunk)
+        return chunk
+
+
+# === 녹화된 응답 처리량 벤치마크 ===
+# python reddit_comments.py [payload.json ...]
+# 인자가 없으면 데일리 스레드 형태(중첩 답글 포함)의 합성 응답을 만들어 사용
+
+def _synthetic_payload(n_comments=20_000, seed=0):
+    import random
+    rng = random.Random(seed)
+    words = ('calls puts yolo moon tendies bagholder guh rip squeeze earnings '
+             'the to and is it on I my this that week').split()
+    tickers = ['NVDA', 'TSLA', 'GME', 'AMD', 'PLTR', '$RDDT', '$XYZQ', 'SPY', 'SOFI', 'AAPL']
+    now = time.time()
+
+    def comment(i, depth):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(5, 40)))
+        if rng.random() < 0.3:
+            text += ' ' + rng.choice(tickers)
+        replies = ''
+        if depth < 4 and rng.random() < 0.3:
+            replies = {'kind': 'Listing', 'data': {'children': [comment(i * 10 + k, depth + 1) for k in range(2)]}}
+        return {'kind': 't1', 'data': {
+            'id': f'c{i:x}', 'name': f't1_c{i:x}', 'author': f'user{rng.randint(0, 5000)}',
+            'body': text, 'body_html': f'<div class="md"><p>{text}</p></div>',
+            'created_utc': now - rng.uniform(0, 3600), 'score': rng.randint(-5, 500),
+            'replies': replies, 'permalink': f'/r/wallstreetbets/comments/abc/_/c{i:x}/',
+        }}
+
+    post = {'kind': 'Listing', 'data': {'children': [{'kind': 't3', 'data': {
+        'id': 'abc', 'title': 'Daily Discussion Thread', 'selftext': '', 'created_utc': now}}]}}
+    top = [comment(i, 0) for i in range(n_comments // 2)]
+    return json.dumps([post, {'kind': 'Listing', 'data': {'children': top}}]).encode()
+
+
+def _bench(paths):
+    import io
+    import tracemalloc
+    from social_scanner import SocialScanner
+
+    payloads = [open(p, 'rb').read() for p in paths] or [_synthetic_payload()]
+    scanner = SocialScanner()
+    total_mb = sum(len(p) for p in payloads) / 1e6
+    backend = ijson.backend if ijson is not None else '없음'
+
+    for name, parse in (('ijson (%s)' % backend, lambda b: iter_comments(io.BytesIO(b))),
+                        ('json.loads', lambda b: walk_comments(json.loads(b)))):
+        if ijson is None and name.startswith('ijson'):
+            continue
+        count = mentions = 0
+        started = time.perf_counter()
+        for payload in payloads:
+            for comment in parse(payload):
+                count += 1
+                mentions += len(scanner.extract_tickers(comment.get('body', '')))
+        elapsed = time.perf_counter() - started
+
+        # 메모리는 시간 측정과 따로 (tracemalloc 이 파싱을 크게 느리게 함)
+        tracemalloc.start()
+        for payload in payloads:
+            for _ in parse(payload):
+                pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:24s} 댓글 {count:,}개 ({total_mb:.1f} MB) {elapsed:.2f}s -> "
+              f"{count / elapsed * 60:,.0f}개/분, 티커 {mentions:,}회, 최대 추가 메모리 {peak / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    _bench(sys.argv[1:])
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""시간대별 상대 거래량(RVOL) 기준선
+
+장 초반 거래량은 구조적으로 적어서 하루 전체 평균이나 고정 거래대금과 비교하면
+오전 급등은 놓치고 오후에는 과대평가됨. 최근 20거래일 5분봉으로 종목별
+'정규장 시작 후 각 5분 구간까지의 평균 누적 거래량'을 밤에 한 번 계산해 두고,
+장중에는 누적 거래량을 같은 시각 기준선으로 나눠 RVOL 을 O(1) 로 구함.
+
+저장: 종목 x 78구간 float32 배열 하나 (.npz), 5,000종목이어도 약 1.5 MB
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pytz
+from ttl_map import TTLMap
+
+logger = logging.getLogger(__name__)
+
+ET = pytz.timezone('America/New_York')
+OPEN_MINUTE = 9 * 60 + 30     # 정규장 시작 (ET 분)
+SESSION_MINUTES = 390         # 09:30 ~ 16:00
+
+
+def _et_offsets(ts):
+    """epoch 초 배열 -> 같은 길이의 ET UTC 오프셋 (초), 날짜별로 한 번만 계산"""
+    days, inverse = np.unique(ts // 86400, return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(int(d) * 86400 + 43200, ET).utcoffset().total_seconds()
+                        for d in days], dtype=np.int64)
+    return offsets[inverse]
+
+
+def session_position(ts=None):
+    """정규장 시작 후 경과 분 (장 전이면 음수)"""
+    now = datetime.now(ET) if ts is None else datetime.fromtimestamp(ts, ET)
+    return now.hour * 60 + now.minute + now.second / 60 - OPEN_MINUTE
+
+
+class RvolBaseline:
+    RETRY_INTERVAL = 600  # 갱신 실패 후 재시도 간격 (초)
+
+    def __init__(self, snapshot_path, bar_store, days=20, bucket_minutes=5,
+                 build_hour=18, max_symbols=3000):
+        self.snapshot_path = snapshot_path
+        self.bar_store = bar_store
+        self.days = days
+        self.bucket_minutes = bucket_minutes
+        self.buckets = SESSION_MINUTES // bucket_minutes
+        self.build_hour = build_hour      # 이 시각(ET) 이후 당일 봉까지 포함해 재계산
+        self.max_symbols = max_symbols
+
+        self.symbols = []
+        self.index = {}                   # 티커 -> 행 번호
+        self.cum = np.zeros((0, self.buckets), dtype=np.float32)  # 구간 끝까지의 평균 누적 거래량
+        self.built_date = None            # ET 기준 계산 날짜
+
+        # 기준선이 없어 조회에 실패한 종목 (다음 계산 때 포함)
+        self.wanted = TTLMap(7 * 86400, max_size=max_symbols)
+
+        self._refresh_task = None
+        self._last_attempt = -self.RETRY_INTERVAL
+        self.build_seconds = 0.0
+        self.lookups = 0
+        self.misses = 0
+
+        self.load()
+
+    # === 스냅샷 파일 ===
+
+    def load(self):
+        try:
+            with np.load(self.snapshot_path, allow_pickle=False) as data:
+                if data['cum'].shape[1] != self.buckets:
+                    return
+                self.symbols = data['symbols'].tolist()
+                self.cum = data['cum']
+                self.built_date = str(data['date'])
+            self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+            logger.info(f"📂 RVOL 기준선 로드: {len(self.symbols)}종목 ({self.built_date})")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"RVOL 기준선 로드 실패: {e}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        tmp = self.snapshot_path + '.tmp.npz'
+        np.savez(tmp, symbols=np.array(self.symbols, dtype=str), cum=self.cum, date=np.array(self.built_date))
+        os.replace(tmp, self.snapshot_path)
+
+    # === 밤마다 재계산 ===
+
+    def is_stale(self):
+        now = datetime.now(ET)
+        if self.built_date is None:
+            return True
+        return now.hour >= self.build_hour and self.built_date != now.strftime('%Y-%m-%d')
+
+    def schedule_refresh(self):
+        """장 마감 후 하루 한 번 백그라운드로 재계산 (조회는 기존 배열로 계속)"""
+        if not self.is_stale():
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.monotonic() - self._last_attempt < self.RETRY_INTERVAL:
+            return
+        if not self.wanted and not self.symbols:
+            return
+        self._last_attempt = time.monotonic()
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        # 최근에 찾은 종목 우선, 나머지는 기존 기준선 종목으로 채움
+        symbols = list(dict.fromkeys([key for key, _, _ in self.wanted.dump()][::-1] + self.symbols))
+        symbols = symbols[:self.max_symbols]
+        started = time.perf_counter()
+        try:
+            built = await asyncio.to_thread(self._build, symbols)
+        except Exception as e:
+            logger.error(f"RVOL 기준선 계산 실패: {e}")
+            return
+        if not built:
+            logger.warning("RVOL 기준선 계산 결과 없음, 기존 기준선 유지")
+            return
+
+        self.symbols = list(built)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.cum = np.stack(list(built.values())).astype(np.float32)
+        self.built_date = datetime.now(ET).strftime('%Y-%m-%d')
+        self.build_seconds = time.perf_counter() - started
+        await asyncio.to_thread(self.save)
+        logger.info(f"🔄 RVOL 기준선 갱신: {len(self.symbols)}종목 ({self.days}일 x {self.buckets}구간) "
+                    f"{self.build_seconds:.1f}초")
+
+    def _build(self, symbols):
+        """봉 저장소 5분봉 -> {티커: 구간별 평균 누적 거래량}"""
+        now = time.time()
+        start = now - (self.days * 7 // 5 + 10) * 86400  # 주말/휴일 여유
+        self.bar_store.ensure(symbols, start, now, '5m')
+        built = {}
+        for symbol in symbols:
+            bars = self.bar_store.read(symbol, '5m', start)
+            if bars is None or len(bars['ts']) == 0:
+                continue
+            cum = self.compute(bars['ts'], bars['volume'], now)
+            if cum is not None:
+                built[symbol] = cum
+        return built
+
+    def compute(self, ts, volume, now=None):
+        """5분봉 (ts, 거래량) -> 구간별 평균 누적 거래량, 완결된 거래일이 부족하면 None"""
+        local = ts + _et_offsets(ts)
+        day = local // 86400
+        bucket = (local % 86400 // 60 - OPEN_MINUTE) // self.bucket_minutes
+        regular = (bucket >= 0) & (bucket < self.buckets)
+        if now is not None and datetime.fromtimestamp(now, ET).hour < self.build_hour:
+            # 장중에 계산하면 진행 중인 오늘은 제외
+            today = (int(now) + int(_et_offsets(np.array([int(now)]))[0])) // 86400
+            regular &= day != today
+        day, bucket, volume = day[regular], bucket[regular], volume[regular]
+        if len(day) == 0:
+            return None
+
+        days, day_idx = np.unique(day, return_inverse=True)
+        grid = np.zeros((len(days), self.buckets))
+        np.add.at(grid, (day_idx, bucket), volume)
+        # 조기 폐장일(마지막 1시간 거래 없음)은 모양이 달라서 제외
+        full = grid[:, -60 // self.bucket_minutes:].sum(axis=1) > 0
+        grid = grid[full][-self.days:]
+        if len(grid) < max(3, self.days // 4):
+            return None
+        return grid.cumsum(axis=1).mean(axis=0)
+
+    # === 장중 조회 (O(1)) ===
+
+    def expected_volume(self, symbol, ts=None):
+        """지금 시각까지 평소 누적 거래량 (장 전이거나 기준선이 없으면 None)"""
+        self.lookups += 1
+        row = self.index.get(symbol)
+        if row is None:
+            self.misses += 1
+            self.wanted.set(symbol)
+            return None
+        position = session_position(ts)
+        if position <= 0:
+            return None
+        if position >= SESSION_MINUTES:
+            return float(self.cum[row, -1])
+        bucket, frac = divmod(position, self.bucket_minutes)
+        bucket = int(bucket)
+        prev = float(self.cum[row, bucket - 1]) if bucket else 0.0
+        return prev + (float(self.cum[row, bucket]) - prev) * frac / self.bucket_minutes
+
+    def rvol(self, symbol, volume, ts=None):
+        """당일 누적 거래량 / 같은 시각 평소 누적 거래량"""
+        expected = self.expected_volume(symbol, ts)
+        if not expected:
+            return None
+        return volume / expected
+
+    def session_fraction(self, symbol, ts=None):
+        """지금 시각까지 평소 하루 거래량의 몇 할이 나오는지 (0~1)"""
+        expected = self.expected_volume(symbol, ts)
+        if expected is None:
+            return None
+        full = float(self.cum[self.index[symbol], -1])
+        return expected / full if full > 0 else None
+
+    def get_stats(self):
+        return {
+            'symbols': len(self.symbols),
+            'built': self.built_date,
+            'build_s': round(self.build_seconds, 1),
+            'kb': self.cum.nbytes // 1024,
+            'lookups': self.lookups,
+            'misses': self.misses,
+            'wanted': len(self.wanted),
+        }
+
+
+# === 벤치마크: 계산 + 조회 ===
+# python rvol_baseline.py [종목 수] [거래일 수]
+
+def _synthetic_bars(rng, n_days):
+    """정규장 5분봉 (U자형 거래량), 하루 78개"""
+    day0 = int(datetime(2025, 3, 3, 9, 30, tzinfo=pytz.utc).timestamp()) + 4 * 3600
+    shape = 1 + 3 * np.exp(-np.arange(78) / 6) + 1.5 * np.exp((np.arange(78) - 77) / 6)
+    ts, volume = [], []
+    d = 0
+    while len(ts) < n_days * 78:
+        day_start = day0 + d * 86400
+        d += 1
+        if datetime.fromtimestamp(day_start, ET).weekday() >= 5:
+            continue
+        day_start = int(ET.localize(datetime.fromtimestamp(day_start, ET).replace(
+            hour=9, minute=30, tzinfo=None)).timestamp())
+        ts.extend(day_start + np.arange(78) * 300)
+        volume.extend(shape * rng.lognormal(10, 0.5) * rng.uniform(0.7, 1.3, 78))
+    return np.array(ts, dtype=np.int64), np.array(volume)
+
+
+def _bench(n_symbols=2000, n_days=20):
+    rng = np.random.default_rng(0)
+    baseline = RvolBaseline(os.path.join('/tmp', 'rvol_bench.npz'), bar_store=None)
+    bars = [_synthetic_bars(rng, n_days) for _ in range(min(n_symbols, 50))]
+
+    started = time.perf_counter()
+    built = {f'S{i:05d}': baseline.compute(*bars[i % len(bars)]) for i in range(n_symbols)}
+    elapsed = time.perf_counter() - started
+    baseline.symbols = list(built)
+    baseline.index = {s: i for i, s in enumerate(baseline.symbols)}
+    baseline.cum = np.stack(list(built.values())).astype(np.float32)
+    print(f"계산: {n_symbols:,}종목 x {n_days}일 5분봉 {elapsed:.2f}s, 배열 {baseline.cum.nbytes / 1e6:.2f} MB")
+
+    ts = int(ET.localize(datetime(2025, 6, 2, 10, 12)).timestamp())
+    cum = baseline.cum[0]
+    print(f"S00000 평소 누적 거래량: 10:00 {cum[5]:,.0f}, 12:00 {cum[29]:,.0f}, 16:00 {cum[-1]:,.0f} "
+          f"(10:12 까지 하루의 {baseline.session_fraction('S00000', ts):.0%})")
+
+    symbols = baseline.symbols
+    started = time.perf_counter()
+    for i in range(100_000):
+        baseline.rvol(symbols[i % n_symbols], 1e6, ts)
+    elapsed = time.perf_counter() - started
+    print(f"조회: {elapsed / 100_000 * 1e6:.1f} µs/회")
+
+
+if __name__ == '__main__':
+    _bench(*(int(a) for a in sys.argv[1:3]))
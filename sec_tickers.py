@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import aiohttp
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 회사명 비교용 (대소문자/구두점/법인 형태 무시)
+_NAME_NOISE_RE = re.compile(r'[^A-Z0-9 ]')
+_NAME_SUFFIXES = frozenset({'INC', 'CORP', 'CORPORATION', 'CO', 'COMPANY', 'LTD', 'LIMITED', 'PLC',
+                            'LLC', 'LP', 'L P', 'HOLDINGS', 'GROUP', 'SA', 'NV', 'AG', 'THE', 'DE', 'NEW'})
+
+
+def normalize_name(name):
+    words = _NAME_NOISE_RE.sub(' ', name.upper()).split()
+    return ' '.join(w for w in words if w not in _NAME_SUFFIXES)
+
+
+class CikTickerIndex:
+    """SEC company_tickers.json 기반 CIK -> 티커/회사명 (하루 한 번 갱신, 스냅샷 파일 유지)"""
+
+    RETRY_INTERVAL = 600  # 갱신 실패 후 재시도 간격 (초)
+
+    def __init__(self, snapshot_path, refresh_interval=86400):
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.tickers = {}   # CIK(int) -> 티커 (여러 종류주가 있으면 첫 번째 = 대표)
+        self.names = {}     # CIK -> 회사명
+        self.by_name = {}   # 정규화한 회사명 -> CIK (CIK 없이 이름만 있을 때)
+        self.updated = 0.0  # 마지막 갱신 시각 (epoch)
+        self._refresh_task = None
+        self._last_attempt = -self.RETRY_INTERVAL
+
+        self.hits = 0
+        self.misses = 0
+        self.name_hits = 0
+
+        self.load()
+
+    # === 스냅샷 파일 ===
+
+    def _build(self, rows):
+        tickers, names = {}, {}
+        for row in rows:
+            cik = int(row['cik_str'])
+            if cik not in tickers:
+                tickers[cik] = row['ticker'].upper()
+                names[cik] = row['title']
+        self.tickers, self.names = tickers, names
+        self.by_name = {normalize_name(name): cik for cik, name in names.items()}
+
+    def load(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                data = json.load(f)
+            self._build(data['rows'])
+            self.updated = data['updated']
+            logger.info(f"📂 SEC 티커 스냅샷 로드: {len(self.tickers)}개 CIK")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"SEC 티커 스냅샷 로드 실패: {e}")
+
+    def save(self, rows):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        with open(self.snapshot_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'updated': self.updated, 'rows': rows}, f)
+        os.replace(self.snapshot_path + '.tmp', self.snapshot_path)
+
+    # === 주기적 갱신 ===
+
+    def is_stale(self):
+        return time.time() - self.updated >= self.refresh_interval
+
+    def schedule_refresh(self):
+        """오래됐으면 백그라운드로 갱신 (스캔은 기존 색인으로 계속 진행)"""
+        if not self.is_stale():
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.monotonic() - self._last_attempt < self.RETRY_INTERVAL:
+            return
+        self._last_attempt = time.monotonic()
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        headers = {'User-Agent': Config.SEC_USER_AGENT}
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(Config.SEC_TICKERS_URL, headers=headers, timeout=30) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"HTTP {response.status}")
+                    data = json.loads(await response.read())
+        except Exception as e:
+            logger.error(f"SEC 티커 목록 조회 실패: {e}")
+            return
+
+        rows = list(data.values()) if isinstance(data, dict) else data
+        if len(rows) < 1000:
+            logger.warning(f"SEC 티커 목록 불완전 ({len(rows)}개), 기존 색인 유지")
+            return
+        self._build(rows)
+        self.updated = time.time()
+        await asyncio.to_thread(self.save, rows)
+        logger.info(f"🔄 SEC 티커 색인 갱신: {len(self.tickers)}개 CIK")
+
+    # === 조회 ===
+
+    def ticker(self, cik):
+        """CIK(문자열/정수) -> 티커, 모르면 None"""
+        try:
+            ticker = self.tickers.get(int(cik))
+        except (TypeError, ValueError):
+            ticker = None
+        if ticker is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return ticker
+
+    def cik_for_name(self, name):
+        """회사명 -> CIK (정규화 후 정확히 일치할 때만)"""
+        cik = self.by_name.get(normalize_name(name))
+        if cik is not None:
+            self.name_hits += 1
+        return cik
+
+    def get_stats(self):
+        return {
+            'ciks': len(self.tickers),
+            'age_h': round((time.time() - self.updated) / 3600, 1) if self.updated else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'name_hits': self.name_hits,
+        }
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""거래소 세션 달력 (NYSE/Nasdaq, KRX)
+
+휴장일/조기 폐장/장전·장후 시간을 연 단위로 미리 계산해 (시각, 상태) 전환 목록으로 두고,
+현재 상태와 다음 전환 시각을 이분 탐색으로 조회함. 매 루프 pytz 로 요일/시각을 다시 따질 필요가 없고
+서머타임도 거래소 현지 시각 기준으로 자동 반영됨.
+
+상태: 'PRE' (장전) / 'REG' (정규장) / 'POST' (장후) / 'CLOSED'
+"""
+import bisect
+import logging
+import sys
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from typing import NamedTuple
+import pytz
+
+logger = logging.getLogger(__name__)
+
+PRE, REG, POST, CLOSED = 'PRE', 'REG', 'POST', 'CLOSED'
+
+
+class DaySession(NamedTuple):
+    pre_open: dtime
+    open: dtime
+    close: dtime
+    post_close: dtime
+
+
+# === NYSE 휴장일 (규칙 기반) ===
+
+def easter(year):
+    """그레고리력 부활절 (Anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """month 의 n 번째 weekday (n=-1 이면 마지막)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d):
+    """토요일 -> 금요일, 일요일 -> 월요일"""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def nyse_holidays(year):
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),     # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),     # Presidents' Day
+        easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),    # Memorial Day
+        _observed(date(year, 7, 4)),     # Independence Day
+        _nth_weekday(year, 9, 0, 1),     # Labor Day
+        _nth_weekday(year, 11, 3, 4),    # Thanksgiving
+        _observed(date(year, 12, 25)),   # Christmas
+    }
+    # 새해: 토요일이면 전년 12/31 로 당기지 않음 (NYSE Rule 7.2)
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def nyse_early_closes(year):
+    """13:00 조기 폐장: 독립기념일 전날, 추수감사절 다음 날, 크리스마스 이브 (평일이고 휴장이 아닐 때)"""
+    holidays = nyse_holidays(year)
+    candidates = [date(year, 7, 3), _nth_weekday(year, 11, 3, 4) + timedelta(days=1), date(year, 12, 24)]
+    return {d for d in candidates if d.weekday() < 5 and d not in holidays}
+
+
+# === KRX 휴장일 (음력 명절/대체공휴일/선거일은 규칙으로 못 구해서 연도별 고정) ===
+
+KRX_HOLIDAYS = {
+    2025: ['01-01', '01-27', '01-28', '01-29', '01-30', '03-03', '05-01', '05-05', '05-06',
+           '06-03', '06-06', '08-15', '10-03', '10-06', '10-07', '10-08', '10-09', '12-25', '12-31'],
+    2026: ['01-01', '02-16', '02-17', '02-18', '03-02', '05-01', '05-05', '05-25', '06-03',
+           '08-17', '09-24', '09-25', '10-05', '10-09', '12-25', '12-31'],
+    2027: ['01-01', '02-08', '02-09', '03-01', '05-05', '05-13', '08-16', '09-14', '09-15',
+           '09-16', '10-04', '10-11', '12-27', '12-31'],
+}
+# 수능일: 1시간 늦게 열고 늦게 닫음
+KRX_CSAT_DAYS = {2025: '11-13', 2026: '11-19', 2027: '11-18'}
+
+
+def krx_holidays(year):
+    return {date.fromisoformat(f'{year}-{md}') for md in KRX_HOLIDAYS.get(year, [])}
+
+
+class ExchangeCalendar:
+    def __init__(self, name, tz, regular, early_close=None, holidays=None, early_closes=None,
+                 special=None, known_years=None):
+        self.name = name
+        self.tz = pytz.timezone(tz)
+        self.regular = regular            # 평상시 DaySession
+        self.early_close = early_close    # 조기 폐장일 DaySession
+        self.holidays = holidays          # year -> {date}
+        self.early_closes = early_closes  # year -> {date}
+        self.special = special            # (date, 첫 거래일 여부) -> DaySession 또는 None (예외 일정)
+        self.known_years = known_years    # 휴장일 목록이 있는 연도 (None = 규칙 기반이라 제한 없음)
+
+        self._times = []                  # 전환 시각 (epoch, 오름차순)
+        self._states = []                 # 그 시각부터의 상태
+        self._years = set()
+        self._safe_from = self._safe_until = 0.0
+        self._warned = set()
+        self.lookups = 0
+
+    # === 미리 계산 ===
+
+    def _build_year(self, year):
+        holidays = self.holidays(year) if self.holidays else set()
+        early = self.early_closes(year) if self.early_closes else set()
+        transitions = []
+        first_day = True
+        d = date(year, 1, 1)
+        while d.year == year:
+            if d.weekday() < 5 and d not in holidays:
+                session = self.special(d, first_day) if self.special else None
+                if session is None:
+                    session = self.early_close if d in early and self.early_close else self.regular
+                first_day = False
+                for t, state in ((session.pre_open, PRE), (session.open, REG),
+                                 (session.close, POST), (session.post_close, CLOSED)):
+                    transitions.append((self.tz.localize(datetime.combine(d, t)).timestamp(), state))
+            d += timedelta(days=1)
+        return transitions
+
+    def _ensure(self, ts):
+        """ts 의 연도와 다음 연도까지 계산돼 있도록 (대부분은 범위 비교 한 번으로 끝남)"""
+        if self._safe_from <= ts < self._safe_until:
+            return
+        year = datetime.fromtimestamp(ts, self.tz).year
+        if self.known_years is not None and year not in self.known_years and year not in self._warned:
+            self._warned.add(year)
+            logger.warning(f"⚠️ {self.name} {year}년 휴장일 목록 없음 (주말만 휴장으로 처리)")
+        missing = {year, year + 1} - self._years
+        if missing:
+            merged = list(zip(self._times, self._states))
+            for y in missing:
+                merged.extend(self._build_year(y))
+                self._years.add(y)
+            merged.sort()
+            self._times = [t for t, _ in merged]
+            self._states = [s for _, s in merged]
+        # ts 가 속한, 연속으로 계산된 연도 구간 (마지막 해는 다음 해가 없으니 제외) = 빠른 경로
+        first, last = year, year + 1
+        while first - 1 in self._years:
+            first -= 1
+        while last + 1 in self._years:
+            last += 1
+        self._safe_from = self._year_start(first)
+        self._safe_until = self._year_start(last)
+
+    def _year_start(self, year):
+        return self.tz.localize(datetime(year, 1, 1)).timestamp()
+
+    # === 조회 ===
+
+    def state(self, ts=None):
+        ts = time.time() if ts is None else ts
+        self._ensure(ts)
+        self.lookups += 1
+        i = bisect.bisect_right(self._times, ts) - 1
+        return self._states[i] if i >= 0 else CLOSED
+
+    def next_change(self, ts=None, states=None):
+        """ts 이후 첫 전환 (시각, 상태), states 를 주면 그 상태로 바뀌는 시각만"""
+        ts = time.time() if ts is None else ts
+        self._ensure(ts)
+        i = bisect.bisect_right(self._times, ts)
+        while True:
+            if i >= len(self._times):
+                self._ensure(self._times[-1] + 86400 * 366)
+            if states is None or self._states[i] in states:
+                return self._times[i], self._states[i]
+            i += 1
+
+    def last_change(self, ts=None, states=None):
+        """ts 이전(포함) 마지막 전환 (시각, 상태), states 를 주면 그 상태로 바뀐 시각만 (없으면 None)"""
+        ts = time.time() if ts is None else ts
+        self._ensure(ts)
+        i = bisect.bisect_right(self._times, ts) - 1
+        while i >= 0:
+            if states is None or self._states[i] in states:
+                return self._times[i], self._states[i]
+            i -= 1
+        return None
+
+    def session(self, day):
+        """그 날짜의 DaySession (휴장이면 None)"""
+        if day.weekday() >= 5 or (self.holidays and day in self.holidays(day.year)):
+            return None
+        if self.special:
+            first = self.next_trading_day(date(day.year, 1, 1)) == day
+            session = self.special(day, first)
+            if session is not None:
+                return session
+        if self.early_closes and day in self.early_closes(day.year) and self.early_close:
+            return self.early_close
+        return self.regular
+
+    def next_trading_day(self, day):
+        holidays = self.holidays(day.year) if self.holidays else set()
+        while day.weekday() >= 5 or day in holidays:
+            day += timedelta(days=1)
+            if day.month == 1 and day.day == 1 and self.holidays:
+                holidays = self.holidays(day.year)
+        return day
+
+    def missing_years(self, ts=None):
+        """올해/내년 중 휴장일 목록이 없는 연도 (주말만 휴장으로 처리되는 해)"""
+        if self.known_years is None:
+            return []
+        year = datetime.fromtimestamp(time.time() if ts is None else ts, self.tz).year
+        return [y for y in (year, year + 1) if y not in self.known_years]
+
+    def get_stats(self):
+        return {'state': self.state(), 'years': sorted(self._years), 'lookups': self.lookups}
+
+
+def _krx_special(day, first_day):
+    # 새해 첫 거래일은 개장 1시간 지연
+    if first_day:
+        return DaySession(dtime(9, 30), dtime(10, 0), dtime(15, 30), dtime(18, 0))
+    if KRX_CSAT_DAYS.get(day.year) == day.strftime('%m-%d'):
+        return DaySession(dtime(9, 30), dtime(10, 0), dtime(16, 30), dtime(19, 0))
+    return None
+
+
+def nyse_calendar():
+    return ExchangeCalendar(
+        'NYSE', 'America/New_York',
+        regular=DaySession(dtime(4, 0), dtime(9, 30), dtime(16, 0), dtime(20, 0)),
+        early_close=DaySession(dtime(4, 0), dtime(9, 30), dtime(13, 0), dtime(17, 0)),
+        holidays=nyse_holidays, early_closes=nyse_early_closes,
+    )
+
+
+def krx_calendar():
+    # 장전 시간외 08:30~ / 정규장 09:00~15:30 / 장후·시간외 단일가 ~18:00
+    return ExchangeCalendar(
+        'KRX', 'Asia/Seoul',
+        regular=DaySession(dtime(8, 30), dtime(9, 0), dtime(15, 30), dtime(18, 0)),
+        holidays=krx_holidays, special=_krx_special, known_years=set(KRX_HOLIDAYS),
+    )
+
+
+class SessionCalendar:
+    """스캐너별로 필요한 거래소/상태를 구독하고, 구독한 구간이 아니면 다음 전환까지 잠듦"""
+
+    def __init__(self):
+        self.exchanges = {'US': nyse_calendar(), 'KR': krx_calendar()}
+        self.subscriptions = {}  # 이름 -> (거래소, 활성 상태 집합)
+
+    def subscribe(self, name, exchange, states):
+        self.subscriptions[name] = (exchange, frozenset(states))
+
+    def state(self, exchange, ts=None):
+        return self.exchanges[exchange].state(ts)
+
+    def session_start(self, exchange, state, ts=None):
+        """ts 가 속한 (또는 직전) state 구간이 시작된 시각, 모르면 None"""
+        change = self.exchanges[exchange].last_change(ts, (state,))
+        return change[0] if change else None
+
+    def is_active(self, name, ts=None):
+        exchange, states = self.subscriptions[name]
+        return self.exchanges[exchange].state(ts) in states
+
+    def seconds_until_active(self, name, ts=None):
+        """활성 상태면 0, 아니면 다음 활성 전환까지 남은 초"""
+        ts = time.time() if ts is None else ts
+        if self.is_active(name, ts):
+            return 0.0
+        exchange, states = self.subscriptions[name]
+        at, _ = self.exchanges[exchange].next_change(ts, states)
+        return at - ts
+
+    def sleep_time(self, interval, max_sleep, ts=None):
+        """하나라도 활성이면 interval, 전부 쉬는 중이면 가장 가까운 활성 전환까지 (최대 max_sleep)"""
+        wait = min((self.seconds_until_active(name, ts) for name in self.subscriptions), default=interval)
+        if wait <= 0:
+            return interval
+        return max(interval, min(wait, max_sleep))
+
+    def next_wake(self, ts=None):
+        """가장 먼저 활성화되는 구독 (이름, 시각)"""
+        ts = time.time() if ts is None else ts
+        wakes = [(ts + self.seconds_until_active(name, ts), name) for name in self.subscriptions]
+        at, name = min(wakes)
+        return name, at
+
+    def warnings(self, ts=None):
+        """휴장일 목록이 없는 거래소/연도 안내 (시작 메시지용)"""
+        return [f"{cal.name} {year}년 휴장일 목록 없음 (주말만 휴장으로 처리)"
+                for cal in self.exchanges.values() for year in cal.missing_years(ts)]
+
+    def get_stats(self):
+        return {
+            **{f"{name.lower()}_state": cal.state() for name, cal in self.exchanges.items()},
+            **{f"{name.lower()}_missing_holidays": years
+               for name, cal in self.exchanges.items() if (years := cal.missing_years())},
+            'lookups': sum(cal.lookups for cal in self.exchanges.values()),
+        }
+
+
+# === 확인용: 휴장일/조기 폐장/다음 전환 + 조회 속도 ===
+# python session_calendar.py [연도]
+
+def _bench(year=None):
+    year = year or datetime.now().year
+    nyse, krx = nyse_calendar(), krx_calendar()
+    print(f"NYSE {year} 휴장: " + ', '.join(d.strftime('%m-%d') for d in sorted(nyse_holidays(year))))
+    print(f"NYSE {year} 조기 폐장: " + ', '.join(d.strftime('%m-%d') for d in sorted(nyse_early_closes(year))))
+    print(f"KRX  {year} 휴장: " + (', '.join(d.strftime('%m-%d') for d in sorted(krx_holidays(year))) or '(목록 없음)'))
+
+    now = time.time()
+    for cal in (nyse, krx):
+        at, state = cal.next_change(now)
+        print(f"{cal.name}: 현재 {cal.state(now)}, 다음 {state} {datetime.fromtimestamp(at, cal.tz):%Y-%m-%d %H:%M %Z}")
+
+    n = 200_000
+    started = time.perf_counter()
+    for i in range(n):
+        nyse.state(now + i)
+    elapsed = time.perf_counter() - started
+    tz = pytz.timezone('America/New_York')
+    started = time.perf_counter()
+    for i in range(n):
+        t = datetime.fromtimestamp(now + i, tz)
+        t.weekday() < 5 and t.replace(hour=4, minute=0) <= t <= t.replace(hour=20, minute=0)
+    old = time.perf_counter() - started
+    print(f"상태 조회: {elapsed / n * 1e6:.2f} µs/회 (기존 pytz 요일/시각 비교 {old / n * 1e6:.2f} µs/회)")
+
+
+if __name__ == '__main__':
+    _bench(*(int(a) for a in sys.argv[1:2]))
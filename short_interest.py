@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""공매도 잔고 테이블 (느린 경로) + 실시간 시세 결합 스퀴즈 점수 (빠른 경로)
+
+공매도 비율은 한 달에 두 번 바뀌므로 Finviz 전 페이지를 하루 한 번만 받아
+NumPy 열로 보관하고, 스캔 주기마다 가격 피드의 등락률/거래량만 붙여 전 종목 점수를 한 번에 계산.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+import aiohttp
+import numpy as np
+import pytz
+from parsers import extract_finviz_short_table, extract_finviz_total
+
+logger = logging.getLogger(__name__)
+
+SCREENER_URL = "https://finviz.com/screener.ashx?v=131&f={filter}&r={row}"
+PAGE_ROWS = 20
+ET = pytz.timezone('America/New_York')
+
+
+class ShortInterestTable:
+    RETRY_INTERVAL = 600  # 갱신 실패 후 재시도 간격 (초)
+
+    def __init__(self, snapshot_path, screen_filter='sh_short_o10', concurrency=3):
+        self.snapshot_path = snapshot_path
+        self.screen_filter = screen_filter
+        self.concurrency = concurrency  # Finviz 동시 연결 수 (호스트당)
+
+        self.symbols = []
+        self.index = {}  # 티커 -> 행 번호
+        self.float_shares = np.zeros(0)
+        self.short_float = np.zeros(0)
+        self.short_ratio = np.zeros(0)   # days to cover
+        self.avg_volume = np.zeros(0)
+        self.snapshot_date = None        # ET 기준 갱신 날짜
+
+        self._refresh_task = None
+        self._last_attempt = -self.RETRY_INTERVAL
+        self.refresh_seconds = 0.0
+        self.pages = 0
+
+        self.load()
+
+    # === 스냅샷 파일 ===
+
+    def _build(self, rows):
+        """[(티커, 유동주식, 공매도%, 숏레이쇼, 평균거래량)] -> 열 배열"""
+        self.symbols = [r[0] for r in rows]
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        columns = np.array([r[1:5] for r in rows], dtype=np.float64).reshape(-1, 4)
+        self.float_shares, self.short_float, self.short_ratio, self.avg_volume = columns.T.copy()
+
+    def load(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                data = json.load(f)
+            self._build(data['rows'])
+            self.snapshot_date = data['date']
+            logger.info(f"📂 공매도 테이블 스냅샷 로드: {len(self.symbols)}종목 ({self.snapshot_date})")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"공매도 테이블 로드 실패: {e}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        rows = [[s, *map(float, v)] for s, v in zip(
+            self.symbols, zip(self.float_shares, self.short_float, self.short_ratio, self.avg_volume))]
+        with open(self.snapshot_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'date': self.snapshot_date, 'rows': rows}, f)
+        os.replace(self.snapshot_path + '.tmp', self.snapshot_path)
+
+    # === 하루 한 번 갱신 ===
+
+    def is_stale(self):
+        return self.snapshot_date != datetime.now(ET).strftime('%Y-%m-%d')
+
+    def schedule_refresh(self):
+        """날짜가 바뀌었으면 백그라운드로 갱신 (스캔은 기존 테이블로 계속)"""
+        if not self.is_stale():
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.monotonic() - self._last_attempt < self.RETRY_INTERVAL:
+            return
+        self._last_attempt = time.monotonic()
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        started = time.perf_counter()
+        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+        async def fetch(session, row):
+            url = SCREENER_URL.format(filter=self.screen_filter, row=row)
+            async with session.get(url, timeout=15) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                return await response.text()
+
+        try:
+            connector = aiohttp.TCPConnector(limit_per_host=self.concurrency)
+            async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+                # 1페이지에서 총 종목 수 확인 후 나머지 페이지를 동시에
+                first = await fetch(session, 1)
+                total = extract_finviz_total(first)
+                rest = range(1 + PAGE_ROWS, total + 1, PAGE_ROWS)
+                results = await asyncio.gather(*(fetch(session, row) for row in rest), return_exceptions=True)
+        except Exception as e:
+            logger.error(f"공매도 테이블 조회 실패: {e}")
+            return
+
+        pages = [first] + [r for r in results if isinstance(r, str)]
+        rows = {}
+        for html in pages:
+            for row in extract_finviz_short_table(html):
+                rows[row.symbol] = (row.symbol, row.float_shares, row.short_float, row.short_ratio, row.avg_volume)
+        if not rows or len(rows) < total * 0.9:
+            logger.warning(f"공매도 테이블 불완전 ({len(rows)}/{total}종목), 기존 테이블 유지")
+            return
+
+        self._build(list(rows.values()))
+        self.snapshot_date = datetime.now(ET).strftime('%Y-%m-%d')
+        self.pages = len(pages)
+        self.refresh_seconds = time.perf_counter() - started
+        await asyncio.to_thread(self.save)
+        logger.info(f"🔄 공매도 테이블 갱신: {len(rows)}종목, {len(pages)}페이지 {self.refresh_seconds:.1f}초")
+
+    # === 빠른 경로: 시세 결합 + 스퀴즈 점수 ===
+
+    def join(self, quotes):
+        """[(티커, 가격, 등락률, 거래량)] -> 테이블 순서의 (등락률, 거래량, 가격, 시세 있음) 배열"""
+        n = len(self.symbols)
+        change = np.zeros(n)
+        volume = np.zeros(n)
+        price = np.zeros(n)
+        rows, values = [], []
+        for symbol, p, c, v in quotes:
+            row = self.index.get(symbol)
+            if row is not None:
+                rows.append(row)
+                values.append((c, v, p))
+        has_quote = np.zeros(n, dtype=bool)
+        if rows:
+            rows = np.array(rows)
+            values = np.array(values, dtype=np.float64)
+            change[rows], volume[rows], price[rows] = values.T
+            has_quote[rows] = True
+        return change, volume, price, has_quote
+
+    def squeeze_scores(self, change, volume):
+        """전 종목 스퀴즈 점수 (0~10) - 공매도 비율, 숏커버 일수, 상승률, 상대 거래량, 작은 유동주식"""
+        short = np.clip(self.short_float / 40.0, 0, 1.5)
+        days = np.clip(self.short_ratio / 10.0, 0, 1.5)
+        momentum = np.clip(change / 20.0, 0, 1.5)
+        rvol = np.divide(volume, self.avg_volume, out=np.zeros_like(volume), where=self.avg_volume > 0)
+        rvol = np.clip(rvol / 3.0, 0, 1.5)
+        small_float = np.where((self.float_shares > 0) & (self.float_shares < 20e6), 1.0,
+                               np.where(self.float_shares < 50e6, 0.5, 0.0))
+        raw = 0.35 * short + 0.15 * days + 0.3 * momentum + 0.15 * rvol + 0.05 * small_float
+        return np.round(raw / 1.5 * 10, 2)
+
+    def get_stats(self):
+        return {
+            'symbols': len(self.symbols),
+            'snapshot': self.snapshot_date,
+            'pages': self.pages,
+            'refresh_s': round(self.refresh_seconds, 1),
+        }
+
+
+# === 벤치마크: 전 종목 점수 계산 ===
+# python short_interest.py [종목 수] [시세 수]
+
+def _bench(n_symbols=8000, n_quotes=300, repeat=200):
+    import tempfile
+    rng = np.random.default_rng(0)
+    table = ShortInterestTable(os.path.join(tempfile.mkdtemp(), 'short.json'))
+    symbols = [f'S{i:05d}' for i in range(n_symbols)]
+    table._build([(s, rng.lognormal(17, 1.2), rng.uniform(10, 60), rng.uniform(0.5, 15), rng.lognormal(13, 1))
+                  for s in symbols])
+    quotes = [(symbols[i], rng.uniform(1, 50), rng.normal(5, 10), rng.lognormal(14, 1.5))
+              for i in rng.choice(n_symbols, n_quotes, replace=False)]
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        change, volume, price, has_quote = table.join(quotes)
+        scores = table.squeeze_scores(change, volume)
+        hits = np.flatnonzero(has_quote & (scores >= 5))
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"결합 + 점수: {n_symbols:,}종목 / 시세 {n_quotes:,}개 {elapsed * 1000:.2f} ms/회, 후보 {len(hits)}개")
+
+    started = time.perf_counter()
+    table.save()
+    ShortInterestTable(table.snapshot_path)
+    print(f"스냅샷 저장+로드: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    _bench(*(int(a) for a in sys.argv[1:3]))
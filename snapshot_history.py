@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""급등 테이블 스냅샷 이력 (종목별 열 배열, 최근 depth 회 링 버퍼)
+
+매 조회를 독립적으로 보지 않고 직전 스냅샷과의 차이를 한 번에 계산해
+등락률 가속, 거래량 가속, 순위 급상승, 신규 진입을 판단함.
+"""
+import sys
+import time
+from typing import NamedTuple
+import numpy as np
+
+
+class SnapshotDeltas(NamedTuple):
+    """push() 에 넘긴 행 순서와 같은 배열 (이전 값이 없으면 NaN)"""
+    change_accel: np.ndarray    # 등락률 변화 (%p / 분)
+    volume_accel: np.ndarray    # 이번 구간 분당 거래량 / 직전 구간 분당 거래량
+    rank_jump: np.ndarray       # 이전 순위 - 현재 순위 (양수 = 상승)
+    new_entry: np.ndarray       # 이력 구간 동안 한 번도 없다가 처음 등장 (bool)
+
+
+class SnapshotHistory:
+    def __init__(self, depth=20, capacity=1024):
+        self.depth = depth
+        self.capacity = capacity
+        self.slots = {}  # 티커 -> 열 번호
+        self._free = list(range(capacity - 1, -1, -1))
+
+        shape = (depth, capacity)
+        self.price = np.full(shape, np.nan, dtype=np.float32)
+        self.change = np.full(shape, np.nan, dtype=np.float32)
+        self.volume = np.full(shape, np.nan, dtype=np.float64)
+        self.rank = np.full(shape, np.nan, dtype=np.float32)
+        self.ts = np.full(depth, np.nan)
+        self.head = -1    # 마지막으로 기록한 행
+        self.count = 0    # 기록한 스냅샷 수 (최대 depth)
+        self.resets = 0
+
+    # === 열 관리 ===
+
+    def _reclaim(self):
+        """이력 구간 안에 한 번도 없는 종목 열 반납"""
+        seen = ~np.isnan(self.change).all(axis=0)
+        stale = [s for s, slot in self.slots.items() if not seen[slot]]
+        for symbol in stale:
+            self._free.append(self.slots.pop(symbol))
+
+    def _slot(self, symbol):
+        slot = self.slots.get(symbol)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self.slots[symbol] = self._free.pop()
+        return slot
+
+    def _grow(self):
+        old = self.capacity
+        self.capacity *= 2
+        for name in ('price', 'change', 'volume', 'rank'):
+            arr = getattr(self, name)
+            grown = np.full((self.depth, self.capacity), np.nan, dtype=arr.dtype)
+            grown[:, :old] = arr
+            setattr(self, name, grown)
+        self._free = list(range(self.capacity - 1, old - 1, -1))
+
+    def reset(self):
+        """이력 전체 비우기 (열 배열 크기는 유지)"""
+        for arr in (self.price, self.change, self.volume, self.rank, self.ts):
+            arr.fill(np.nan)
+        self.slots = {}
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self.head = -1
+        self.count = 0
+        self.resets += 1
+
+    # === 기록 + 차이 ===
+
+    def push(self, symbols, price, change, volume, ts=None, session_start=None, max_gap=None):
+        """스냅샷 한 회 기록 (symbols 순서 = 순위) 후 직전 스냅샷 대비 차이 반환
+
+        직전 스냅샷이 session_start 이전(전날 세션 등)이거나 max_gap 초보다 오래됐으면
+        밤사이 순위 변화를 가속/신규 진입으로 보지 않도록 이력을 비우고 새로 시작
+        """
+        ts = time.time() if ts is None else ts
+        if self.count:
+            last = self.ts[self.head]
+            if ((session_start is not None and last < session_start)
+                    or (max_gap is not None and ts - last > max_gap)):
+                self.reset()
+        if len(self._free) < len(symbols):
+            self._reclaim()  # 이번 스냅샷 열을 배정하기 전에만 (배정 직후 열은 아직 비어 있음)
+        slots = np.fromiter((self._slot(s) for s in symbols), dtype=np.int64, count=len(symbols))
+
+        prev = self.head
+        prev2 = (self.head - 1) % self.depth if self.count >= 2 else -1
+        self.head = (self.head + 1) % self.depth
+        row = self.head
+        self.price[row] = np.nan
+        self.change[row] = np.nan
+        self.volume[row] = np.nan
+        self.rank[row] = np.nan
+        self.price[row, slots] = price
+        self.change[row, slots] = change
+        self.volume[row, slots] = volume
+        self.rank[row, slots] = np.arange(1, len(slots) + 1)
+        self.ts[row] = ts
+        self.count = min(self.count + 1, self.depth)
+
+        n = len(slots)
+        nan = np.full(n, np.nan)
+        if self.count < 2:
+            return SnapshotDeltas(nan, nan, nan, np.zeros(n, dtype=bool))
+
+        dt = max((ts - self.ts[prev]) / 60.0, 1e-6)
+        change_accel = (self.change[row, slots] - self.change[prev, slots]) / dt
+        rank_jump = self.rank[prev, slots] - self.rank[row, slots]
+
+        volume_now = self.volume[row, slots]
+        volume_prev = self.volume[prev, slots]
+        rate = (volume_now - volume_prev) / dt
+        if prev2 >= 0:
+            dt_prev = max((self.ts[prev] - self.ts[prev2]) / 60.0, 1e-6)
+            rate_prev = (volume_prev - self.volume[prev2, slots]) / dt_prev
+            volume_accel = np.divide(rate, rate_prev, out=np.full(n, np.nan), where=rate_prev > 0)
+        else:
+            volume_accel = nan
+
+        # 이번 행을 뺀 나머지 이력에 한 번도 없었으면 신규 진입
+        others = np.delete(self.change[:, slots], row, axis=0)  # 아직 안 쓴 행은 NaN
+        new_entry = np.isnan(others).all(axis=0)
+
+        return SnapshotDeltas(change_accel.astype(np.float64), volume_accel,
+                              rank_jump.astype(np.float64), new_entry)
+
+    def dump(self):
+        return {'slots': dict(self.slots), 'price': self.price, 'change': self.change,
+                'volume': self.volume, 'rank': self.rank, 'ts': self.ts,
+                'head': self.head, 'count': self.count}
+
+    def load(self, state, elapsed=0.0):
+        if state['change'].shape[0] != self.depth:
+            return
+        self.slots = dict(state['slots'])
+        for name in ('price', 'change', 'volume', 'rank', 'ts'):
+            setattr(self, name, state[name].copy())
+        self.capacity = self.change.shape[1]
+        used = set(self.slots.values())
+        self._free = [i for i in range(self.capacity - 1, -1, -1) if i not in used]
+        self.head, self.count = state['head'], state['count']
+
+    def __len__(self):
+        return len(self.slots)
+
+    def get_stats(self):
+        return {'symbols': len(self.slots), 'snapshots': self.count, 'resets': self.resets,
+                'kb': (self.price.nbytes + self.change.nbytes + self.volume.nbytes + self.rank.nbytes) // 1024}
+
+
+# === 벤치마크 ===
+# python snapshot_history.py [회당 종목 수] [회수]
+
+def _bench(rows=100, rounds=2000):
+    rng = np.random.default_rng(0)
+    universe = [f'S{i:04d}' for i in range(rows * 5)]
+    history = SnapshotHistory()
+    change = rng.uniform(5, 40, len(universe))
+    volume = rng.uniform(1e5, 1e7, len(universe))
+    started = time.perf_counter()
+    signals = 0
+    for r in range(rounds):
+        change += rng.normal(0, 1, len(universe))
+        volume += rng.uniform(0, 1e5, len(universe))
+        top = np.argsort(-change)[:rows]
+        deltas = history.push([universe[i] for i in top], np.ones(rows), change[top], volume[top], ts=r * 30.0)
+        signals += int(np.count_nonzero((deltas.change_accel >= 2) | (deltas.rank_jump >= 10) | deltas.new_entry))
+    elapsed = time.perf_counter() - started
+    print(f"push + 차이: {rows}종목 x {rounds:,}회 {elapsed / rounds * 1e6:.0f} µs/회, 신호 {signals:,}개, {history.get_stats()}")
+
+
+if __name__ == '__main__':
+    _bench(*(int(a) for a in sys.argv[1:3]))
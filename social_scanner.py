@@ -1,17 +1,51 @@
 import aiohttp
 import asyncio
+import json
 import logging
-from datetime import datetime, timedelta
-from collections import Counter
+import time
 import re
 from config import Config
+from mention_window import MentionWindow
+from reddit_comments import CountingReader, aiter_comments
+from ttl_map import TTLMap
 
 logger = logging.getLogger(__name__)
 
+_CASHTAG_RE = re.compile(r'\$([A-Z]{2,5})')
+_WORD_RE = re.compile(r'\b[A-Z]{2,5}\b')
+_CASHTAG_STOPWORDS = frozenset({'THE', 'FOR', 'NEW', 'USA', 'USD'})
+
 class SocialScanner:
-    def __init__(self):
-        self.reddit_base = "https://www.reddit.com"
-        self.last_posts = set()
+    PAGE_LIMIT = 100
+    MAX_PAGES = 10          # 한 번에 따라잡을 최대 페이지 (1,000개)
+    STALE_CHECK = 600       # 새 글이 계속 없으면 커서 유효성 확인 간격 (초)
+    COMMENT_GRACE = 300     # 늦게 목록에 반영되는 댓글 여유 (초, 겹치는 구간은 id 로 중복 제거)
+    
+    def __init__(self, reddit_base=None):
+        self.reddit_base = (reddit_base or Config.REDDIT_BASE).rstrip('/')  # 목 서버 테스트 시 교체
+        
+        # 서브레딧별 커서: 마지막으로 읽은 글 (fullname, created_utc) -> 그보다 새 글만 요청
+        self.cursors = {}
+        self._last_check = {}
+        # 커서가 초기화될 때 같은 글을 두 번 세지 않도록 최근 글 id 보관
+        self.last_posts = TTLMap(Config.REDDIT_WINDOW_HOURS * 3600 + 3600, max_size=50_000)
+        
+        self.requests = 0
+        self.bytes = 0
+        self.posts = 0
+        self.cursor_resets = 0
+        
+        # 토론 스레드 댓글: 스레드 id -> 마지막으로 센 댓글 시각
+        self.threads = {}
+        self._threads_checked = 0.0
+        self._thread_re = re.compile(Config.REDDIT_THREAD_PATTERN, re.IGNORECASE)
+        self.seen_comments = TTLMap(Config.REDDIT_WINDOW_HOURS * 3600 + 3600, max_size=200_000)
+        self.comments = 0
+        self.comment_bytes = 0
+        self.comment_seconds = 0.0
+        
+        # 종목별 언급 수 (1분 x 24시간), 평소 대비 급증 여부 판단
+        self.mentions = MentionWindow(hours=Config.REDDIT_WINDOW_HOURS)
         
         # [핵심] WSB에서 자주 언급되는 인기 종목 리스트 (노이즈 방지용 화이트리스트)
         # 이 리스트에 있는 건 $ 없이도 인식, 없는 건 $가 붙어야만 인식 ($ABC)
@@ -33,103 +67,203 @@ class SocialScanner:
         }
 
     async def scan(self):
-        """소셜 미디어 트렌드 스캔"""
+        """소셜 미디어 트렌드 스캔 (전 서브레딧 동시 조회 -> 언급 속도 급증 종목)"""
         alerts = []
         
         try:
-            # WallStreetBets 스캔
-            wsb_mentions = await self.scan_subreddit('wallstreetbets')
+            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+            async with aiohttp.ClientSession(headers=headers) as session:
+                tasks = [self.scan_subreddit(session, subreddit) for subreddit in Config.REDDIT_SUBREDDITS]
+                if Config.REDDIT_COMMENTS_ENABLED:
+                    tasks.append(self.scan_threads(session))
+                await asyncio.gather(*tasks)
             
-            # 언급량 기준 필터링
-            for symbol, count in wsb_mentions.most_common(10):
-                if count >= Config.REDDIT_MIN_MENTIONS:
-                    logger.info(f"🔥 레딧 급등 포착: {symbol} ({count}회)")
-                    
-                    alert = {
-                        'symbol': symbol,
-                        'price': 0, # 가격은 나중에 채움
-                        'change_percent': 0,
-                        'volume': 0,
-                        'trigger_type': 'social_trend',
-                        'trigger_reason': f'🔥 Reddit 언급 폭발 ({count}회/1h)'
-                    }
-                    alerts.append(alert)
+            surges = self.mentions.surges(
+                min_count=Config.REDDIT_MIN_RECENT_MENTIONS,
+                min_zscore=Config.REDDIT_MIN_ZSCORE,
+                min_ratio=Config.REDDIT_MIN_VELOCITY,
+                warmup_count=Config.REDDIT_MIN_MENTIONS
+            )
+            for symbol, count, baseline, zscore in surges[:10]:
+                logger.info(f"🔥 레딧 급등 포착: {symbol} ({count}회/1h, 평소 {baseline:.1f}회, z={zscore:.1f})")
+                
+                if baseline > 0:
+                    reason = f'🔥 Reddit 언급 급증 ({count}회/1h, 평소 {baseline:.1f}회의 {count / baseline:.1f}배)'
+                else:
+                    reason = f'🔥 Reddit 언급 폭발 ({count}회/1h)'
+                alerts.append({
+                    'symbol': symbol,
+                    'price': 0, # 가격은 나중에 채움
+                    'change_percent': 0,
+                    'volume': 0,
+                    'trigger_type': 'social_trend',
+                    'trigger_reason': reason
+                })
             
         except Exception as e:
             logger.error(f"Social scan error: {e}")
         
         return alerts
     
-    async def scan_subreddit(self, subreddit):
-        """특정 서브레딧 스캔"""
-        mentions = Counter()
-        
+    async def _fetch_listing(self, session, subreddit, before=None):
+        params = {'limit': self.PAGE_LIMIT, 'raw_json': 1}
+        if before:
+            params['before'] = before
+        async with session.get(f"{self.reddit_base}/r/{subreddit}/new.json", params=params, timeout=10) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            body = await response.read()
+        self.requests += 1
+        self.bytes += len(body)
+        return [child['data'] for child in json.loads(body).get('data', {}).get('children', [])]
+
+    async def scan_subreddit(self, session, subreddit):
+        """커서 이후 새 글만 받아 티커 언급을 윈도우에 기록 (100개 넘게 쌓였으면 페이지 이어서)"""
         try:
-            url = f"{self.reddit_base}/r/{subreddit}/new.json?limit=100" # 100개로 늘림
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+            cursor = self.cursors.get(subreddit)
+            posts = []
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=10) as response:
-                    if response.status != 200:
-                        return mentions
-                    
-                    data = await response.json()
-                    posts = data.get('data', {}).get('children', [])
+            if cursor is None:
+                # 첫 실행: 최신 100개로 시작
+                posts = await self._fetch_listing(session, subreddit)
+            else:
+                before = cursor[0]
+                for _ in range(self.MAX_PAGES):
+                    # before= 는 커서 바로 다음(더 새) 글부터 최대 100개, 최신순
+                    page = await self._fetch_listing(session, subreddit, before)
+                    posts.extend(page)
+                    if len(page) < self.PAGE_LIMIT:
+                        break
+                    before = page[0]['name']
+                
+                if not posts and time.time() - self._last_check.get(subreddit, 0) > self.STALE_CHECK:
+                    # 커서 글이 삭제되면 before= 가 계속 빈 결과를 줌 -> 시각 기준으로 복구
+                    self._last_check[subreddit] = time.time()
+                    latest = await self._fetch_listing(session, subreddit)
+                    posts = [p for p in latest if p.get('created_utc', 0) >= cursor[1]]
+                    if posts:
+                        self.cursor_resets += 1
+                        logger.info(f"🔁 r/{subreddit} 커서 재설정 ({cursor[0]} 삭제 추정)")
+            
+            if posts:
+                newest = max(posts, key=lambda p: p.get('created_utc', 0))
+                self.cursors[subreddit] = (newest['name'], newest.get('created_utc', 0))
+                self._last_check[subreddit] = time.time()
+            
+            # 24시간 윈도우 밖의 글은 무시
+            cutoff_time = time.time() - Config.REDDIT_WINDOW_HOURS * 3600
+            
+            for post in posts:
+                try:
+                    # 중복 체크 (커서 재설정 시 겹치는 글)
+                    if not self.last_posts.check_and_set(post['id']): continue
                     
-                    # 1시간 이내 글만
-                    cutoff_time = datetime.now() - timedelta(hours=1)
+                    # 시간 체크
+                    created_utc = post.get('created_utc', 0)
+                    if created_utc < cutoff_time: continue
                     
-                    for post_data in posts:
-                        try:
-                            post = post_data['data']
-                            
-                            # 중복 체크
-                            if post['id'] in self.last_posts: continue
-                            
-                            # 시간 체크
-                            created_utc = post.get('created_utc', 0)
-                            post_time = datetime.fromtimestamp(created_utc)
-                            if post_time < cutoff_time: continue
-                            
-                            # 텍스트 합치기
-                            title = post.get('title', '')
-                            selftext = post.get('selftext', '')
-                            full_text = f"{title} {selftext}"
-                            
-                            # 티커 추출
-                            tickers = self.extract_tickers(full_text)
-                            mentions.update(tickers)
-                            
-                            self.last_posts.add(post['id'])
-                            
-                        except Exception:
-                            continue
+                    # 텍스트 합치기
+                    title = post.get('title', '')
+                    selftext = post.get('selftext', '')
+                    full_text = f"{title} {selftext}"
                     
-                    if len(self.last_posts) > 1000:
-                        self.last_posts.clear()
+                    # 티커 추출 -> 글 작성 시각 칸에 기록
+                    for ticker in self.extract_tickers(full_text):
+                        self.mentions.add(ticker, created_utc)
+                    self.posts += 1
                     
+                except Exception:
+                    continue
+                
         except Exception as e:
             logger.error(f"Error scanning r/{subreddit}: {e}")
+    
+    # === 토론 스레드 댓글 ===
+    
+    async def _refresh_threads(self, session):
+        """고정글 중 데일리/무브 토론 스레드 찾기 (REDDIT_THREAD_REFRESH 마다)"""
+        if time.time() - self._threads_checked < Config.REDDIT_THREAD_REFRESH:
+            return
+        self._threads_checked = time.time()
+        url = f"{self.reddit_base}/r/{Config.REDDIT_COMMENT_SUBREDDIT}/hot.json"
+        async with session.get(url, params={'limit': 10, 'raw_json': 1}, timeout=10) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            body = await response.read()
+        self.requests += 1
+        self.bytes += len(body)
         
-        return mentions
+        found = {}
+        for child in json.loads(body).get('data', {}).get('children', []):
+            post = child.get('data', {})
+            if post.get('stickied') and self._thread_re.search(post.get('title', '')):
+                found[post['id']] = self.threads.get(post['id'], 0.0)
+        if set(found) != set(self.threads):
+            logger.info(f"💬 토론 스레드 {len(found)}개 추적: {', '.join(found) or '-'}")
+        # 체크포인트에 등록된 dict 이므로 교체하지 않고 갱신
+        self.threads.clear()
+        self.threads.update(found)
+    
+    async def scan_threads(self, session):
+        try:
+            await self._refresh_threads(session)
+            await asyncio.gather(*(self.scan_thread(session, thread_id) for thread_id in list(self.threads)))
+        except Exception as e:
+            logger.error(f"Error scanning discussion threads: {e}")
+    
+    async def scan_thread(self, session, thread_id):
+        """스레드 댓글 최신순 조회 -> 지난번 이후 댓글만 티커 집계 (응답은 스트리밍 파싱)"""
+        since = self.threads.get(thread_id, 0.0)
+        newest = since
+        url = f"{self.reddit_base}/r/{Config.REDDIT_COMMENT_SUBREDDIT}/comments/{thread_id}.json"
+        params = {'sort': 'new', 'limit': Config.REDDIT_COMMENT_LIMIT, 'raw_json': 1}
+        started = time.perf_counter()
+        try:
+            async with session.get(url, params=params, timeout=20) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                reader = CountingReader(response.content)
+                async for comment in aiter_comments(reader):
+                    created_utc = comment.get('created_utc', 0)
+                    # 답글 트리에는 오래된 댓글도 섞여 있으므로 시각 + id 로 걸러냄
+                    if created_utc < since - self.COMMENT_GRACE or not self.seen_comments.check_and_set(comment.get('id')):
+                        continue
+                    newest = max(newest, created_utc)
+                    for ticker in self.extract_tickers(comment.get('body', '')):
+                        self.mentions.add(ticker, created_utc)
+                    self.comments += 1
+            self.requests += 1
+            self.comment_bytes += reader.bytes
+            if thread_id in self.threads:
+                self.threads[thread_id] = newest
+        except Exception as e:
+            logger.error(f"Error scanning thread {thread_id}: {e}")
+        finally:
+            self.comment_seconds += time.perf_counter() - started
+    
+    def get_stats(self):
+        return {
+            'requests': self.requests,
+            'kb': (self.bytes + self.comment_bytes) // 1024,
+            'posts': self.posts,
+            'cursor_resets': self.cursor_resets,
+            'threads': len(self.threads),
+            'comments': self.comments,
+            'comment_s': round(self.comment_seconds, 1),
+            **{f"mention_{k}": v for k, v in self.mentions.get_stats().items()},
+        }
     
     def extract_tickers(self, text):
-        """[수정됨] 노이즈 제거 강화"""
+        """[수정됨] 노이즈 제거 강화 (댓글 대량 처리용으로 정규식 미리 컴파일)"""
         text = text.upper()
-        found_tickers = set()
         
         # 1. $가 붙은 티커 찾기 ($TSLA, $AAPL) -> 가장 확실함
-        cashtags = re.findall(r'\$([A-Z]{2,5})', text)
-        for tag in cashtags:
-            # $가 붙어있으면 웬만하면 인정 (단, 너무 흔한 단어 제외)
-            if tag not in {'THE', 'FOR', 'NEW', 'USA', 'USD'}:
-                found_tickers.add(tag)
+        # $가 붙어있으면 웬만하면 인정 (단, 너무 흔한 단어 제외)
+        found_tickers = set(_CASHTAG_RE.findall(text))
+        found_tickers -= _CASHTAG_STOPWORDS
         
         # 2. $ 없이 단어만 있는 경우 -> 화이트리스트에 있는 것만 인정
         # (NVDA, GME 같은 유명한 건 $ 안 붙이고 쓰기 때문)
-        words = re.findall(r'\b([A-Z]{2,5})\b', text)
-        for word in words:
-            if word in self.popular_tickers:
-                found_tickers.add(word)
+        found_tickers.update(self.popular_tickers.intersection(_WORD_RE.findall(text)))
                 
-        return list(found_tickers)
\ No newline at end of file
+        return list(found_tickers)
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""구독자별 알림 필터 + 색인 매칭
+
+알림마다 전체 구독자를 훑지 않도록 (종목, 트리거, 최소 점수 구간) 조합 색인에서
+후보만 꺼내고, 시장/가격 조건만 개별 확인함.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('full', 'compact')
+_MAX_SCORE = 10
+
+
+class Subscription:
+    """구독 조건 (None = 전체 허용)"""
+
+    __slots__ = ('chat_id', 'markets', 'trigger_types', 'symbols', 'min_score',
+                 'min_price', 'max_price', 'format')
+
+    def __init__(self, chat_id, markets=None, trigger_types=None, symbols=None,
+                 min_score=0, min_price=None, max_price=None, format='full'):
+        self.chat_id = str(chat_id)
+        self.markets = set(markets) if markets else None
+        self.trigger_types = set(trigger_types) if trigger_types else None
+        self.symbols = {s.upper() for s in symbols} if symbols else None
+        self.min_score = float(min_score or 0)
+        self.min_price = min_price
+        self.max_price = max_price
+        self.format = format if format in FORMATS else 'full'
+
+    def matches(self, symbol, market, trigger_type, score, price):
+        """색인을 거치지 않는 전체 조건 확인 (벤치마크 비교용)"""
+        if self.symbols is not None and symbol not in self.symbols: return False
+        if self.trigger_types is not None and trigger_type not in self.trigger_types: return False
+        if score < self.min_score: return False
+        return self.accepts(market, price)
+
+    def accepts(self, market, price):
+        """색인으로 걸러지지 않는 나머지 조건 (시장, 가격 범위)"""
+        if self.markets is not None and market not in self.markets: return False
+        if price:
+            if self.min_price is not None and price < self.min_price: return False
+            if self.max_price is not None and price > self.max_price: return False
+        return True
+
+    def to_dict(self):
+        data = {'chat_id': self.chat_id, 'min_score': self.min_score, 'format': self.format}
+        for key in ('markets', 'trigger_types', 'symbols'):
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = sorted(value)
+        for key in ('min_price', 'max_price'):
+            if getattr(self, key) is not None:
+                data[key] = getattr(self, key)
+        return data
+
+
+class SubscriptionRegistry:
+    def __init__(self, path=None):
+        self.path = path
+        self.subs = {}  # chat_id -> Subscription
+
+        # 색인: (종목|'*', 트리거|'*', ceil(min_score)) -> chat_id 집합
+        # 구독자는 자기 조건 조합마다 한 번씩 들어가므로 알림 하나에 최대 한 번만 매칭됨
+        self._index = {}
+
+        self.matched = 0
+        self.match_time = 0.0
+
+        if path:
+            self.load()
+
+    # === 등록/해제 ===
+
+    def _keys(self, sub):
+        bucket = min(_MAX_SCORE + 1, max(0, math.ceil(sub.min_score)))
+        for symbol in sub.symbols or ('*',):
+            for trigger in sub.trigger_types or ('*',):
+                yield symbol, trigger, bucket
+
+    def add(self, sub):
+        if sub.chat_id in self.subs:
+            self.remove(sub.chat_id)
+        self.subs[sub.chat_id] = sub
+        for key in self._keys(sub):
+            self._index.setdefault(key, set()).add(sub.chat_id)
+
+    def remove(self, chat_id):
+        sub = self.subs.pop(str(chat_id), None)
+        if sub is None:
+            return False
+        for key in self._keys(sub):
+            members = self._index.get(key)
+            if members is not None:
+                members.discard(sub.chat_id)
+                if not members:
+                    del self._index[key]
+        return True
+
+    # === 매칭 ===
+
+    def match(self, symbol, market, trigger_type, score, price=0):
+        """조건에 맞는 Subscription 목록 (후보 수에 비례, 전체 구독자 수와 무관)"""
+        started = time.perf_counter()
+        symbol = (symbol or '').upper()
+        # ceil(min_score) <= floor(score) 는 점수 조건 통과 확정, 그 위 한 구간만 개별 확인
+        top = min(_MAX_SCORE + 1, math.floor(score) + 1)
+
+        result = []
+        for symbol_key in (symbol, '*'):
+            for trigger_key in (trigger_type, '*'):
+                for bucket in range(top + 1):
+                    members = self._index.get((symbol_key, trigger_key, bucket))
+                    if not members:
+                        continue
+                    for chat_id in members:
+                        sub = self.subs[chat_id]
+                        if bucket == top and score < sub.min_score:
+                            continue
+                        if sub.accepts(market, price):
+                            result.append(sub)
+
+        self.matched += len(result)
+        self.match_time += time.perf_counter() - started
+        return result
+
+    def match_by_format(self, symbol, market, trigger_type, score, price=0):
+        """{format: [chat_id, ...]} - 메시지는 포맷별로 한 번만 렌더링"""
+        groups = {}
+        for sub in self.match(symbol, market, trigger_type, score, price):
+            groups.setdefault(sub.format, []).append(sub.chat_id)
+        return groups
+
+    # === 저장 ===
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for data in json.load(f):
+                    self.add(Subscription(**data))
+            logger.info(f"📋 구독자 {len(self.subs)}명 로드")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"구독 목록 로드 실패: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump([sub.to_dict() for sub in self.subs.values()], f, ensure_ascii=False, indent=1)
+        os.replace(self.path + '.tmp', self.path)
+
+    def get_stats(self):
+        return {
+            'subscribers': len(self.subs),
+            'matched': self.matched,
+            'match_ms': round(self.match_time * 1000, 1),
+        }
+
+
+# === 매칭 벤치마크 ===
+# python subscriptions.py [구독자 수] [알림 수]
+
+def _random_sub(rng, i, symbols, triggers):
+    return Subscription(
+        chat_id=1000 + i,
+        markets=rng.choice([None, ['US'], ['KR']]),
+        trigger_types=rng.choice([None, rng.sample(triggers, 2)]) if rng.random() < 0.6 else rng.sample(triggers, 1),
+        symbols=rng.sample(symbols, rng.randint(1, 20)) if rng.random() < 0.7 else None,
+        min_score=rng.choice([0, 5, 6, 7, 7.5, 8, 9]),
+        min_price=rng.choice([None, 1]),
+        max_price=rng.choice([None, 20, 500]),
+        format=rng.choice(FORMATS),
+    )
+
+
+def _bench(n_subs=10_000, n_alerts=5_000):
+    rng = random.Random(0)
+    symbols = [f'S{i:04d}' for i in range(3000)]
+    triggers = ['price_surge', 'news', 'insider_trading', 'short_squeeze', 'whale_alert', 'social']
+    registry = SubscriptionRegistry()
+
+    started = time.perf_counter()
+    for i in range(n_subs):
+        registry.add(_random_sub(rng, i, symbols, triggers))
+    print(f"등록: {n_subs:,}명 {time.perf_counter() - started:.3f}s")
+
+    alerts = [(rng.choice(symbols), rng.choice(['US', 'KR']), rng.choice(triggers),
+               rng.uniform(4, 10), rng.uniform(0.5, 100)) for _ in range(n_alerts)]
+
+    started = time.perf_counter()
+    indexed = [len(registry.match(*a)) for a in alerts]
+    t_index = time.perf_counter() - started
+
+    subs = list(registry.subs.values())
+    started = time.perf_counter()
+    linear = [sum(1 for s in subs if s.matches(*a)) for a in alerts]
+    t_linear = time.perf_counter() - started
+
+    assert indexed == linear, "색인 매칭 결과가 전체 순회와 다름"
+    print(f"색인: {t_index / n_alerts * 1e6:8.1f} µs/알림, 평균 {sum(indexed) / n_alerts:.0f}명 매칭")
+    print(f"순회: {t_linear / n_alerts * 1e6:8.1f} µs/알림 ({t_linear / t_index:.1f}배)")
+
+    # 전체 구독자 대상 알림 1건: 포맷별 1회 렌더링 + 전송 큐 적재
+    asyncio.run(_bench_fanout(n_subs))
+
+
+async def _bench_fanout(n_subs):
+    from delivery_queue import DeliveryQueue
+    from telegram_bot import TelegramBot
+
+    registry = SubscriptionRegistry()
+    for i in range(n_subs):
+        registry.add(Subscription(1000 + i, format=FORMATS[i % len(FORMATS)]))
+    queue = DeliveryQueue(TelegramBot('bench', '0'), os.path.join(tempfile.mkdtemp(), 'outbox.db'))
+
+    started = time.perf_counter()
+    groups = registry.match_by_format('TEST', 'US', 'news', 9.5, 3.2)
+    for fmt, chat_ids in groups.items():
+        text = f"[{fmt}] $TEST +35%"  # 포맷별 렌더링 1회
+        await queue.send_many(text, chat_ids, urgent=True)
+    elapsed = time.perf_counter() - started
+    print(f"팬아웃: {n_subs:,}명 매칭+적재 {elapsed * 1000:.0f} ms, 렌더링 {len(groups)}회, "
+          f"대기열 {queue.get_stats()['queued']:,}건")
+
+
+if __name__ == '__main__':
+    _bench(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""미국 상장 종목 유니버스 (하루 한 번 갱신) + 알림 적격성 사전 필터
+
+Nasdaq Trader 심볼 디렉터리(거래소/증권 종류/테스트 종목)와 Nasdaq 스크리너(시가총액/가격)를
+합쳐 종목별 한 행으로 두고, 스캐너가 알림을 내보낸 직후 dict 조회 한 번으로
+워런트/유닛/OTC/초대형주 등을 걸러 검증기와 Gemini 호출 전에 버림.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import NamedTuple
+import aiohttp
+import pytz
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+ET = pytz.timezone('America/New_York')
+
+# otherlisted.txt 거래소 코드
+EXCHANGES = {'A': 'NYSE American', 'N': 'NYSE', 'P': 'NYSE Arca', 'Z': 'Cboe BZX', 'V': 'IEX'}
+
+# 종목이 아닌 알림 (시장 전체 뉴스 등)은 필터 대상 아님
+PASS_THROUGH = frozenset({'US', 'UNKNOWN'})
+
+
+class UniverseEntry(NamedTuple):
+    exchange: str
+    security_type: str      # COMMON / ADR / ETF / WARRANT / UNIT / RIGHT / PREFERRED / NOTE / TEST
+    market_cap: float       # 0 = 모름
+    price: float            # 스크리너 기준가 (시총 환산용), 0 = 모름
+    float_shares: float     # 0 = 모름
+
+
+def normalize_symbol(symbol):
+    """BRK.B / BRK/B -> BRK-B, 우선주 ABR$D -> ABR-PD (야후 표기)"""
+    return symbol.strip().upper().replace('.', '-').replace('/', '-').replace('$', '-P')
+
+
+# 이름 끝(또는 ', each ...' 설명 앞)에 단어로 붙은 종류만 인정 ("First United Corp", "Unit Corp" 는 보통주)
+_DERIVATIVE_RE = re.compile(r'\b(unit|warrant|right)s?\b(?:\s*,?\s*each\b.*)?\s*$', re.I)
+# Nasdaq 표기 "회사명 - 증권 설명" 의 설명 앞머리 ("- Units, ...", "- Redeemable Warrants")
+_DERIVATIVE_DESC_RE = re.compile(r'^(?:[\w.-]+\s+){0,2}?(unit|warrant|right)s?\b', re.I)
+_PREFERRED_RE = re.compile(r'\bpreferred\s+(?:stock|shares?|securities)\b', re.I)
+_ADR_RE = re.compile(r'\bamerican\s+depositary\b|\bads\b', re.I)
+_DEPOSITARY_RE = re.compile(r'\bdepositary\s+shares?\b', re.I)
+_NOTE_RE = re.compile(r'\bnotes?\s+due\b|\bdebentures?\b|\bsenior\s+notes?\b', re.I)
+
+
+def classify_security(name, etf=False):
+    """증권명 -> 증권 종류 (Nasdaq Trader 는 종류 칸이 없어 이름으로 판단)
+
+    회사명에 들어간 단어("Preferred Bank", "First United")에 걸리지 않도록
+    증권 설명 쪽의 단어/구절로만 판단
+    """
+    if etf:
+        return 'ETF'
+    name = name.strip()
+    match = _DERIVATIVE_RE.search(name)
+    if match is None and ' - ' in name:
+        match = _DERIVATIVE_DESC_RE.match(name.rsplit(' - ', 1)[1])
+    if match is not None:
+        return match.group(1).upper()
+    if _PREFERRED_RE.search(name):
+        return 'PREFERRED'
+    if _ADR_RE.search(name):
+        return 'ADR'
+    if _DEPOSITARY_RE.search(name):
+        return 'PREFERRED'  # 미국 예탁증서가 아닌 Depositary Shares 는 우선주 분할 증서
+    if _NOTE_RE.search(name):
+        return 'NOTE'
+    return 'COMMON'
+
+
+def parse_symbol_directory(text, other=False):
+    """nasdaqlisted.txt / otherlisted.txt (파이프 구분) -> {티커: (거래소, 증권 종류)}"""
+    lines = text.strip().splitlines()
+    if not lines:
+        return {}
+    header = lines[0].split('|')
+    col = {name: i for i, name in enumerate(header)}
+    symbol_col = col['ACT Symbol'] if other else col['Symbol']
+    rows = {}
+    for line in lines[1:]:
+        if line.startswith('File Creation Time'):
+            break
+        parts = line.split('|')
+        if len(parts) < len(header):
+            continue
+        etf = parts[col['ETF']] == 'Y'
+        kind = 'TEST' if parts[col['Test Issue']] == 'Y' else classify_security(parts[col['Security Name']], etf)
+        exchange = EXCHANGES.get(parts[col['Exchange']], parts[col['Exchange']]) if other else 'NASDAQ'
+        rows[normalize_symbol(parts[symbol_col])] = (exchange, kind)
+    return rows
+
+
+def _money(text):
+    try:
+        return float(str(text).replace('$', '').replace(',', '') or 0)
+    except ValueError:
+        return 0.0
+
+
+def parse_screener(data):
+    """Nasdaq 스크리너 JSON -> {티커: (시가총액, 가격)}"""
+    rows = (data.get('data') or {}).get('rows') or []
+    return {normalize_symbol(r['symbol']): (_money(r.get('marketCap')), _money(r.get('lastsale')))
+            for r in rows if r.get('symbol')}
+
+
+class SymbolUniverse:
+    RETRY_INTERVAL = 600  # 갱신 실패 후 재시도 간격 (초)
+
+    def __init__(self, snapshot_path, float_source=None):
+        self.snapshot_path = snapshot_path
+        self.float_source = float_source  # 유동주식수 제공 (ShortInterestTable, 선택)
+        self.entries = {}                 # 티커 -> UniverseEntry
+        self.snapshot_date = None         # ET 기준 갱신 날짜
+        self.allowed_types = frozenset(Config.UNIVERSE_ALLOWED_TYPES)
+
+        self._refresh_task = None
+        self._last_attempt = -self.RETRY_INTERVAL
+        self.refresh_seconds = 0.0
+
+        self.passed = 0
+        self.rejects = {}       # 사유 -> 건수
+        self.ai_calls_saved = 0
+
+        self.load()
+
+    # === 스냅샷 파일 ===
+
+    def load(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = {s: UniverseEntry(*row) for s, row in data['rows'].items()}
+            self.snapshot_date = data['date']
+            logger.info(f"📂 종목 유니버스 스냅샷 로드: {len(self.entries)}종목 ({self.snapshot_date})")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"종목 유니버스 로드 실패: {e}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        with open(self.snapshot_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'date': self.snapshot_date, 'rows': {s: list(e) for s, e in self.entries.items()}}, f)
+        os.replace(self.snapshot_path + '.tmp', self.snapshot_path)
+
+    # === 하루 한 번 갱신 ===
+
+    def is_stale(self):
+        return self.snapshot_date != datetime.now(ET).strftime('%Y-%m-%d')
+
+    def schedule_refresh(self):
+        """날짜가 바뀌었으면 백그라운드로 갱신 (필터는 기존 테이블로 계속)"""
+        if not self.is_stale():
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.monotonic() - self._last_attempt < self.RETRY_INTERVAL:
+            return
+        self._last_attempt = time.monotonic()
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        started = time.perf_counter()
+        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                   'Accept': 'application/json, text/plain, */*'}
+        base = Config.NASDAQ_TRADER_BASE.rstrip('/')
+
+        async def fetch_text(session, url):
+            async with session.get(url, timeout=30) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                return await response.text()
+
+        async def fetch_screener(session):
+            async with session.get(Config.NASDAQ_SCREENER_URL, timeout=60) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                return json.loads(await response.read())
+
+        try:
+            async with aiohttp.ClientSession(headers=headers) as session:
+                nasdaq, other, screener = await asyncio.gather(
+                    fetch_text(session, f"{base}/nasdaqlisted.txt"),
+                    fetch_text(session, f"{base}/otherlisted.txt"),
+                    fetch_screener(session),
+                    return_exceptions=True
+                )
+        except Exception as e:
+            logger.error(f"종목 유니버스 조회 실패: {e}")
+            return
+
+        if isinstance(nasdaq, Exception) or isinstance(other, Exception):
+            logger.error(f"심볼 디렉터리 조회 실패: {nasdaq if isinstance(nasdaq, Exception) else other}")
+            return
+        listed = parse_symbol_directory(nasdaq)
+        listed.update(parse_symbol_directory(other, other=True))
+        if len(listed) < 5000:
+            logger.warning(f"심볼 디렉터리 불완전 ({len(listed)}종목), 기존 테이블 유지")
+            return
+
+        # 스크리너는 실패해도 거래소/종류만으로 필터 (시총/가격 검사는 건너뜀)
+        caps = {}
+        if isinstance(screener, Exception):
+            logger.warning(f"Nasdaq 스크리너 조회 실패 (시가총액 없이 갱신): {screener}")
+        else:
+            caps = parse_screener(screener)
+
+        floats = {}
+        table = self.float_source
+        if table is not None and len(table.symbols):
+            floats = dict(zip(table.symbols, table.float_shares.tolist()))
+
+        self.entries = {
+            symbol: UniverseEntry(exchange, kind, *caps.get(symbol, (0.0, 0.0)), floats.get(symbol, 0.0))
+            for symbol, (exchange, kind) in listed.items()
+        }
+        self.snapshot_date = datetime.now(ET).strftime('%Y-%m-%d')
+        self.refresh_seconds = time.perf_counter() - started
+        await asyncio.to_thread(self.save)
+        logger.info(f"🔄 종목 유니버스 갱신: {len(self.entries)}종목 (시총 {len(caps)}종목) "
+                    f"{self.refresh_seconds:.1f}초")
+
+    # === 적격성 (O(1)) ===
+
+    def check(self, symbol, price=None):
+        """알림 대상이면 None, 아니면 제외 사유"""
+        if symbol in PASS_THROUGH or not self.entries:
+            return None  # 테이블이 없으면 막지 않음
+        entry = self.entries.get(normalize_symbol(symbol))
+        if entry is None:
+            return 'not_listed'  # OTC/장외/상장폐지
+        if entry.security_type not in self.allowed_types:
+            return entry.security_type.lower()
+
+        price = price if isinstance(price, (int, float)) and price > 0 else entry.price
+        if price:
+            if price < Config.MIN_PRICE:
+                return 'price_low'
+            if price > Config.MAX_PRICE:
+                return 'price_high'
+        if entry.market_cap:
+            # 스크리너 기준가 대비 현재가로 시총 환산 (급등 중이면 차이가 큼)
+            cap = entry.market_cap * price / entry.price if price and entry.price else entry.market_cap
+            if cap < Config.MIN_MARKET_CAP:
+                return 'market_cap_low'
+            if cap > Config.MAX_MARKET_CAP:
+                return 'market_cap_high'
+        return None
+
+    def filter(self, alerts, cooldown=None, prefix='US_'):
+        """부적격 알림 제거 + 사유별 집계
+
+        cooldown 에 이미 있는 종목은 어차피 AI 까지 가지 않으므로 절약 횟수에서 뺌
+        """
+        passed = []
+        for alert in alerts:
+            symbol = alert.get('symbol', 'UNKNOWN')
+            reason = self.check(symbol, alert.get('price'))
+            if reason is None:
+                self.passed += 1
+                passed.append(alert)
+                continue
+            self.rejects[reason] = self.rejects.get(reason, 0) + 1
+            if cooldown is None or f"{prefix}{symbol}" not in cooldown:
+                self.ai_calls_saved += 1
+            logger.debug(f"🚫 {symbol} 유니버스 제외 ({reason}, {alert.get('trigger_type', '')})")
+        return passed
+
+    def float_shares(self, symbol):
+        entry = self.entries.get(normalize_symbol(symbol))
+        return entry.float_shares if entry is not None and entry.float_shares else None
+
+    def get_stats(self):
+        return {
+            'symbols': len(self.entries),
+            'snapshot': self.snapshot_date,
+            'passed': self.passed,
+            **{f"rejected_{reason}": n for reason, n in sorted(self.rejects.items())},
+            'ai_calls_saved': self.ai_calls_saved,
+        }
+
+
+# === 확인용: 알려진 종목명 분류 + 저장한 심볼 디렉터리 분류 + 조회 속도 ===
+# python symbol_universe.py [nasdaqlisted.txt otherlisted.txt]
+
+KNOWN_NAMES = [
+    ("First United Corporation - Common Stock", 'COMMON'),
+    ("Preferred Bank - Common Stock", 'COMMON'),
+    ("Unit Corporation Common Stock", 'COMMON'),
+    ("United States Lime & Minerals, Inc. - Common Stock", 'COMMON'),
+    ("Bright Horizons Family Solutions Inc. Common Stock", 'COMMON'),
+    ("Warrior Met Coal, Inc. Common Stock", 'COMMON'),
+    ("Apple Inc. - Common Stock", 'COMMON'),
+    ("Digital World Acquisition Corp. - Units, each consisting of one share of Class A common stock "
+     "and one-half of one redeemable warrant", 'UNIT'),
+    ("Churchill Capital Corp IX Units, each consisting of one Class A ordinary share and one-fourth "
+     "of one redeemable warrant", 'UNIT'),
+    ("Digital World Acquisition Corp. - Warrants, each whole warrant exercisable for one share of "
+     "Class A common stock at an exercise price of $11.50", 'WARRANT'),
+    ("Nabors Energy Transition Corp. II Warrant", 'WARRANT'),
+    ("Bowen Acquisition Corp - Rights", 'RIGHT'),
+    ("Annaly Capital Management Inc 6.95% Series F Fixed-to-Floating Rate Cumulative Redeemable "
+     "Preferred Stock", 'PREFERRED'),
+    ("Wells Fargo & Company - Depositary Shares, each representing a 1/1000th interest in a share of "
+     "Non-Cumulative Perpetual Class A Preferred Stock, Series L", 'PREFERRED'),
+    ("AGNC Investment Corp. - Depositary Shares Each Representing a 1/1,000th Interest in a Share of "
+     "7.75% Series G Fixed-Rate Reset Cumulative Redeemable", 'PREFERRED'),
+    ("Alibaba Group Holding Limited American Depositary Shares each representing eight Ordinary share", 'ADR'),
+    ("Baidu, Inc. - American Depositary Shares", 'ADR'),
+    ("Oxford Lane Capital Corp. - 6.75% Notes due 2031", 'NOTE'),
+]
+
+
+def _check_names():
+    wrong = [(name, kind, classify_security(name)) for name, kind in KNOWN_NAMES
+             if classify_security(name) != kind]
+    for name, kind, got in wrong:
+        print(f"분류 오류: {name!r} -> {got} (기대 {kind})")
+    assert not wrong, f"증권 종류 분류 오류 {len(wrong)}건"
+    print(f"알려진 종목명 {len(KNOWN_NAMES)}건 분류 OK")
+
+
+def _bench(paths):
+    _check_names()
+    listed = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        listed.update(parse_symbol_directory(text, other=text.startswith('ACT Symbol')))
+    if not listed:
+        print("디렉터리 분류/조회 속도: python symbol_universe.py nasdaqlisted.txt otherlisted.txt")
+        return
+
+    kinds = {}
+    for _, kind in listed.values():
+        kinds[kind] = kinds.get(kind, 0) + 1
+    print(f"{len(listed):,}종목: " + ', '.join(f"{k} {n:,}" for k, n in sorted(kinds.items(), key=lambda kv: -kv[1])))
+
+    universe = SymbolUniverse(os.path.join('/tmp', 'universe_bench.json'))
+    universe.entries = {s: UniverseEntry(e, k, 0.0, 0.0, 0.0) for s, (e, k) in listed.items()}
+    symbols = list(listed) + ['OTCX', 'PNKY']
+    started = time.perf_counter()
+    n = 200_000
+    for i in range(n):
+        universe.check(symbols[i % len(symbols)], 5.0)
+    print(f"적격성 조회: {(time.perf_counter() - started) / n * 1e6:.2f} µs/회")
+
+
+if __name__ == '__main__':
+    _bench(sys.argv[1:])
@@ -4,53 +4,66 @@ import logging
 logger = logging.getLogger(__name__)
 
 class TelegramBot:
-    def __init__(self, token, chat_id):
+    def __init__(self, token, chat_id, api_base='https://api.telegram.org'):
         self.token = token
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{token}"
-        
-    async def send_message(self, text, parse_mode='Markdown'):
-        """텔레그램 메시지 전송"""
+        self.base_url = f"{api_base.rstrip('/')}/bot{token}"  # 목 서버 테스트 시 api_base 교체
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def call(self, method, data, timeout=10):
+        """Bot API 호출 -> (HTTP 상태, 응답 JSON). 네트워크 오류는 예외로 전달"""
+        session = await self._get_session()
+        async with session.post(f"{self.base_url}/{method}", json=data, timeout=timeout) as response:
+            try:
+                body = await response.json(content_type=None)
+            except Exception:
+                body = {'ok': False, 'description': await response.text()}
+            return response.status, body or {}
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def send_message(self, text, parse_mode='Markdown', chat_id=None):
+        """텔레그램 메시지 전송 (즉시 1회 시도, 재시도는 DeliveryQueue 사용)"""
         try:
-            url = f"{self.base_url}/sendMessage"
-            
             data = {
-                'chat_id': self.chat_id,
+                'chat_id': chat_id or self.chat_id,
                 'text': text,
                 'parse_mode': parse_mode,
                 'disable_web_page_preview': True
             }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data, timeout=10) as response:
-                    if response.status == 200:
-                        logger.info("✅ Telegram message sent")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Telegram error {response.status}: {error_text}")
-                        return False
-                        
+
+            status, body = await self.call('sendMessage', data)
+            if status == 200:
+                logger.info("✅ Telegram message sent")
+                return True
+            else:
+                logger.error(f"❌ Telegram error {status}: {body.get('description')}")
+                return False
+
         except Exception as e:
             logger.error(f"❌ Failed to send Telegram message: {e}")
             return False
-    
+
     async def send_photo(self, photo_url, caption=""):
         """이미지 전송 (차트 등)"""
         try:
-            url = f"{self.base_url}/sendPhoto"
-            
             data = {
                 'chat_id': self.chat_id,
                 'photo': photo_url,
                 'caption': caption,
                 'parse_mode': 'Markdown'
             }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data, timeout=15) as response:
-                    return response.status == 200
-                    
+
+            status, _ = await self.call('sendPhoto', data, timeout=15)
+            return status == 200
+
         except Exception as e:
             logger.error(f"Failed to send photo: {e}")
-            return False
\ No newline at end of file
+            return False
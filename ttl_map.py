@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""만료 시간이 있는 dict (쿨다운/중복 제거용)
+
+만료 시각을 resolution 초 단위 칸(타이밍 휠)에 묶어 두고, 조회/삽입 때마다
+지나간 칸만 비워서 삽입/조회/만료 모두 분할 상환 O(1).
+max_size 를 넘으면 가장 먼저 넣은 키부터 밀어내 메모리 상한을 보장함.
+"""
+import itertools
+import random
+import sys
+import time
+import tracemalloc
+
+
+class TTLMap:
+    def __init__(self, default_ttl, max_size=100_000, resolution=1.0, clock=time.monotonic):
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.resolution = resolution
+        self.clock = clock
+
+        self._data = {}     # key -> (만료 시각, 값), 삽입 순서 = 밀어내기 순서
+        self._wheel = {}    # 칸 번호 -> [key, ...]
+        self._cursor = int(clock() // resolution)  # 이 칸 직전까지는 비워진 상태
+
+        self.expired = 0
+        self.evicted = 0
+        self.peak = 0
+
+    # === 만료 처리 ===
+
+    def expire(self, now=None):
+        now = self.clock() if now is None else now
+        tick = int(now // self.resolution)
+        if tick <= self._cursor:
+            return
+
+        # 오래 쉬었으면 빈 칸을 하나씩 도는 대신 남은 칸만 확인
+        # 현재 칸은 일부만 지났으므로 직전 칸까지만 비움 (조회 시 만료 시각을 직접 비교)
+        if tick - self._cursor > len(self._wheel):
+            due = sorted(t for t in self._wheel if t < tick)
+        else:
+            due = range(self._cursor, tick)
+
+        for t in due:
+            keys = self._wheel.pop(t, None)
+            for key in keys or ():
+                entry = self._data.get(key)
+                # 다시 set 된 키는 더 뒤 칸에 새로 들어가 있으므로 건너뜀
+                if entry is not None and entry[0] <= now:
+                    del self._data[key]
+                    self.expired += 1
+        self._cursor = tick
+
+    # === dict 인터페이스 ===
+
+    def set(self, key, value=True, ttl=None):
+        now = self.clock()
+        self.expire(now)
+        expires = now + (self.default_ttl if ttl is None else ttl)
+
+        self._data.pop(key, None)  # 삽입 순서를 맨 뒤로
+        self._data[key] = (expires, value)
+        self._wheel.setdefault(int(expires // self.resolution), []).append(key)
+
+        while len(self._data) > self.max_size:
+            del self._data[next(iter(self._data))]
+            self.evicted += 1
+        self.peak = max(self.peak, len(self._data))
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        if entry[0] <= self.clock():
+            self.expire()
+            return default
+        return entry[1]
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > self.clock()
+
+    def __len__(self):
+        self.expire()
+        return len(self._data)
+
+    def check_and_set(self, key, value=True, ttl=None):
+        """키가 없으면(또는 만료됐으면) 기록하고 True, 살아 있으면 False (쿨다운 판정)"""
+        if key in self:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def dump(self):
+        """(key, 남은 초, 값) 목록 (체크포인트 저장용, 단조 시계 값은 재시작 후 의미 없음)"""
+        now = self.clock()
+        return [(k, expires - now, v) for k, (expires, v) in self._data.items() if expires > now]
+
+    def load(self, entries, elapsed=0.0):
+        """dump() 결과 복구 (저장 후 지난 시간만큼 남은 시간 차감)"""
+        for key, left, value in entries:
+            if left - elapsed > 0:
+                self.set(key, value, ttl=left - elapsed)
+
+    def get_stats(self):
+        return {
+            'size': len(self),
+            'peak': self.peak,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
+
+
+# === 장기 실행 시뮬레이션 ===
+# python ttl_map.py [일수] [초당 알림 수] [알림당 뉴스 링크 비율]
+
+def _simulate(days=7, rate=0.5, news_ratio=0.2):
+    clock = [0.0]
+    cooldowns = TTLMap(4 * 3600, max_size=50_000, clock=lambda: clock[0])
+    news = TTLMap(24 * 3600, max_size=50_000, clock=lambda: clock[0])
+
+    rng = random.Random(0)
+    symbols = [f'S{i:05d}' for i in range(20_000)]
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(symbols))))  # 일부 종목에 알림 집중
+    seen_keys, links = set(), 0  # 정리 없는 dict 였다면 남아 있을 키 수
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for day in range(days):
+        for _ in range(int(86400 * rate)):
+            clock[0] += 1 / rate
+            market = 'KR' if rng.random() < 0.3 else 'US'
+            key = f"{market}_{rng.choices(symbols, cum_weights=cum_weights)[0]}"
+            cooldowns.check_and_set(key, ttl=2 * 3600 if market == 'KR' else None)
+            seen_keys.add(key)
+            if rng.random() < news_ratio:
+                links += 1
+                news.check_and_set(f"https://news.example/{day}/{links}")
+        current, _ = tracemalloc.get_traced_memory()
+        print(f"{day + 1}일차: 쿨다운 {len(cooldowns):,}개, 뉴스 {len(news):,}개 "
+              f"(정리 없는 dict 였다면 {len(seen_keys) + links:,}개), 메모리 {(current - baseline) / 1e6:.1f} MB (비교용 집합 포함)")
+    tracemalloc.stop()
+    print(f"쿨다운 {cooldowns.get_stats()} / 뉴스 {news.get_stats()}")
+
+    # 처리 속도 (tracemalloc 없이)
+    bench = TTLMap(3600, clock=lambda: clock[0])
+    keys = [f'K{i}' for i in range(200_000)]
+    started = time.perf_counter()
+    for key in keys:
+        clock[0] += 0.05
+        bench.check_and_set(key)
+        key in bench
+    elapsed = time.perf_counter() - started
+    print(f"check_and_set + 조회: {elapsed / len(keys) * 1e6:.2f} µs/회 (유지 {len(bench):,}개)")
+
+
+if __name__ == '__main__':
+    _simulate(*(float(a) if i else int(a) for i, a in enumerate(sys.argv[1:4])))
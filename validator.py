@@ -2,21 +2,37 @@
 import yfinance as yf
 import asyncio
 import logging
+import os
+import pytz
+import time
+from datetime import datetime
 from statistics import mean, stdev
+from config import Config
+from bar_store import BarStore
+from ttl_map import TTLMap
 
 logger = logging.getLogger(__name__)
 
 class Validator:
     """1차 포착 종목을 옵션/다크풀로 2차 검증"""
     
-    def __init__(self):
-        pass
+    def __init__(self, bar_store=None, rvol=None):
+        # 일봉은 로컬 봉 저장소에서 (빠진 날짜만 조회)
+        self.bar_store = bar_store or BarStore(os.path.join(Config.DATA_DIR, 'bars'))
+        # 장중 거래량을 같은 시각 평소 거래량과 비교 (RvolBaseline)
+        self.rvol = rvol
+        # 같은 종목 재검증 방지 (옵션 체인 조회가 느림)
+        self.cache = TTLMap(Config.VALIDATOR_CACHE_TTL, max_size=5000)
     
     async def validate(self, symbol):
         """옵션 + 다크풀 통합 검증"""
+        cached = self.cache.get(symbol)
+        if cached is not None:
+            return cached
         try:
             # 비동기 래핑 (yfinance는 동기식)
             result = await asyncio.to_thread(self._sync_validate, symbol)
+            self.cache.set(symbol, result)
             return result
         except Exception as e:
             logger.error(f"검증 오류 ({symbol}): {e}")
@@ -42,7 +58,7 @@ class Validator:
                 findings['details'].append(options_check)
             
             # === 2. 다크풀 + Block Trade ===
-            dark_pool_check = self._check_dark_pool(ticker)
+            dark_pool_check = self._check_dark_pool(symbol)
             if dark_pool_check:
                 findings['dark_pool_signal'] = True
                 findings['details'].append(dark_pool_check)
@@ -86,17 +102,19 @@ class Validator:
         
         return None
     
-    def _check_dark_pool(self, ticker):
+    def _check_dark_pool(self, symbol):
         """다크풀/Block Trade 추정"""
         try:
-            # 최근 10일 데이터
-            hist = ticker.history(period='10d', interval='1d')
+            # 최근 10거래일 데이터 (주말/휴일 포함 16일 범위)
+            now = time.time()
+            self.bar_store.ensure([symbol], now - 16 * 86400, now, '1d')
+            hist = self.bar_store.read(symbol, '1d', now - 16 * 86400)
             
-            if hist.empty or len(hist) < 5:
+            if hist is None or len(hist['ts']) < 5:
                 return None
             
             # 최근 5일 평균 거래량
-            volumes = hist['Volume'].values
+            volumes = hist['volume'][-10:]
             avg_volume = mean(volumes[:-1])  # 오늘 제외
             
             # 표준편차 계산
@@ -108,8 +126,14 @@ class Validator:
             # 오늘 거래량
             today_volume = volumes[-1]
             
+            # 장중이면 오늘 봉은 아직 진행 중 -> 평균/표준편차를 지금 시각까지 평소 비율로 축소
+            fraction = self._session_fraction(symbol, hist['ts'][-1])
+            if fraction:
+                avg_volume *= fraction
+                std_volume *= fraction
+            
             # 가격 변동성
-            prices = hist['Close'].values
+            prices = hist['close'][-10:]
             price_change_pct = abs((prices[-1] - prices[-2]) / prices[-2]) * 100
             
             # === Gemini 제안: 3-Sigma 통계적 접근 ===
@@ -122,9 +146,20 @@ class Validator:
             
             # Block Trade 체크 (거래량 3배 이상)
             if today_volume > avg_volume * 3 and price_change_pct < 3.0:
-                return f"🐋 Block Trade 감지 (거래량 {int(today_volume/avg_volume)}배)"
+                label = '같은 시각 평소 대비 ' if fraction else ''
+                return f"🐋 Block Trade 감지 ({label}거래량 {int(today_volume/avg_volume)}배)"
             
         except Exception:
             pass
         
         return None
+    
+    def _session_fraction(self, symbol, last_bar_ts):
+        """마지막 일봉이 오늘(ET)이고 장중이면 평소 하루 거래량 중 지금까지 나오는 비율, 아니면 None"""
+        if self.rvol is None:
+            return None
+        et = pytz.timezone('America/New_York')
+        if datetime.fromtimestamp(int(last_bar_ts), et).date() != datetime.now(et).date():
+            return None
+        fraction = self.rvol.session_fraction(symbol)
+        return fraction if fraction and fraction < 1.0 else None
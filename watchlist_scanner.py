@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""감시 목록 모드: 지정한 종목 전체를 배치 조회해 급등을 한 번에 판정
+
+급등 테이블(상위 100개)에 오르기 전 단계의 종목도 보기 위해, 감시 목록 수천 종목의
+시세를 배치로 받아 미리 잡아둔 NumPy 열에 채우고 등락률/거래량 기준을 벡터로 계산.
+"""
+import asyncio
+import logging
+import sys
+import time
+import aiohttp
+import numpy as np
+from config import Config
+from quote_source import create_quote_source
+from ttl_map import TTLMap
+
+logger = logging.getLogger(__name__)
+
+
+def load_watchlist(path, env_value=''):
+    """감시 목록 파일(한 줄에 한 종목, # 주석) + 환경변수(쉼표 구분), 중복 제거 후 순서 유지"""
+    symbols = [s.strip().upper() for s in env_value.split(',') if s.strip()]
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip().upper()
+                if line:
+                    symbols.append(line)
+    except FileNotFoundError:
+        pass
+    return list(dict.fromkeys(symbols))
+
+
+class WatchlistScanner:
+    def __init__(self, symbols=None, source=None):
+        if symbols is None:
+            symbols = load_watchlist(Config.WATCHLIST_FILE, Config.WATCHLIST_SYMBOLS)
+        self.source = source or create_quote_source(Config.WATCHLIST_SOURCE)
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        # 종목 수만큼 미리 잡아둔 열 (매 주기 재할당 없음, 시세가 없으면 NaN)
+        n = len(self.symbols)
+        self.price = np.full(n, np.nan)
+        self.prev_close = np.full(n, np.nan)
+        self.volume = np.full(n, np.nan)
+        self.avg_volume = np.full(n, np.nan)
+        self.updated = np.zeros(n)  # 마지막 시세 수신 시각 (epoch)
+
+        # 같은 종목 재알림 방지
+        self.alerted = TTLMap(Config.WATCHLIST_COOLDOWN, max_size=max(1000, n))
+
+        self.polls = 0
+        self.quotes = 0
+        self.hits = 0
+        self.fetch_time = 0.0
+        self.eval_time = 0.0
+
+    # === 시세 -> 열 ===
+
+    def ingest(self, quotes, now=None):
+        """[Quote] 를 열에 반영 (목록에 없는 종목은 무시), 반영한 수 반환"""
+        index = self.index
+        rows = [index.get(q.symbol, -1) for q in quotes]
+        if not rows:
+            return 0
+        rows = np.array(rows, dtype=np.int64)
+        values = np.array([q[1:5] for q in quotes], dtype=np.float64)
+        known = rows >= 0
+        rows, values = rows[known], values[known]
+        self.price[rows], self.prev_close[rows], self.volume[rows], self.avg_volume[rows] = values.T
+        self.updated[rows] = time.time() if now is None else now
+        return len(rows)
+
+    def evaluate(self, max_age=None, now=None):
+        """전 종목 급등 판정 -> (후보 행 번호, 등락률, 평균 대비 거래량 증가율 %)
+
+        등락률 >= MIN_PRICE_CHANGE, 거래량이 최근 평균보다 MIN_VOLUME_INCREASE % 이상 많고,
+        가격이 MIN_PRICE ~ MAX_PRICE 사이인 종목 (NaN 비교는 False 라 시세 없는 종목은 자동 제외)
+        """
+        change = np.divide(self.price - self.prev_close, self.prev_close,
+                           out=np.full(len(self.price), np.nan), where=self.prev_close > 0) * 100
+        volume_increase = np.divide(self.volume - self.avg_volume, self.avg_volume,
+                                    out=np.full(len(self.volume), np.nan), where=self.avg_volume > 0) * 100
+        mask = ((change >= Config.MIN_PRICE_CHANGE)
+                & (volume_increase >= Config.MIN_VOLUME_INCREASE)
+                & (self.price >= Config.MIN_PRICE) & (self.price <= Config.MAX_PRICE))
+        if max_age is not None:
+            now = time.time() if now is None else now
+            mask &= (now - self.updated) <= max_age
+        hits = np.flatnonzero(mask)
+        return hits[np.argsort(-change[hits])], change, volume_increase
+
+    # === 스캔 ===
+
+    async def poll(self, session):
+        started = time.perf_counter()
+        quotes = await self.source.fetch(session, self.symbols)
+        self.fetch_time += time.perf_counter() - started
+        self.polls += 1
+        self.quotes += self.ingest(quotes)
+
+    async def scan(self):
+        alerts = []
+        if not self.symbols:
+            return alerts
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                await self.poll(session)
+
+            started = time.perf_counter()
+            hits, change, volume_increase = self.evaluate(max_age=Config.WATCHLIST_QUOTE_MAX_AGE)
+            self.eval_time += time.perf_counter() - started
+
+            for i in hits:
+                symbol = self.symbols[i]
+                if symbol in self.alerted:
+                    continue
+                self.alerted.set(symbol, float(change[i]))
+                self.hits += 1
+                alerts.append({
+                    'symbol': symbol,
+                    'price': float(self.price[i]),
+                    'change_percent': float(change[i]),
+                    'volume': int(self.volume[i]),
+                    'trigger_type': 'watchlist_surge',
+                    'trigger_reason': f"👀 감시 종목 급등 ({change[i]:+.1f}%, 거래량 평균 대비 +{volume_increase[i]:.0f}%)"
+                })
+                logger.info(f"👀 감시 종목 급등: {symbol} {change[i]:+.1f}%")
+
+        except Exception as e:
+            logger.error(f"감시 목록 스캔 오류: {e}")
+
+        return alerts
+
+    def get_stats(self):
+        return {
+            'symbols': len(self.symbols),
+            'polls': self.polls,
+            'quotes': self.quotes,
+            'hits': self.hits,
+            'fetch_ms': round(self.fetch_time / max(1, self.polls) * 1000, 1),
+            'eval_ms': round(self.eval_time / max(1, self.polls) * 1000, 2),
+        }
+
+
+# === 벤치마크: 주기당 반영 + 판정 ===
+# python watchlist_scanner.py [종목 수] [주기 수]
+
+def _bench(n_symbols=5000, rounds=50):
+    from quote_source import StubQuoteSource
+    symbols = [f'W{i:05d}' for i in range(n_symbols)]
+    scanner = WatchlistScanner(symbols, StubQuoteSource(seed=0))
+
+    async def run():
+        fetch = ingest = evaluate = 0.0
+        hits = 0
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            quotes = await scanner.source.fetch(None, scanner.symbols)
+            t1 = time.perf_counter()
+            scanner.ingest(quotes)
+            t2 = time.perf_counter()
+            rows, _, _ = scanner.evaluate()
+            t3 = time.perf_counter()
+            fetch, ingest, evaluate = fetch + t1 - t0, ingest + t2 - t1, evaluate + t3 - t2
+            hits += len(rows)
+        return fetch, ingest, evaluate, hits
+
+    fetch, ingest, evaluate, hits = asyncio.run(run())
+    per = 1000 / rounds
+    print(f"감시 목록 {n_symbols:,}종목 x {rounds}주기: 가짜 시세 생성 {fetch * per:.1f} ms, "
+          f"열 반영 {ingest * per:.2f} ms, 판정 {evaluate * per:.3f} ms / 주기, 후보 누적 {hits:,}개")
+    budget = (ingest + evaluate) * per
+    print(f"반영 + 판정 {budget:.2f} ms/주기 ({'OK' if budget < 100 else '초과'}: 목표 100 ms)")
+
+
+if __name__ == '__main__':
+    _bench(*(int(a) for a in sys.argv[1:3]))
@@ -1,20 +1,41 @@
 # -*- coding: utf-8 -*-
-import aiohttp
-import asyncio
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-import re
 import logging
+import os
+import time
+from collections import deque
+from config import Config
+from edgar_feed import EdgarFeedPoller
+from sec_tickers import CikTickerIndex
 
 logger = logging.getLogger(__name__)
 
 class WhaleScanner:
-    def __init__(self):
-        # SEC EDGAR RSS (공식 무료)
-        self.sec_url = "https://www.sec.gov/cgi-bin/browse-edgar"
-        self.seen_filings = set()
+    def __init__(self, feed=None, tickers=None):
+        # SEC EDGAR 공시 피드 (InsiderScanner 와 공유, 없으면 단독 사용)
+        self.feed = feed or EdgarFeedPoller(forms=[f for f in Config.EDGAR_FORMS if '13' in f])
+        self.pending = deque(maxlen=1000)
+        self.feed.subscribe(Config.WHALE_FORMS, self.pending.append)
         
-        # 유명 고래 화이트리스트 (이들의 공시는 즉시 알림)
+        # 대상 회사(Subject) CIK -> 티커
+        self.tickers = tickers or CikTickerIndex(os.path.join(Config.DATA_DIR, 'sec_tickers.json'))
+        
+        # 유명 고래: 제출자(Filed by) CIK 로 판별
+        self.whale_ciks = {
+            921669: '🐋 Carl Icahn (전설의 행동주의)',
+            1336528: '🐋 Bill Ackman (Pershing Square)',
+            1079114: '🐋 David Einhorn (Greenlight)',
+            1517137: '🐋 Starboard Value',
+            1040273: '🐋 Third Point (Dan Loeb)',
+            1159159: '🐋 Jana Partners',
+            1418814: '🐋 ValueAct Capital',
+        }
+        # CIK 를 모르는 고래는 이름으로 찾고, 찾으면 CIK 를 기억 (체크포인트 대상)
+        self.learned_ciks = {}
+        
+        self.resolved = 0
+        self.unresolved = 0
+        
+        # 이름 키워드 (CIK 목록에 없는 제출 법인용)
         self.famous_whales = {
             'ICAHN': '🐋 Carl Icahn (전설의 행동주의)',
             'ACKMAN': '🐋 Bill Ackman (Pershing Square)',
@@ -32,120 +53,108 @@ class WhaleScanner:
         alerts = []
         
         try:
-            # SC 13D, 13G, 13D/A, 13G/A 모두 포착
-            params = {
-                'action': 'getcurrent',
-                'type': '',  # 빈 값으로 모든 타입
-                'company': '',
-                'dateb': '',
-                'owner': 'include',
-                'start': '0',
-                'count': '100',
-                'output': 'atom'
-            }
+            self.tickers.schedule_refresh()
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (WhaleBotPro/2.0; contact@example.com)'
-            }
+            # SC 13D, 13G, 13D/A, 13G/A 모두 포착 (양식별 피드라 다른 공시에 밀리지 않음)
+            await self.feed.poll()
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.sec_url, 
-                    params=params, 
-                    headers=headers, 
-                    timeout=15
-                ) as response:
-                    if response.status != 200:
-                        logger.warning(f"SEC 접근 실패: {response.status}")
-                        return alerts
+            while self.pending:
+                filing = self.pending.popleft()
+                try:
+                    title = ' / '.join(filing.titles)
+                    link = filing.link
+                    
+                    # 최근 12시간 이내만
+                    if time.time() - filing.updated > 43200:  # 12시간
+                        continue
+                    
+                    # 13D/G 구분 ('SCHEDULE 13D' 신양식명도 같은 취급)
+                    form = filing.form.replace('SCHEDULE ', 'SC ')
+                    form_type = None
+                    priority = 0
                     
-                    xml = await response.text()
-                    soup = BeautifulSoup(xml, 'xml')
-                    entries = soup.find_all('entry')[:50]
+                    if form == "SC 13D/A":
+                        form_type = "🔥 SC 13D/A (지분 추가 매수!)"
+                        priority = 10  # 최우선
+                    elif form == "SC 13D":
+                        form_type = "⚡ SC 13D (공격적 매수)"
+                        priority = 9
+                    elif form == "SC 13G/A":
+                        form_type = "📈 SC 13G/A (지분 변동)"
+                        priority = 7
+                    elif form == "SC 13G":
+                        form_type = "📊 SC 13G (5% 지분 신고)"
+                        priority = 6
+                    else:
+                        continue
                     
-                    for entry in entries:
-                        try:
-                            title = entry.find('title').text
-                            link = entry.find('link')['href']
-                            updated = entry.find('updated').text
-                            
-                            # 중복 체크
-                            if link in self.seen_filings:
-                                continue
-                            
-                            # 최근 12시간 이내만
-                            filing_time = datetime.fromisoformat(
-                                updated.replace('Z', '+00:00')
-                            )
-                            now = datetime.now(filing_time.tzinfo)
-                            
-                            if (now - filing_time).total_seconds() > 43200:  # 12시간
-                                continue
-                            
-                            # 13D/G 필터링
-                            form_type = None
-                            priority = 0
-                            
-                            if "SC 13D/A" in title:
-                                form_type = "🔥 SC 13D/A (지분 추가 매수!)"
-                                priority = 10  # 최우선
-                            elif "SC 13D" in title:
-                                form_type = "⚡ SC 13D (공격적 매수)"
-                                priority = 9
-                            elif "SC 13G/A" in title:
-                                form_type = "📈 SC 13G/A (지분 변동)"
-                                priority = 7
-                            elif "SC 13G" in title:
-                                form_type = "📊 SC 13G (5% 지분 신고)"
-                                priority = 6
-                            else:
-                                continue
-                            
-                            # 티커 추출
-                            ticker_match = re.search(r'\(([A-Z]{1,5})\)', title)
-                            if not ticker_match:
-                                continue
-                            
-                            ticker = ticker_match.group(1)
-                            
-                            # 유명 고래 체크
-                            whale_name = None
-                            for whale_key, whale_desc in self.famous_whales.items():
-                                if whale_key in title.upper():
-                                    whale_name = whale_desc
-                                    priority += 3  # 유명 고래는 가산점
-                                    break
-                            
-                            self.seen_filings.add(link)
-                            
-                            # 트리거 메시지 생성
-                            trigger_msg = form_type
-                            if whale_name:
-                                trigger_msg = f"{whale_name}\n{form_type}"
-                            
-                            logger.info(f"🐋 고래 출현: {ticker} - {form_type}")
-                            
-                            alerts.append({
-                                'symbol': ticker,
-                                'price': 0,
-                                'change_percent': 0,
-                                'volume': 0,
-                                'trigger_type': 'whale_alert',
-                                'trigger_reason': trigger_msg,
-                                'news_url': link,
-                                'title': title,
-                                'priority': priority  # AI 점수 가산용
-                            })
-                            
-                        except Exception as e:
-                            logger.debug(f"공시 파싱 오류: {e}")
-                            continue
+                    # 대상 회사 티커 (제목의 괄호는 제출자일 수도 있어서 Subject CIK 로 확인)
+                    ticker = self._subject_ticker(filing)
+                    if not ticker:
+                        self.unresolved += 1
+                        continue
+                    self.resolved += 1
                     
-                    # 메모리 관리
-                    if len(self.seen_filings) > 500:
-                        self.seen_filings.clear()
+                    # 유명 고래 체크 (제출자 CIK)
+                    whale_name = self._whale(filing)
+                    if whale_name:
+                        priority += 3  # 유명 고래는 가산점
+                    
+                    # 트리거 메시지 생성
+                    trigger_msg = form_type
+                    if whale_name:
+                        trigger_msg = f"{whale_name}\n{form_type}"
+                    
+                    logger.info(f"🐋 고래 출현: {ticker} - {form_type}")
+                    
+                    alerts.append({
+                        'symbol': ticker,
+                        'price': 0,
+                        'change_percent': 0,
+                        'volume': 0,
+                        'trigger_type': 'whale_alert',
+                        'trigger_reason': trigger_msg,
+                        'news_url': link,
+                        'title': title,
+                        'priority': priority  # AI 점수 가산용
+                    })
+                    
+                except Exception as e:
+                    logger.debug(f"공시 파싱 오류: {e}")
+                    continue
                         
         except Exception as e:
             logger.error(f"고래 스캔 오류: {e}")
         
         return alerts
+    
+    def _subject_ticker(self, filing):
+        for entity in filing.entities('Subject'):
+            ticker = self.tickers.ticker(entity.cik)
+            if ticker:
+                return ticker
+            # 색인에 CIK 가 없으면 회사명으로
+            cik = self.tickers.cik_for_name(entity.name)
+            if cik is not None:
+                return self.tickers.ticker(cik)
+        return None
+    
+    def _whale(self, filing):
+        for entity in filing.entities('Filed by'):
+            whale = self.whale_ciks.get(entity.cik) or self.learned_ciks.get(entity.cik)
+            if whale:
+                return whale
+            name = entity.name.upper()
+            for whale_key, whale_desc in self.famous_whales.items():
+                if whale_key in name:
+                    self.learned_ciks[entity.cik] = whale_desc
+                    logger.info(f"🐋 고래 CIK 학습: {entity.name} ({entity.cik})")
+                    return whale_desc
+        return None
+    
+    def get_stats(self):
+        return {
+            'resolved': self.resolved,
+            'unresolved': self.unresolved,
+            'learned_whales': len(self.learned_ciks),
+        }